@@ -1,7 +1,97 @@
+import argparse
+import os
 import sys
 
 from cobalt_converter import main
 
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="CobaltConverter")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP/JSON job API instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--staging",
+        choices=["off", "auto", "always"],
+        help="copy inputs on network storage to local scratch before encoding (API server and workers; "
+        "default: staging_mode from settings.json)",
+    )
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="run the job API as a cluster coordinator that hands jobs to --worker nodes",
+    )
+    parser.add_argument("--worker", metavar="URL", help="run as a worker node for the coordinator at URL")
+    parser.add_argument("--capacity", type=int, help="parallel jobs on this worker (default: one per 4 cores)")
+    parser.add_argument("--worker-name", help="name shown by the coordinator (default: host:pid)")
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("COBALT_API_TOKEN"),
+        help="shared secret the API and cluster nodes require (default: $COBALT_API_TOKEN); "
+        "needed to listen on a non-loopback --host",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        metavar="SIZE",
+        help="memory shared by parallel FFmpeg jobs, e.g. 8G or 60%% (default: 75%% of RAM, 'off' to disable)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="time the GUI startup up to the first paint, write it as JSON (default: startup_profile.json) and exit",
+    )
+    parser.add_argument(
+        "--startup-baseline",
+        metavar="PATH",
+        help="startup profile to compare against (default: startup_baseline.json, created on the first run)",
+    )
+    parser.add_argument(
+        "--update-startup-baseline",
+        action="store_true",
+        help="save this run's startup profile as the new baseline",
+    )
+    args, _unknown = parser.parse_known_args()
+    return args
+
+
 if __name__ == "__main__":
-    debug = "--debug" in sys.argv
-    main(debug=debug)
+    args = _parse_args()
+    if args.worker:
+        from cobalt_converter.cluster.worker import run_worker
+
+        run_worker(
+            args.worker,
+            capacity=args.capacity,
+            name=args.worker_name,
+            debug=args.debug,
+            staging=args.staging,
+            memory_budget=args.memory_budget,
+            token=args.token,
+        )
+    elif args.serve or args.coordinator:
+        from cobalt_converter.api_server import serve
+
+        serve(
+            host=args.host,
+            port=args.port,
+            debug=args.debug,
+            staging=args.staging,
+            coordinator=args.coordinator,
+            memory_budget=args.memory_budget,
+            token=args.token,
+        )
+    elif args.profile_startup is not None:
+        from cobalt_converter.startup_profile import StartupProfiler
+
+        profiler = StartupProfiler.start(
+            args.profile_startup or None,
+            baseline_path=args.startup_baseline,
+            update_baseline=args.update_startup_baseline,
+        )
+        main(debug=args.debug, profiler=profiler)
+        sys.exit(1 if profiler.finish()["regressions"] else 0)
+    else:
+        main(debug=args.debug)
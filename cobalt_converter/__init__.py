@@ -1,3 +1,16 @@
-from cobalt_converter.main_frame import main
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cobalt_converter.startup_profile import StartupProfiler
+
+
+def main(debug: bool = False, profiler: "StartupProfiler | None" = None) -> None:
+    from cobalt_converter.startup_profile import profile_phase
+
+    with profile_phase("import_gui"):
+        from cobalt_converter.main_frame import main as run_gui
+
+    run_gui(debug=debug, profiler=profiler)
+
 
 __all__ = ["main"]
@@ -0,0 +1,636 @@
+import hmac
+import io
+import ipaddress
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cobalt_converter.auto_quality import AutoQualitySearch
+from cobalt_converter.cluster.coordinator import Coordinator
+from cobalt_converter.config_store import start_config_watcher
+from cobalt_converter.constants import FORMAT_TYPES, VALID_OUTPUT_FORMATS, get_file_type
+from cobalt_converter.converter import ConversionEngine
+from cobalt_converter.edits import Clip, clip_label, load_clip_list, parse_timecode
+from cobalt_converter.events import EngineEvent, event_to_dict
+from cobalt_converter.failures import write_failures_csv
+from cobalt_converter.jobs import ConversionJob, JobPriority
+from cobalt_converter.loudness import LoudnessNormalizer
+from cobalt_converter.memory import MemoryBudget
+from cobalt_converter.naming import CollisionPolicy, validate_template
+from cobalt_converter.packaging import PACKAGING_OUTPUT_FORMATS, PackagingFormat, PackagingSpec, supports_packaging
+from cobalt_converter.plans import JobKind, validate_range
+from cobalt_converter.probe import ProbeIndex
+from cobalt_converter.quality_manager import QualityManager
+from cobalt_converter.scaling import Rendition
+from cobalt_converter.settings_manager import SettingsManager
+from cobalt_converter.staging import StagingManager, StagingMode
+from cobalt_converter.utils import setup_logging
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TOKEN_ENV = "COBALT_API_TOKEN"
+_KEEPALIVE_SECONDS = 15.0
+_JOB_PATH_RE = re.compile(r"^/jobs/(\d+)(?:/(cancel|pause|resume|priority|move))?$")
+_WORKER_PATH_RE = re.compile(r"^/cluster/workers/([0-9a-f]+)/(heartbeat|lease|leases/([0-9a-f]+))$")
+_PUBLIC_PATHS = frozenset({"/health"})
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ApiError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, details: object = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ApiServer:
+    def __init__(
+        self,
+        engine: ConversionEngine | Coordinator,
+        quality_manager: QualityManager,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        token: str | None = None,
+    ) -> None:
+        # Anyone who reaches the API can run FFmpeg on any path, so only loopback may go without a token.
+        if not token and not _is_loopback(host):
+            raise ValueError(f"Refusing to listen on {host or 'all interfaces'} without an access token")
+        self.engine = engine
+        self.quality_manager = quality_manager
+        self.token = token or None
+        self._httpd = ThreadingHTTPServer((host, port), _ApiRequestHandler)
+        self._httpd.daemon_threads = True
+        # Event streams never end on their own, so closing the server must not wait for their threads.
+        self._httpd.block_on_close = False
+        self._httpd.api = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        host, port = self._httpd.server_address[:2]
+        return host, port
+
+    def serve_forever(self) -> None:
+        logging.info("API server listening on http://%s:%d", *self.address)
+        self._httpd.serve_forever()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def submit(self, payload: dict) -> dict:
+        inputs = payload.get("inputs")
+        output_format = payload.get("format")
+        preset = payload.get("preset", "default")
+        output_dir = payload.get("output_dir")
+        kind = payload.get("kind", JobKind.CONVERT.value)
+        if not isinstance(kind, str) or kind not in {k.value for k in JobKind}:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown job kind: {kind!r}", [k.value for k in JobKind])
+        kind = JobKind(kind)
+
+        clips = self._read_clips(payload) if kind == JobKind.TRIM else []
+        if inputs is None and clips and all(clip.input_file for clip in clips):
+            inputs = list(dict.fromkeys(clip.input_file for clip in clips))
+        if not isinstance(inputs, list) or not inputs or not all(isinstance(i, str) for i in inputs):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'inputs' must be a non-empty list of paths")
+        if kind == JobKind.CONCAT and len(inputs) < 2:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Concatenation needs at least two inputs")
+        clip_inputs = [clip.input_file for clip in clips if clip.input_file and clip.input_file not in inputs]
+        if not isinstance(output_format, str) or output_format not in FORMAT_TYPES:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unsupported format: {output_format!r}")
+        renditions = self._read_renditions(payload, output_format) if kind == JobKind.LADDER else ()
+        packaging = self._read_packaging(payload, kind, output_format)
+        audio_tracks = self._read_audio_tracks(payload, kind, output_format)
+        if preset not in ("default", "custom", *QualityManager.PRESET_KEYS):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown preset: {preset!r}")
+        if output_dir is not None and not isinstance(output_dir, str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'output_dir' must be a string")
+        priority = self._read_priority(payload.get("priority", JobPriority.NORMAL.value))
+        deduplicate = payload.get("deduplicate")
+        if deduplicate is not None and not isinstance(deduplicate, bool):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'deduplicate' must be true or false")
+        name_template = payload.get("name_template")
+        if name_template is not None:
+            if not isinstance(name_template, str):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "'name_template' must be a string")
+            validate_template(name_template)
+        collision = payload.get("collision")
+        policies = {p.value for p in CollisionPolicy}
+        if collision is not None and (not isinstance(collision, str) or collision not in policies):
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"Unknown collision policy: {collision!r}",
+                [p.value for p in CollisionPolicy],
+            )
+
+        missing = [path for path in inputs + clip_inputs if not os.path.isfile(path)]
+        if missing:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Input files not found", missing)
+
+        plans = self.quality_manager.plan_batch(inputs + clip_inputs, output_format, preset)
+        incompatible = [path for path, flags in plans.items() if flags is None]
+        if incompatible:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"Inputs cannot be converted to {output_format}",
+                {path: VALID_OUTPUT_FORMATS.get(get_file_type(path), []) for path in incompatible},
+            )
+
+        if preset == "custom":
+            values = self._read_custom_values(payload, output_format)
+            flags = self.quality_manager.build_custom_flags(output_format, values)
+        else:
+            flags = list(self.quality_manager.get_command_plan(output_format, preset))
+
+        auto_quality = None
+        if payload.get("auto_quality") and preset in QualityManager.PRESET_KEYS:
+            if self.quality_manager.supports_auto_quality(output_format):
+                auto_quality = AutoQualitySearch(
+                    config=self.quality_manager.auto_quality_config,
+                    target_key=preset,
+                    probe_index=self.engine.probe_index,
+                )
+
+        loudness = None
+        loudness_name = payload.get("loudness")
+        if loudness_name:
+            targets = self.quality_manager.loudness_targets
+            target = targets.get(loudness_name) if isinstance(loudness_name, str) else None
+            if target is None:
+                raise ApiError(
+                    HTTPStatus.BAD_REQUEST,
+                    f"Unknown loudness target: {loudness_name}",
+                    sorted(targets),
+                )
+            if not self.quality_manager.supports_loudness(output_format):
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Loudness normalization is not available for {output_format}")
+            loudness = LoudnessNormalizer(
+                target_name=loudness_name,
+                target=target,
+                probe_index=self.engine.probe_index,
+            )
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        common = {
+            "preset": preset,
+            "name_template": name_template,
+            "collision": collision,
+            "auto_quality": auto_quality,
+            "loudness": loudness,
+            "packaging": packaging,
+            "priority": priority,
+        }
+        if kind == JobKind.CONCAT:
+            label = payload.get("name")
+            jobs = [ConversionJob(
+                inputs[0],
+                output_format,
+                output_dir,
+                list(flags),
+                kind=JobKind.CONCAT,
+                extra_inputs=inputs[1:],
+                label=label if isinstance(label, str) and label else None,
+                **common,
+            )]
+        elif kind == JobKind.TRIM:
+            jobs = []
+            for index, clip in enumerate(clips, start=1):
+                for path in [clip.input_file] if clip.input_file else inputs:
+                    jobs.append(ConversionJob(
+                        path,
+                        output_format,
+                        output_dir,
+                        list(flags),
+                        kind=JobKind.TRIM,
+                        start=clip.start,
+                        end=clip.end,
+                        label=clip_label(path, clip, index),
+                        **common,
+                    ))
+        elif kind == JobKind.LADDER:
+            jobs = [
+                ConversionJob(
+                    path, output_format, output_dir, list(flags), kind=JobKind.LADDER, renditions=renditions, **common,
+                )
+                for path in inputs
+            ]
+        else:
+            jobs = [
+                ConversionJob(path, output_format, output_dir, list(flags), audio_tracks=audio_tracks, **common)
+                for path in inputs
+            ]
+        if isinstance(self.engine, Coordinator):
+            # Workers convert on their own machines, so the coordinator does not merge duplicates.
+            batch_id = self.engine.submit(jobs)
+        else:
+            batch_id = self.engine.submit(jobs, deduplicate=deduplicate)
+        return {"batch_id": batch_id, "jobs": [job.to_dict() for job in jobs]}
+
+    def _read_priority(self, value: object) -> JobPriority:
+        if not isinstance(value, str) or value not in {p.value for p in JobPriority}:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown priority: {value!r}", [p.value for p in JobPriority])
+        return JobPriority(value)
+
+    def _read_renditions(self, payload: dict, output_format: str) -> tuple[Rendition, ...]:
+        if not self.quality_manager.supports_ladder(output_format):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"A resolution ladder is not available for {output_format}")
+        ladder = self.quality_manager.ladder
+        names = payload.get("renditions")
+        if names is None:
+            return ladder
+        known = {rendition.name: rendition for rendition in ladder}
+        if not isinstance(names, list) or not names or any(not isinstance(n, str) or n not in known for n in names):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'renditions' must list configured rendition names", list(known))
+        return tuple(known[name] for name in names)
+
+    def _read_custom_values(self, payload: dict, output_format: str) -> dict[str, str | int]:
+        values = payload.get("values", {})
+        if not isinstance(values, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'values' must be an object")
+        params = {param["name"]: param for param in self.quality_manager.get_custom_params(output_format)}
+        unknown = [name for name in values if name not in params]
+        if unknown:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown custom values for {output_format}", list(params))
+        for name, value in values.items():
+            param = params[name]
+            if param["type"] == "slider":
+                low, high = param.get("min"), param.get("max")
+                whole = isinstance(value, int) and not isinstance(value, bool)
+                if not whole or (low is not None and value < low) or (high is not None and value > high):
+                    raise ApiError(
+                        HTTPStatus.BAD_REQUEST,
+                        f"'{name}' must be a whole number in the allowed range",
+                        {"min": low, "max": high},
+                    )
+            elif not isinstance(value, str) or value not in param.get("options", ()):
+                raise ApiError(
+                    HTTPStatus.BAD_REQUEST, f"'{name}' must be one of the listed options", param.get("options", []),
+                )
+        return values
+
+    def _read_audio_tracks(self, payload: dict, kind: JobKind, output_format: str) -> tuple[int, ...]:
+        tracks = payload.get("audio_tracks")
+        if tracks is None:
+            return ()
+        if kind != JobKind.CONVERT or FORMAT_TYPES[output_format] != "audio":
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'audio_tracks' only applies to audio conversions")
+        valid = isinstance(tracks, list) and tracks and all(
+            isinstance(n, int) and not isinstance(n, bool) and n >= 1 for n in tracks
+        )
+        if not valid or len(set(tracks)) != len(tracks):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'audio_tracks' must list distinct track numbers starting at 1")
+        return tuple(n - 1 for n in tracks)
+
+    def _read_packaging(self, payload: dict, kind: JobKind, output_format: str) -> PackagingSpec | None:
+        name = payload.get("packaging")
+        if name is None:
+            return None
+        if not isinstance(name, str) or name not in {f.value for f in PackagingFormat}:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, f"Unknown packaging: {name!r}", [f.value for f in PackagingFormat],
+            )
+        if kind not in (JobKind.CONVERT, JobKind.LADDER):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"{kind.value} jobs cannot be packaged for streaming")
+        if not supports_packaging(output_format):
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"Streaming packages cannot be built from {output_format} output",
+                list(PACKAGING_OUTPUT_FORMATS),
+            )
+        return self.quality_manager.packaging_spec(name)
+
+    def _read_clips(self, payload: dict) -> list[Clip]:
+        clip_list = payload.get("clip_list")
+        if clip_list is not None:
+            if not isinstance(clip_list, str):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "'clip_list' must be a path to a CSV file")
+            try:
+                clips = load_clip_list(clip_list)
+            except OSError as e:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Cannot read clip list: {e}") from None
+        else:
+            entries = payload.get("clips")
+            if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Trim jobs need 'clips' or 'clip_list'")
+            clips = []
+            for entry in entries:
+                start = parse_timecode(entry.get("start", 0))
+                end = parse_timecode(entry["end"]) if entry.get("end") is not None else None
+                validate_range(start, end)
+                name = entry.get("name")
+                input_file = entry.get("input")
+                clips.append(Clip(
+                    start,
+                    end,
+                    name if isinstance(name, str) else None,
+                    input_file if isinstance(input_file, str) else None,
+                ))
+        if not clips:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Trim jobs need at least one clip")
+        return clips
+
+    def list_jobs(self, batch_id: int | None) -> list[dict]:
+        jobs = self.engine.journal.by_batch(batch_id) if batch_id is not None else self.engine.journal.all()
+        return [job.to_dict() for job in jobs]
+
+    def get_job(self, job_id: int) -> dict:
+        job = self.engine.journal.get(job_id)
+        if job is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No job with id {job_id}")
+        return job.to_dict()
+
+    def list_failures(self, batch_id: int | None) -> list[dict]:
+        return [job.to_dict() for job in self.engine.failed_jobs(batch_id)]
+
+    def failures_csv(self, batch_id: int | None) -> str:
+        buffer = io.StringIO()
+        write_failures_csv(self.engine.failed_jobs(batch_id), buffer)
+        return buffer.getvalue()
+
+    def retry_failures(self, payload: dict) -> dict:
+        job_ids = payload.get("job_ids")
+        batch_id = payload.get("batch_id")
+        if job_ids is not None and (
+            not isinstance(job_ids, list) or not all(isinstance(i, int) for i in job_ids)
+        ):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'job_ids' must be a list of integers")
+        if batch_id is not None and not isinstance(batch_id, int):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'batch_id' must be an integer")
+        new_batch = self.engine.retry_failed(job_ids, batch_id)
+        if new_batch is None:
+            raise ApiError(HTTPStatus.CONFLICT, "No failed jobs to retry")
+        return {"batch_id": new_batch, "jobs": self.list_jobs(new_batch)}
+
+    @property
+    def coordinator(self) -> Coordinator:
+        if not isinstance(self.engine, Coordinator):
+            raise ApiError(HTTPStatus.NOT_FOUND, "This server is not a cluster coordinator")
+        return self.engine
+
+    def register_worker(self, payload: dict) -> dict:
+        name = payload.get("name")
+        capacity = payload.get("capacity")
+        if not isinstance(name, str) or not name:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'name' must be a non-empty string")
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'capacity' must be a positive integer")
+        return self.coordinator.register(name, capacity)
+
+    def worker_request(self, worker_id: str, action: str, lease_id: str | None, payload: dict) -> dict:
+        coordinator = self.coordinator
+        if action == "heartbeat":
+            progress = payload.get("progress", {})
+            if not isinstance(progress, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "'progress' must map lease ids to fractions")
+            result = coordinator.heartbeat(worker_id, progress)
+        elif action == "lease":
+            slots = payload.get("slots", 1)
+            if not isinstance(slots, int) or slots < 1:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "'slots' must be a positive integer")
+            leases = coordinator.lease(worker_id, slots)
+            result = None if leases is None else {"leases": leases}
+        else:
+            accepted = coordinator.complete(worker_id, lease_id, payload)
+            result = None if accepted is None else {"accepted": accepted}
+        if result is None:
+            # 410 tells the worker to register again rather than retry.
+            raise ApiError(HTTPStatus.GONE, f"Unknown worker {worker_id}")
+        return result
+
+    def cancel_job(self, job_id: int) -> dict:
+        job = self.engine.journal.get(job_id)
+        if job is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No job with id {job_id}")
+        if not self.engine.cancel(job_id):
+            raise ApiError(HTTPStatus.CONFLICT, f"Job {job_id} is already {job.status.value}")
+        return job.to_dict()
+
+    def control_job(self, job_id: int, action: str, payload: dict) -> dict:
+        job = self.engine.journal.get(job_id)
+        if job is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No job with id {job_id}")
+        if action == "pause":
+            changed = self.engine.pause(job_id)
+        elif action == "resume":
+            changed = self.engine.resume(job_id)
+        elif action == "priority":
+            changed = self.engine.set_priority(job_id, self._read_priority(payload.get("priority")))
+        else:
+            position = payload.get("position")
+            if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "'position' must be a non-negative integer")
+            changed = self.engine.move(job_id, position)
+        if not changed:
+            raise ApiError(HTTPStatus.CONFLICT, f"Cannot {action} job {job_id} while it is {job.status.value}")
+        return {**job.to_dict(), "queue_position": self.engine.queue_position(job_id)}
+
+
+class _ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CobaltConverterAPI"
+
+    @property
+    def api(self) -> ApiServer:
+        return self.server.api
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug("API %s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: HTTPStatus, body: object) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status: HTTPStatus, text: str, content_type: str) -> None:
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, error: ApiError) -> None:
+        body = {"error": str(error)}
+        if error.details is not None:
+            body["details"] = error.details
+        self._send_json(error.status, body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}") from e
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return payload
+
+    def _authorize(self, path: str) -> None:
+        token = self.api.token
+        if token is None or path in _PUBLIC_PATHS:
+            return
+        scheme, _, supplied = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(supplied.strip().encode(), token.encode()):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Missing or invalid access token")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            self._authorize(url.path)
+            if method == "GET" and url.path == "/health":
+                self._send_json(HTTPStatus.OK, {"status": "ok"})
+            elif method == "GET" and url.path == "/metrics":
+                self._send_json(HTTPStatus.OK, self.api.engine.metrics.snapshot())
+            elif method == "GET" and url.path == "/events":
+                job_id = query.get("job", [None])[0]
+                self._stream_events(int(job_id) if job_id else None)
+            elif url.path == "/jobs" and method == "GET":
+                batch = query.get("batch", [None])[0]
+                self._send_json(HTTPStatus.OK, self.api.list_jobs(int(batch) if batch else None))
+            elif url.path == "/jobs" and method == "POST":
+                self._send_json(HTTPStatus.ACCEPTED, self.api.submit(self._read_json()))
+            elif url.path == "/failures" and method == "GET":
+                batch = query.get("batch", [None])[0]
+                batch_id = int(batch) if batch else None
+                if query.get("format", ["json"])[0] == "csv":
+                    self._send_text(HTTPStatus.OK, self.api.failures_csv(batch_id), "text/csv")
+                else:
+                    self._send_json(HTTPStatus.OK, self.api.list_failures(batch_id))
+            elif url.path == "/failures/retry" and method == "POST":
+                self._send_json(HTTPStatus.ACCEPTED, self.api.retry_failures(self._read_json()))
+            elif url.path == "/cluster/workers" and method == "GET":
+                self._send_json(HTTPStatus.OK, self.api.coordinator.workers())
+            elif url.path == "/cluster/workers" and method == "POST":
+                self._send_json(HTTPStatus.CREATED, self.api.register_worker(self._read_json()))
+            elif (match := _WORKER_PATH_RE.match(url.path)) and method == "POST":
+                action = "leases" if match.group(3) else match.group(2)
+                self._send_json(
+                    HTTPStatus.OK,
+                    self.api.worker_request(match.group(1), action, match.group(3), self._read_json()),
+                )
+            elif match := _JOB_PATH_RE.match(url.path):
+                job_id = int(match.group(1))
+                action = match.group(2)
+                if method == "GET" and action is None:
+                    self._send_json(HTTPStatus.OK, self.api.get_job(job_id))
+                elif (method == "DELETE" and action is None) or (method == "POST" and action == "cancel"):
+                    self._send_json(HTTPStatus.OK, self.api.cancel_job(job_id))
+                elif method == "POST" and action is not None:
+                    self._send_json(HTTPStatus.OK, self.api.control_job(job_id, action, self._read_json()))
+                else:
+                    raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {url.path}")
+            else:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+        except ApiError as e:
+            self._send_error(e)
+        except ValueError as e:
+            self._send_error(ApiError(HTTPStatus.BAD_REQUEST, str(e)))
+
+    def _stream_events(self, job_id: int | None) -> None:
+        events: queue.Queue[EngineEvent] = queue.Queue()
+
+        def on_event(event: EngineEvent) -> None:
+            if job_id is None or getattr(event, "job_id", None) == job_id:
+                events.put(event)
+
+        unsubscribe = self.api.engine.events.subscribe(on_event)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                data = json.dumps(event_to_dict(event), ensure_ascii=False)
+                self.wfile.write(f"event: {type(event).__name__}\ndata: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logging.debug("Event stream client disconnected")
+        finally:
+            unsubscribe()
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    debug: bool = False,
+    staging: StagingMode | None = None,
+    coordinator: bool = False,
+    memory_budget: str | None = None,
+    token: str | None = None,
+) -> None:
+    settings = SettingsManager()
+    debug = debug or settings.debug
+    log_path = setup_logging(debug=debug, level=settings.log_level)
+    logging.info(
+        "Starting CobaltConverter %s (debug=%s, log=%s)",
+        "cluster coordinator" if coordinator else "API server", debug, log_path,
+    )
+    start_config_watcher()
+    cache_dir = settings.cache_dir
+    probe_index = ProbeIndex(os.path.join(cache_dir, "probe_index.json") if cache_dir else None)
+    if coordinator:
+        engine = Coordinator()
+        engine.probe_index = probe_index
+    else:
+        engine = ConversionEngine(
+            max_jobs=settings.max_jobs,
+            staging=StagingManager(
+                mode=StagingMode(staging) if staging else settings.staging_mode, scratch_dir=settings.scratch_dir,
+            ),
+            probe_index=probe_index,
+        )
+        engine.thread_budget = settings.thread_budget
+        engine.hardware_backend = settings.hardware_backend
+        engine.memory_budget = MemoryBudget.from_setting(memory_budget)
+    try:
+        server = ApiServer(engine, QualityManager(), host, port, token)
+    except ValueError as e:
+        logging.error("%s; pass --token or set %s", e, TOKEN_ENV)
+        engine.shutdown()
+        raise SystemExit(2) from e
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("API server interrupted, shutting down")
+    finally:
+        server.engine.shutdown()
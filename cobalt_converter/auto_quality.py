@@ -0,0 +1,184 @@
+import logging
+import os
+import re
+import subprocess
+import tempfile
+
+from cobalt_converter.probe import ProbeIndex
+from cobalt_converter.supervisor import CommandRunner
+from cobalt_converter.utils import get_subprocess_env, get_subprocess_flags
+
+_SCORE_PATTERNS = {
+    "vmaf": re.compile(r"VMAF score[:=]\s*([\d.]+)"),
+    "ssim": re.compile(r"SSIM .*All:([\d.]+)"),
+    "psnr": re.compile(r"PSNR .*average:([\d.]+|inf)"),
+}
+
+_SAMPLE_TIMEOUT = 600
+
+_vmaf_support: dict[str, bool] = {}
+
+
+def has_libvmaf(ffmpeg_path: str) -> bool:
+    if ffmpeg_path not in _vmaf_support:
+        try:
+            result = subprocess.run(
+                [ffmpeg_path, "-hide_banner", "-filters"],
+                capture_output=True,
+                text=True,
+                timeout=10,
+                env=get_subprocess_env(),
+                **get_subprocess_flags(),
+            )
+            _vmaf_support[ffmpeg_path] = " libvmaf " in result.stdout
+        except (OSError, subprocess.TimeoutExpired):
+            _vmaf_support[ffmpeg_path] = False
+    return _vmaf_support[ffmpeg_path]
+
+
+def replace_flag(flags: list[str], flag: str, value: str) -> list[str]:
+    result = list(flags)
+    if flag in result:
+        position = result.index(flag)
+        if position + 1 < len(result):
+            result[position + 1] = value
+            return result
+    return result + [flag, value]
+
+
+class AutoQualitySearch:
+    def __init__(
+        self,
+        config: dict,
+        target_key: str,
+        probe_index: ProbeIndex,
+    ) -> None:
+        self._config = config
+        self._target_key = target_key
+        self._probe_index = probe_index
+
+    @property
+    def target_key(self) -> str:
+        return self._target_key
+
+    def _metric_for(self, ffmpeg_path: str) -> str:
+        metric = self._config.get("metric", "ssim")
+        if self._config.get("prefer_vmaf", True) and has_libvmaf(ffmpeg_path):
+            return "vmaf"
+        return metric
+
+    def find_crf(
+        self, ffmpeg_path: str, input_file: str, output_format: str, base_flags: list[str], run: CommandRunner,
+    ) -> int | None:
+        metric = self._metric_for(ffmpeg_path)
+        target = self._config.get("targets", {}).get(metric, {}).get(self._target_key)
+        if target is None:
+            logging.warning("No %s target configured for preset %s", metric, self._target_key)
+            return None
+
+        cache_key = f"{output_format}:{metric}:{target}:{' '.join(base_flags)}"
+        cached = self._probe_index.get(input_file, "auto_crf") or {}
+        if cache_key in cached:
+            logging.info("Using cached CRF %s for %s", cached[cache_key], input_file)
+            return cached[cache_key]
+
+        info = self._probe_index.probe(ffmpeg_path, input_file)
+        if info is None or not info.video_streams:
+            return None
+
+        offsets = self._sample_offsets(info.duration)
+        crf = self._search(ffmpeg_path, input_file, output_format, base_flags, metric, float(target), offsets, run)
+        if crf is not None:
+            cached[cache_key] = crf
+            self._probe_index.set(input_file, "auto_crf", cached)
+            self._probe_index.save()
+            logging.info("Selected CRF %d for %s (%s >= %s)", crf, input_file, metric, target)
+        return crf
+
+    def _sample_offsets(self, duration: float | None) -> list[float]:
+        count = int(self._config.get("sample_count", 3))
+        length = float(self._config.get("sample_seconds", 4))
+        if not duration or duration <= length * count:
+            return [0.0]
+        return [round(duration * (i + 1) / (count + 1) - length / 2, 3) for i in range(count)]
+
+    def _search(
+        self,
+        ffmpeg_path: str,
+        input_file: str,
+        output_format: str,
+        base_flags: list[str],
+        metric: str,
+        target: float,
+        offsets: list[float],
+        run: CommandRunner,
+    ) -> int | None:
+        low = int(self._config.get("crf_min", 14))
+        high = int(self._config.get("crf_max", 40))
+        best = low
+        with tempfile.TemporaryDirectory(prefix="cobalt_autocrf_") as work_dir:
+            while low <= high:
+                crf = (low + high) // 2
+                flags = replace_flag(base_flags, "-crf", str(crf))
+                score = self._score(ffmpeg_path, input_file, output_format, flags, metric, offsets, work_dir, run)
+                if score is None:
+                    return None
+                logging.debug("Auto CRF probe %s crf=%d %s=%.4f", input_file, crf, metric, score)
+                if score >= target:
+                    best = crf
+                    low = crf + 1
+                else:
+                    high = crf - 1
+        return best
+
+    def _score(
+        self,
+        ffmpeg_path: str,
+        input_file: str,
+        output_format: str,
+        flags: list[str],
+        metric: str,
+        offsets: list[float],
+        work_dir: str,
+        run: CommandRunner,
+    ) -> float | None:
+        length = str(self._config.get("sample_seconds", 4))
+        scores: list[float] = []
+        for i, offset in enumerate(offsets):
+            sample = os.path.join(work_dir, f"sample_{i}.{output_format}")
+            window = ["-ss", str(offset), "-t", length]
+            encode = [ffmpeg_path, "-hide_banner", "-y", *window, "-i", input_file,
+                      "-map", "0:v:0", "-an", "-sn", *flags, sample]
+            if self._run(run, encode) is None:
+                return None
+
+            if metric == "vmaf":
+                graph = "[1:v][0:v]scale2ref[d][r];[d][r]libvmaf"
+            else:
+                graph = f"[1:v][0:v]scale2ref[d][r];[d][r]{metric}"
+            measure = [ffmpeg_path, "-hide_banner", *window, "-i", input_file,
+                       "-i", sample, "-lavfi", graph, "-f", "null", "-"]
+            output = self._run(run, measure)
+            match = _SCORE_PATTERNS[metric].search(output or "")
+            if not match:
+                logging.warning("Could not read %s score for %s", metric, input_file)
+                return None
+            value = match.group(1)
+            scores.append(100.0 if value == "inf" else float(value))
+        return sum(scores) / len(scores)
+
+    @staticmethod
+    def _run(run: CommandRunner, cmd: list[str]) -> str | None:
+        logging.debug("Running command: %s", " ".join(cmd))
+        try:
+            result = run(cmd, _SAMPLE_TIMEOUT)
+        except OSError as e:
+            logging.error("Auto quality sample failed: %s", e)
+            return None
+        if result.stop_reason is not None:
+            logging.info("Auto quality sample stopped (%s)", result.stop_reason)
+            return None
+        if result.returncode != 0:
+            logging.error("Auto quality sample exited with code %d", result.returncode)
+            return None
+        return "\n".join(result.output or [])
@@ -0,0 +1,395 @@
+import collections
+import itertools
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from cobalt_converter.cluster.protocol import (
+    DEFAULT_HEARTBEAT_SECONDS,
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_LEASE_ATTEMPTS,
+    job_to_spec,
+)
+from cobalt_converter.events import (
+    BatchFinished,
+    BatchProgress,
+    EventBus,
+    JobCancelled,
+    JobFailed,
+    JobFinished,
+    JobProgress,
+    JobQueued,
+    JobReprioritized,
+    JobRetrying,
+    JobStarted,
+)
+from cobalt_converter.failures import FailureInfo, FailureKind
+from cobalt_converter.jobs import (
+    ConversionJob,
+    JobJournal,
+    JobPriority,
+    JobStatus,
+    enqueue_by_priority,
+    move_in_queue,
+    next_id,
+)
+from cobalt_converter.metrics import EngineMetrics
+from cobalt_converter.naming import OutputNamer, batch_source_root, output_paths, source_fingerprint
+from cobalt_converter.probe import ProbeIndex
+
+_FINAL_STATUSES = {status.value: status for status in (
+    JobStatus.DONE, JobStatus.SKIPPED, JobStatus.FAILED, JobStatus.CANCELLED,
+)}
+
+
+@dataclass
+class WorkerInfo:
+    id: str
+    name: str
+    capacity: int
+    last_seen: float
+    leases: set[str] = field(default_factory=set)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "capacity": self.capacity,
+            "running": len(self.leases),
+            "seconds_since_heartbeat": round(time.monotonic() - self.last_seen, 3),
+        }
+
+
+@dataclass
+class Lease:
+    id: str
+    job: ConversionJob
+    worker_id: str
+    expires_at: float
+
+
+@dataclass
+class _BatchState:
+    total: int
+    completed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
+
+class Coordinator:
+    def __init__(
+        self,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+        max_attempts: int = DEFAULT_MAX_LEASE_ATTEMPTS,
+        events: EventBus | None = None,
+    ) -> None:
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.events = events or EventBus()
+        self.metrics = EngineMetrics(self.events)
+        self.journal = JobJournal()
+        self.probe_index = ProbeIndex()
+        self.namer = OutputNamer()
+        self._lock = threading.Lock()
+        self._queue: collections.deque[ConversionJob] = collections.deque()
+        self._batches: dict[int, _BatchState] = {}
+        self._workers: dict[str, WorkerInfo] = {}
+        self._leases: dict[str, Lease] = {}
+        self._started = itertools.count(1)
+        self._stop_requested = False
+        self._closed = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop_requested
+
+    def submit(self, jobs: list[ConversionJob]) -> int:
+        batch_id = next_id()
+        source_root = batch_source_root([job.input_file for job in jobs])
+        with self._lock:
+            self._stop_requested = False
+            self._batches[batch_id] = _BatchState(total=len(jobs))
+            for job in jobs:
+                job.batch_id = batch_id
+                if job.source_root is None:
+                    job.source_root = source_root
+                self.journal.add(job)
+                enqueue_by_priority(self._queue, job)
+        for job in jobs:
+            self.events.publish(JobQueued(job.id, batch_id, job.input_file, job.output_format))
+        if not jobs:
+            self.events.publish(BatchFinished(batch_id, 0, 0, 0, stopped=False))
+        return batch_id
+
+    def cancel(self, job_id: int) -> bool:
+        job = self.journal.get(job_id)
+        if job is None or job.status.is_terminal:
+            return False
+        with self._lock:
+            queued = job in self._queue
+            if queued:
+                self._queue.remove(job)
+        if queued:
+            self._complete(job, JobStatus.CANCELLED)
+        else:
+            # The worker holding the lease learns about it on its next heartbeat.
+            job.status = JobStatus.CANCELLED
+        return True
+
+    def queue_position(self, job_id: int) -> int | None:
+        with self._lock:
+            for position, job in enumerate(self._queue):
+                if job.id == job_id:
+                    return position
+        return None
+
+    def set_priority(self, job_id: int, priority: JobPriority | str) -> bool:
+        priority = JobPriority(priority)
+        job = self.journal.get(job_id)
+        if job is None or job.status.is_terminal:
+            return False
+        with self._lock:
+            job.priority = priority
+            if job in self._queue:
+                self._queue.remove(job)
+                enqueue_by_priority(self._queue, job)
+        self.events.publish(JobReprioritized(job.id, priority.value, self.queue_position(job.id)))
+        return True
+
+    def move(self, job_id: int, position: int) -> bool:
+        job = self.journal.get(job_id)
+        if job is None:
+            return False
+        with self._lock:
+            if job not in self._queue:
+                return False
+            move_in_queue(self._queue, job, position)
+            position = self._queue.index(job)
+        self.events.publish(JobReprioritized(job.id, job.priority.value, position))
+        return True
+
+    def pause(self, job_id: int) -> bool:
+        # Leased jobs run on other machines; only their queue order is controlled here.
+        return False
+
+    def resume(self, job_id: int) -> bool:
+        return False
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop_requested = True
+            pending = list(self._queue)
+            self._queue.clear()
+            for lease in self._leases.values():
+                lease.job.status = JobStatus.CANCELLED
+        for job in pending:
+            self._complete(job, JobStatus.CANCELLED)
+
+    def failed_jobs(self, batch_id: int | None = None) -> list[ConversionJob]:
+        return self.journal.failed(batch_id)
+
+    def retry_failed(self, job_ids: list[int] | None = None, batch_id: int | None = None) -> int | None:
+        failed = self.journal.failed(batch_id)
+        if job_ids is not None:
+            wanted = set(job_ids)
+            failed = [job for job in failed if job.id in wanted]
+        if not failed:
+            return None
+        jobs = []
+        for job in failed:
+            job.status = JobStatus.RETRIED
+            jobs.append(job.copy_for_retry())
+        logging.info("Retrying %d failed job(s) on the cluster", len(jobs))
+        return self.submit(jobs)
+
+    def shutdown(self) -> None:
+        self.stop()
+        self._closed.set()
+        self.probe_index.save()
+
+    def workers(self) -> list[dict]:
+        with self._lock:
+            return [worker.to_dict() for worker in self._workers.values()]
+
+    def register(self, name: str, capacity: int) -> dict:
+        worker = WorkerInfo(uuid.uuid4().hex, name, max(1, capacity), time.monotonic())
+        with self._lock:
+            self._workers[worker.id] = worker
+        logging.info("Worker %s registered with %d slot(s)", name, worker.capacity)
+        return {
+            "worker_id": worker.id,
+            "lease_seconds": self.lease_seconds,
+            "heartbeat_seconds": self.heartbeat_seconds,
+        }
+
+    def heartbeat(self, worker_id: str, progress: dict[str, float | None]) -> dict | None:
+        now = time.monotonic()
+        cancelled = []
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is None:
+                return None
+            worker.last_seen = now
+            for lease_id in worker.leases:
+                lease = self._leases[lease_id]
+                if lease_id in progress:
+                    lease.expires_at = now + self.lease_seconds
+                    lease.job.progress = progress[lease_id]
+                if lease.job.status == JobStatus.CANCELLED:
+                    cancelled.append(lease_id)
+            leases = [self._leases[lease_id] for lease_id in worker.leases if lease_id in progress]
+        for lease in leases:
+            self.events.publish(JobProgress(
+                lease.job.id, "encoding", f"{worker.name}: {lease.job.filename}", lease.job.progress,
+            ))
+        # Leases the worker no longer reports are left to expire and are then handed to another node.
+        return {"cancel": cancelled}
+
+    def lease(self, worker_id: str, slots: int) -> list[dict] | None:
+        granted = []
+        while True:
+            with self._lock:
+                worker = self._workers.get(worker_id)
+                if worker is None:
+                    return None
+                worker.last_seen = time.monotonic()
+                if len(granted) >= slots or len(worker.leases) >= worker.capacity or not self._queue:
+                    return granted
+                job = self._queue.popleft()
+            lease = self._grant(worker, job)
+            if lease is not None:
+                granted.append({"lease_id": lease.id, "job": job_to_spec(job)})
+
+    def complete(self, worker_id: str, lease_id: str, result: dict) -> bool | None:
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is None:
+                return None
+            worker.last_seen = time.monotonic()
+            lease = self._leases.get(lease_id)
+            if lease is None or lease.worker_id != worker_id:
+                # A lease that expired and moved to another worker no longer belongs to this one.
+                return False
+            del self._leases[lease_id]
+            worker.leases.discard(lease_id)
+
+        job = lease.job
+        status = _FINAL_STATUSES.get(result.get("status"), JobStatus.FAILED)
+        if status == JobStatus.CANCELLED and job.status != JobStatus.CANCELLED:
+            self._requeue(job, f"{worker.name} gave the job back")
+            return True
+        if status == JobStatus.FAILED:
+            kind = result.get("failure_kind")
+            job.error = result.get("error") or "unknown error"
+            job.failure = FailureInfo(
+                FailureKind(kind) if kind in {k.value for k in FailureKind} else FailureKind.UNKNOWN, job.error,
+            )
+        elif status == JobStatus.DONE:
+            job.progress = 1.0
+            for path in output_paths(job, job.output_file):
+                self.probe_index.set(path, "origin", job.fingerprint)
+        self._complete(job, status)
+        return True
+
+    def _grant(self, worker: WorkerInfo, job: ConversionJob) -> Lease | None:
+        # Names are claimed here, not on the workers, so two nodes never pick the same output.
+        job.output_file, skip = self.namer.claim(job, origin=lambda path: self.probe_index.get(path, "origin"))
+        if skip:
+            self._complete(job, JobStatus.SKIPPED)
+            return None
+        job.fingerprint = job.fingerprint or source_fingerprint(job)
+        lease = Lease(uuid.uuid4().hex, job, worker.id, time.monotonic() + self.lease_seconds)
+        with self._lock:
+            self._leases[lease.id] = lease
+            worker.leases.add(lease.id)
+            batch = self._batches.get(job.batch_id)
+            job.status = JobStatus.RUNNING
+            job.attempts += 1
+            job.started_at = job.started_at or time.time()
+        logging.info("Leased %s to %s (attempt %d)", job.filename, worker.name, job.attempts)
+        self.events.publish(JobStarted(
+            job.id, job.input_file, job.output_file, next(self._started), batch.total if batch else 1,
+        ))
+        return lease
+
+    def _requeue(self, job: ConversionJob, reason: str) -> None:
+        if job.status == JobStatus.CANCELLED or self._stop_requested:
+            self._complete(job, JobStatus.CANCELLED)
+            return
+        if job.attempts >= self.max_attempts:
+            job.error = f"{reason} after {job.attempts} attempt(s)"
+            job.failure = FailureInfo(FailureKind.KILLED, job.error)
+            self._complete(job, JobStatus.FAILED)
+            return
+        logging.warning("Requeueing %s: %s", job.filename, reason)
+        job.status = JobStatus.QUEUED
+        with self._lock:
+            enqueue_by_priority(self._queue, job, ahead=True)
+        self.events.publish(JobRetrying(job.id, job.input_file, job.attempts, 0.0, reason))
+
+    def _reap_loop(self) -> None:
+        while not self._closed.wait(min(self.heartbeat_seconds, self.lease_seconds / 2)):
+            try:
+                self._reap()
+            except Exception:
+                logging.exception("Lease reaper failed")
+
+    def _reap(self) -> None:
+        now = time.monotonic()
+        expired: list[tuple[Lease, str]] = []
+        with self._lock:
+            dropped = {}
+            for worker in list(self._workers.values()):
+                if now - worker.last_seen > self.lease_seconds:
+                    logging.warning("Worker %s missed its heartbeats, dropping it", worker.name)
+                    dropped[worker.id] = self._workers.pop(worker.id)
+            for lease in list(self._leases.values()):
+                worker = self._workers.get(lease.worker_id) or dropped.get(lease.worker_id)
+                if lease.worker_id in dropped or worker is None or lease.expires_at < now:
+                    del self._leases[lease.id]
+                    if worker is not None:
+                        worker.leases.discard(lease.id)
+                    expired.append((lease, worker.name if worker else lease.worker_id[:8]))
+        for lease, worker_name in expired:
+            self._requeue(lease.job, f"lease on {worker_name} expired")
+
+    def _complete(self, job: ConversionJob, status: JobStatus) -> None:
+        self.namer.release(job.id)
+        with self._lock:
+            if job.finished_at is not None:
+                return
+            job.status = status
+            job.finished_at = time.time()
+            batch = self._batches.get(job.batch_id)
+            if batch is not None:
+                batch.completed += 1
+                if status in (JobStatus.DONE, JobStatus.SKIPPED):
+                    batch.succeeded += 1
+                elif status == JobStatus.FAILED:
+                    batch.failed += 1
+                if batch.completed >= batch.total:
+                    del self._batches[job.batch_id]
+
+        if status == JobStatus.DONE:
+            self.events.publish(JobFinished(job.id, job.input_file, job.output_file))
+        elif status == JobStatus.SKIPPED:
+            self.events.publish(JobFinished(job.id, job.input_file, job.output_file, skipped=True))
+        elif status == JobStatus.FAILED:
+            kind = job.failure.kind.value if job.failure else FailureKind.UNKNOWN.value
+            self.events.publish(JobFailed(job.id, job.input_file, job.error or "unknown error", kind))
+        elif status == JobStatus.CANCELLED:
+            self.events.publish(JobCancelled(job.id, job.input_file))
+
+        if batch is None:
+            return
+        self.events.publish(BatchProgress(job.batch_id, batch.completed, batch.total))
+        if batch.completed >= batch.total:
+            self.events.publish(BatchFinished(
+                job.batch_id, batch.total, batch.succeeded, batch.failed, stopped=self._stop_requested,
+            ))
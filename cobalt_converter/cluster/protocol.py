@@ -0,0 +1,118 @@
+import json
+import os
+import urllib.error
+import urllib.request
+from dataclasses import asdict
+from http import HTTPStatus
+
+from cobalt_converter.auto_quality import AutoQualitySearch
+from cobalt_converter.exceptions import ClusterError, CoordinatorUnavailableError, WorkerNotRegisteredError
+from cobalt_converter.jobs import ConversionJob
+from cobalt_converter.loudness import LoudnessNormalizer
+from cobalt_converter.naming import CollisionPolicy
+from cobalt_converter.packaging import PackagingFormat, PackagingSpec
+from cobalt_converter.plans import JobKind
+from cobalt_converter.probe import ProbeIndex
+from cobalt_converter.quality_manager import QualityManager
+from cobalt_converter.scaling import Rendition
+
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_HEARTBEAT_SECONDS = 5.0
+DEFAULT_MAX_LEASE_ATTEMPTS = 3
+CORES_PER_JOB = 4
+
+_REQUEST_TIMEOUT = 10.0
+
+
+def default_capacity() -> int:
+    # ffmpeg already spreads one encode over several cores; a slot per few cores keeps nodes from thrashing.
+    return max(1, (os.cpu_count() or 1) // CORES_PER_JOB)
+
+
+def job_to_spec(job: ConversionJob) -> dict:
+    return {
+        "input_file": job.input_file,
+        "output_format": job.output_format,
+        "output_file": job.output_file,
+        "quality_flags": list(job.quality_flags),
+        "preset": job.preset,
+        "kind": job.kind.value,
+        "start": job.start,
+        "end": job.end,
+        "extra_inputs": list(job.extra_inputs),
+        "renditions": [
+            {"name": r.name, **asdict(r.limit), "flags": list(r.flags)} for r in job.renditions
+        ],
+        "audio_tracks": list(job.audio_tracks),
+        "packaging": (
+            {"format": job.packaging.format.value, "segment_seconds": job.packaging.segment_seconds}
+            if job.packaging else None
+        ),
+        "auto_quality": job.auto_quality.target_key if job.auto_quality is not None else None,
+        "loudness": job.loudness.target_name if job.loudness is not None else None,
+    }
+
+
+def job_from_spec(
+    spec: dict,
+    quality_manager: QualityManager,
+    probe_index: ProbeIndex,
+) -> ConversionJob:
+    # The coordinator already claimed the output name, so the worker writes exactly there.
+    output_folder, output_name = os.path.split(spec["output_file"])
+    packaging = spec.get("packaging")
+    if packaging:
+        packaging = PackagingSpec(PackagingFormat(packaging["format"]), packaging["segment_seconds"])
+    auto_quality = None
+    if spec.get("auto_quality") and quality_manager.supports_auto_quality(spec["output_format"]):
+        auto_quality = AutoQualitySearch(
+            config=quality_manager.auto_quality_config,
+            target_key=spec["auto_quality"],
+            probe_index=probe_index,
+        )
+    loudness = None
+    target = quality_manager.loudness_targets.get(spec.get("loudness") or "")
+    if target is not None:
+        loudness = LoudnessNormalizer(spec["loudness"], target, probe_index)
+    return ConversionJob(
+        spec["input_file"],
+        spec["output_format"],
+        output_folder,
+        list(spec.get("quality_flags", [])),
+        preset=spec.get("preset", "default"),
+        name_template="{stem}",
+        collision=CollisionPolicy.OVERWRITE.value,
+        kind=JobKind(spec.get("kind", JobKind.CONVERT.value)),
+        start=spec.get("start"),
+        end=spec.get("end"),
+        extra_inputs=list(spec.get("extra_inputs", [])),
+        renditions=tuple(Rendition.from_dict(r) for r in spec.get("renditions", [])),
+        audio_tracks=tuple(spec.get("audio_tracks", [])),
+        label=os.path.splitext(output_name)[0],
+        packaging=packaging or None,
+        auto_quality=auto_quality,
+        loudness=loudness,
+    )
+
+
+def post_json(url: str, payload: dict, timeout: float = _REQUEST_TIMEOUT, token: str | None = None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        if e.code == HTTPStatus.GONE:
+            raise WorkerNotRegisteredError(f"{url}: worker is not registered") from e
+        if e.code == HTTPStatus.UNAUTHORIZED:
+            raise ClusterError(f"{url}: the coordinator rejected this worker's access token") from e
+        raise ClusterError(f"{url}: HTTP {e.code}") from e
+    except (urllib.error.URLError, OSError, json.JSONDecodeError) as e:
+        raise CoordinatorUnavailableError(f"{url}: {e}") from e
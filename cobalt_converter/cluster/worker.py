@@ -0,0 +1,193 @@
+import logging
+import os
+import socket
+import threading
+
+from cobalt_converter.cluster.protocol import (
+    DEFAULT_HEARTBEAT_SECONDS,
+    default_capacity,
+    job_from_spec,
+    post_json,
+)
+from cobalt_converter.config_store import start_config_watcher
+from cobalt_converter.converter import ConversionEngine
+from cobalt_converter.events import BatchFinished, EngineEvent
+from cobalt_converter.exceptions import ClusterError, WorkerNotRegisteredError
+from cobalt_converter.jobs import ConversionJob, JobStatus
+from cobalt_converter.memory import MemoryBudget
+from cobalt_converter.probe import ProbeIndex
+from cobalt_converter.quality_manager import QualityManager
+from cobalt_converter.settings_manager import SettingsManager
+from cobalt_converter.staging import StagingManager, StagingMode
+from cobalt_converter.utils import setup_logging
+
+DEFAULT_POLL_SECONDS = 2.0
+_REPORT_ATTEMPTS = 3
+
+
+class ClusterWorker:
+    def __init__(
+        self,
+        coordinator_url: str,
+        engine: ConversionEngine,
+        quality_manager: QualityManager,
+        name: str | None = None,
+        capacity: int | None = None,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        token: str | None = None,
+    ) -> None:
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.token = token
+        self.engine = engine
+        self.quality_manager = quality_manager
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.capacity = max(1, capacity or default_capacity())
+        self.poll_seconds = poll_seconds
+        self.engine.max_jobs = self.capacity
+        self._lock = threading.Lock()
+        self._jobs: dict[str, ConversionJob] = {}
+        self._worker_id: str | None = None
+        self._heartbeat_seconds = DEFAULT_HEARTBEAT_SECONDS
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self.engine.events.subscribe(self._on_batch_finished, (BatchFinished,))
+
+    def run(self) -> None:
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        while not self._closed.is_set():
+            try:
+                if self._worker_id is None:
+                    self._register()
+                with self._lock:
+                    free = self.capacity - len(self._jobs)
+                if free > 0:
+                    response = self._post(f"/cluster/workers/{self._worker_id}/lease", {"slots": free})
+                    for lease in response.get("leases", []):
+                        self._start(lease["lease_id"], lease["job"])
+                    if response.get("leases"):
+                        continue
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+            except WorkerNotRegisteredError:
+                self._drop_leases()
+            except ClusterError as e:
+                logging.warning("Coordinator request failed: %s", e)
+                self._closed.wait(self.poll_seconds)
+
+    def stop(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        # Local jobs report back as cancelled, which hands them to another worker.
+        self.engine.stop()
+
+    def _post(self, path: str, payload: dict) -> dict:
+        return post_json(self.coordinator_url + path, payload, token=self.token)
+
+    def _register(self) -> None:
+        response = self._post("/cluster/workers", {"name": self.name, "capacity": self.capacity})
+        self._worker_id = response["worker_id"]
+        self._heartbeat_seconds = float(response.get("heartbeat_seconds", DEFAULT_HEARTBEAT_SECONDS))
+        logging.info("Registered with %s as %s (%d slot(s))", self.coordinator_url, self.name, self.capacity)
+
+    def _start(self, lease_id: str, spec: dict) -> None:
+        job = job_from_spec(spec, self.quality_manager, self.engine.probe_index)
+        with self._lock:
+            self._jobs[lease_id] = job
+        logging.info("Lease %s: converting %s", lease_id[:8], job.input_file)
+        self.engine.submit([job])
+
+    def _drop_leases(self) -> None:
+        logging.warning("Coordinator no longer knows this worker; abandoning local jobs and registering again")
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._worker_id = None
+        for job in jobs:
+            self.engine.cancel(job.id)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._closed.wait(self._heartbeat_seconds):
+            worker_id = self._worker_id
+            if worker_id is None:
+                continue
+            with self._lock:
+                progress = {lease_id: job.progress for lease_id, job in self._jobs.items()}
+            try:
+                response = self._post(f"/cluster/workers/{worker_id}/heartbeat", {"progress": progress})
+            except WorkerNotRegisteredError:
+                self._drop_leases()
+                self._wake.set()
+                continue
+            except ClusterError as e:
+                logging.warning("Heartbeat failed: %s", e)
+                continue
+            for lease_id in response.get("cancel", []):
+                with self._lock:
+                    job = self._jobs.get(lease_id)
+                if job is not None:
+                    logging.info("Coordinator cancelled %s", job.input_file)
+                    self.engine.cancel(job.id)
+
+    def _on_batch_finished(self, event: EngineEvent) -> None:
+        with self._lock:
+            lease_id = next((lid for lid, job in self._jobs.items() if job.batch_id == event.batch_id), None)
+            job = self._jobs.pop(lease_id, None) if lease_id else None
+            worker_id = self._worker_id
+        if job is None or worker_id is None:
+            return
+        threading.Thread(target=self._report, args=(worker_id, lease_id, job), daemon=True).start()
+        self._wake.set()
+
+    def _report(self, worker_id: str, lease_id: str, job: ConversionJob) -> None:
+        status = job.status if job.status.is_terminal else JobStatus.FAILED
+        payload = {
+            "status": status.value,
+            "output_file": job.output_file,
+            "error": job.error,
+            "failure_kind": job.failure.kind.value if job.failure else None,
+        }
+        for attempt in range(1, _REPORT_ATTEMPTS + 1):
+            try:
+                self._post(f"/cluster/workers/{worker_id}/leases/{lease_id}", payload)
+                return
+            except WorkerNotRegisteredError:
+                return
+            except ClusterError as e:
+                logging.warning("Could not report lease %s (attempt %d): %s", lease_id[:8], attempt, e)
+                self._closed.wait(self.poll_seconds)
+        # The lease expires on the coordinator and the job runs again elsewhere.
+
+
+def run_worker(
+    coordinator_url: str,
+    capacity: int | None = None,
+    name: str | None = None,
+    debug: bool = False,
+    staging: StagingMode | None = None,
+    memory_budget: str | None = None,
+    token: str | None = None,
+) -> None:
+    settings = SettingsManager()
+    log_path = setup_logging(debug=debug or settings.debug, level=settings.log_level)
+    logging.info("Starting CobaltConverter worker for %s (log=%s)", coordinator_url, log_path)
+    start_config_watcher()
+    cache_dir = settings.cache_dir
+    # The worker's parallelism is its --capacity, so max_jobs from the settings file does not apply here.
+    engine = ConversionEngine(
+        staging=StagingManager(
+            mode=StagingMode(staging) if staging else settings.staging_mode, scratch_dir=settings.scratch_dir,
+        ),
+        probe_index=ProbeIndex(os.path.join(cache_dir, "probe_index.json") if cache_dir else None),
+    )
+    engine.thread_budget = settings.thread_budget
+    engine.hardware_backend = settings.hardware_backend
+    engine.memory_budget = MemoryBudget.from_setting(memory_budget)
+    worker = ClusterWorker(coordinator_url, engine, QualityManager(), name=name, capacity=capacity, token=token)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        logging.info("Worker interrupted, shutting down")
+    finally:
+        worker.stop()
+        engine.shutdown()
@@ -0,0 +1,159 @@
+from cobalt_converter.hwaccel import HardwareBackend
+from cobalt_converter.scaling import SCALERS
+
+_STRING = {"type": "string"}
+_INTEGER = {"type": "integer"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+_CUSTOM_PARAM = {
+    "type": "object",
+    "required": ["name", "type", "flag", "default"],
+    "properties": {
+        "name": _STRING,
+        "type": {"type": "string", "enum": ["slider", "choice"]},
+        "flag": _STRING,
+        "min": _INTEGER,
+        "max": _INTEGER,
+        "step": _INTEGER,
+        "suffix": _STRING,
+        "options": _STRING_LIST,
+    },
+}
+
+_SCALE_LIMIT_PROPERTIES = {
+    "max_width": _INTEGER,
+    "max_height": _INTEGER,
+    "max_fps": {"type": "number"},
+    "scaler": {"type": "string", "enum": list(SCALERS)},
+}
+
+_PRESET_GROUP = {
+    "type": "object",
+    "properties": {
+        "presets": {"type": "object", "values": _STRING_LIST},
+        "limits": {"type": "object", "values": {"type": "object", "properties": _SCALE_LIMIT_PROPERTIES}},
+        "custom": {"type": "array", "items": _CUSTOM_PARAM},
+    },
+}
+
+FORMATS_SCHEMA = {
+    "type": "object",
+    "required": [
+        "app_name", "app_version", "app_author", "app_author_he",
+        "window_width", "window_height", "window_min_width", "window_min_height",
+        "video", "audio", "image", "languages",
+    ],
+    "properties": {
+        "app_name": _STRING,
+        "app_version": _STRING,
+        "app_author": _STRING,
+        "app_author_he": _STRING,
+        "window_width": _INTEGER,
+        "window_height": _INTEGER,
+        "window_min_width": _INTEGER,
+        "window_min_height": _INTEGER,
+        "video": _STRING_LIST,
+        "audio": _STRING_LIST,
+        "image": _STRING_LIST,
+        "languages": {"type": "object", "values": _STRING},
+    },
+}
+
+QUALITY_PRESETS_SCHEMA = {
+    "type": "object",
+    "required": ["type_defaults"],
+    "properties": {
+        "type_defaults": {"type": "object", "values": _PRESET_GROUP},
+        "format_overrides": {"type": "object", "values": _PRESET_GROUP},
+        "lossless_formats": _STRING_LIST,
+        "auto_quality": {
+            "type": "object",
+            "properties": {
+                "metric": {"type": "string", "enum": ["ssim", "psnr", "vmaf"]},
+                "prefer_vmaf": {"type": "boolean"},
+                "crf_min": _INTEGER,
+                "crf_max": _INTEGER,
+                "sample_count": _INTEGER,
+                "sample_seconds": {"type": "number"},
+                "targets": {"type": "object", "values": {"type": "object", "values": {"type": "number"}}},
+            },
+        },
+        "ladder": {
+            "type": "object",
+            "properties": {
+                "scaler": {"type": "string", "enum": list(SCALERS)},
+                "renditions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["name"],
+                        "properties": {"name": _STRING, "flags": _STRING_LIST, **_SCALE_LIMIT_PROPERTIES},
+                    },
+                },
+            },
+        },
+        "loudness": {
+            "type": "object",
+            "properties": {
+                "targets": {
+                    "type": "object",
+                    "values": {
+                        "type": "object",
+                        "required": ["integrated", "true_peak", "range"],
+                        "properties": {
+                            "integrated": {"type": "number"},
+                            "true_peak": {"type": "number"},
+                            "range": {"type": "number"},
+                        },
+                    },
+                },
+            },
+        },
+        "packaging": {
+            "type": "object",
+            "properties": {"segment_seconds": {"type": "number"}},
+        },
+    },
+}
+
+FFMPEG_SOURCES_SCHEMA = {
+    "type": "object",
+    "required": ["sources", "platform_map"],
+    "properties": {
+        "sources": {
+            "type": "object",
+            "values": {
+                "type": "object",
+                "required": ["url", "archive_type", "binary_path_in_archive", "binary_name"],
+                "properties": {
+                    "url": _STRING,
+                    "archive_type": {"type": "string", "enum": ["zip", "tar.xz"]},
+                    "binary_path_in_archive": _STRING,
+                    "binary_name": _STRING,
+                },
+            },
+        },
+        "platform_map": {"type": "object", "values": _STRING},
+    },
+}
+
+SETTINGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "debug": {"type": "boolean"},
+        "name_template": _STRING,
+        "collision_policy": _STRING,
+        "staging_mode": _STRING,
+        "max_jobs": {"type": "integer", "minimum": 1},
+        "thread_budget": {"type": "integer", "minimum": 0},
+        "preview_cache_mb": {"type": "integer", "minimum": 0},
+        "cache_dir": _STRING,
+        "scratch_dir": _STRING,
+        "hardware_backend": {"type": "string", "enum": [backend.value for backend in HardwareBackend]},
+        "log_level": {"type": "string", "enum": ["DEBUG", "INFO", "WARNING", "ERROR"]},
+        "last_used": {
+            "type": "object",
+            "values": {"type": "object", "properties": {"format": _STRING, "preset": _STRING}},
+        },
+    },
+}
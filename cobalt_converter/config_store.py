@@ -0,0 +1,218 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable
+
+from cobalt_converter.config_schemas import FFMPEG_SOURCES_SCHEMA, FORMATS_SCHEMA, QUALITY_PRESETS_SCHEMA
+from cobalt_converter.exceptions.config_exceptions import ConfigError, ConfigValidationError
+from cobalt_converter.paths import get_base_path
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "config")
+_OVERRIDE_SUFFIX = ".user.json"
+_WATCH_INTERVAL = 2.0
+
+_TYPE_CHECKS: dict[str, Callable[[object], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+
+def validate(data: object, schema: dict, path: str = "$") -> None:
+    expected = schema.get("type")
+    if expected and not _TYPE_CHECKS[expected](data):
+        raise ConfigValidationError(f"{path}: expected {expected}, got {type(data).__name__}")
+    if "enum" in schema and data not in schema["enum"]:
+        raise ConfigValidationError(f"{path}: {data!r} is not one of {schema['enum']}")
+    if "minimum" in schema and data < schema["minimum"]:
+        raise ConfigValidationError(f"{path}: {data!r} is less than {schema['minimum']}")
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                raise ConfigValidationError(f"{path}: missing required key '{key}'")
+        properties = schema.get("properties", {})
+        for key, value in data.items():
+            if key in properties:
+                validate(value, properties[key], f"{path}.{key}")
+            elif "values" in schema:
+                validate(value, schema["values"], f"{path}.{key}")
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(data):
+            validate(item, schema["items"], f"{path}[{i}]")
+
+
+def deep_merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+class ConfigStore:
+    def __init__(self, name: str, schema: dict, override_dir: str | None = None) -> None:
+        self.name = name
+        self._schema = schema
+        self._base_path = os.path.join(_CONFIG_DIR, f"{name}.json")
+        self._override_dir = override_dir
+        self._stamps: tuple | None = None
+        self._digest: str | None = None
+        self._data: dict = {}
+        self._listeners: list[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self.reload(force=True)
+
+    @property
+    def override_path(self) -> str:
+        directory = self._override_dir or get_base_path()
+        return os.path.join(directory, f"{self.name}{_OVERRIDE_SUFFIX}")
+
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    @property
+    def digest(self) -> str | None:
+        return self._digest
+
+    def subscribe(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[dict], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _file_stamps(self) -> tuple:
+        stamps = []
+        for path in (self._base_path, self.override_path):
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    @staticmethod
+    def _read_bytes(path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        with self._lock:
+            stamps = self._file_stamps()
+            if not force and stamps == self._stamps:
+                return False
+            self._stamps = stamps
+
+            base_bytes = self._read_bytes(self._base_path)
+            if base_bytes is None:
+                raise ConfigError(f"Config file not found: {self._base_path}")
+            override_bytes = self._read_bytes(self.override_path) or b""
+            digest = hashlib.sha256(base_bytes + b"\0" + override_bytes).hexdigest()
+            if digest == self._digest:
+                return False
+
+            try:
+                base = json.loads(base_bytes.decode("utf-8"))
+                validate(base, self._schema)
+            except (json.JSONDecodeError, UnicodeDecodeError, ConfigValidationError) as e:
+                if self._digest is None:
+                    raise ConfigValidationError(f"Invalid config {self._base_path}: {e}") from e
+                logging.error("Ignoring invalid config %s: %s", self._base_path, e)
+                return False
+
+            data = base
+            if override_bytes:
+                try:
+                    override = json.loads(override_bytes.decode("utf-8"))
+                    if not isinstance(override, dict):
+                        raise ConfigValidationError("override must be a JSON object")
+                    merged = deep_merge(base, override)
+                    validate(merged, self._schema)
+                    data = merged
+                    logging.info("Applied config overrides from %s", self.override_path)
+                except (json.JSONDecodeError, UnicodeDecodeError, ConfigValidationError) as e:
+                    logging.error("Ignoring invalid config override %s: %s", self.override_path, e)
+                    if self._digest is not None:
+                        return False
+
+            changed = self._digest is not None
+            self._data = data
+            self._digest = digest
+            listeners = list(self._listeners)
+
+        if changed:
+            logging.info("Config '%s' reloaded (sha256=%s)", self.name, digest[:12])
+            for listener in listeners:
+                try:
+                    listener(data)
+                except Exception:
+                    logging.exception("Config listener failed for '%s'", self.name)
+        return changed
+
+
+class ConfigWatcher:
+    def __init__(self, stores: list[ConfigStore], interval: float = _WATCH_INTERVAL) -> None:
+        self._stores = stores
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            for store in self._stores:
+                try:
+                    store.reload()
+                except ConfigError as e:
+                    logging.error("Config watch failed for '%s': %s", store.name, e)
+
+
+_SCHEMAS = {
+    "formats": FORMATS_SCHEMA,
+    "quality_presets": QUALITY_PRESETS_SCHEMA,
+    "ffmpeg_sources": FFMPEG_SOURCES_SCHEMA,
+}
+_stores: dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+_watcher: ConfigWatcher | None = None
+
+
+def get_store(name: str) -> ConfigStore:
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = ConfigStore(name, _SCHEMAS[name])
+        return _stores[name]
+
+
+def start_config_watcher(interval: float = _WATCH_INTERVAL) -> ConfigWatcher:
+    global _watcher
+    if _watcher is None:
+        _watcher = ConfigWatcher([get_store(name) for name in _SCHEMAS], interval)
+    _watcher.start()
+    return _watcher
+
+
+def stop_config_watcher() -> None:
+    if _watcher is not None:
+        _watcher.stop()
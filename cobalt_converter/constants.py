@@ -1,20 +1,14 @@
-import json
-import os
 import pathlib
 
+from cobalt_converter.config_store import get_store
 
-def _load_formats() -> dict:
-    config_path = os.path.join(os.path.dirname(__file__), "config", "formats.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+_STORE = get_store("formats")
+_CONFIG = _STORE.data
 
-
-_CONFIG = _load_formats()
-
-VIDEO_FORMATS: list[str] = _CONFIG["video"]
-AUDIO_FORMATS: list[str] = _CONFIG["audio"]
-IMAGE_FORMATS: list[str] = _CONFIG["image"]
-LANGUAGES: dict[str, str] = _CONFIG["languages"]
+VIDEO_FORMATS: list[str] = list(_CONFIG["video"])
+AUDIO_FORMATS: list[str] = list(_CONFIG["audio"])
+IMAGE_FORMATS: list[str] = list(_CONFIG["image"])
+LANGUAGES: dict[str, str] = dict(_CONFIG["languages"])
 APP_NAME: str = _CONFIG["app_name"]
 APP_VERSION: str = _CONFIG["app_version"]
 APP_AUTHOR: str = _CONFIG["app_author"]
@@ -24,13 +18,44 @@ WINDOW_HEIGHT: int = _CONFIG["window_height"]
 WINDOW_MIN_WIDTH: int = _CONFIG["window_min_width"]
 WINDOW_MIN_HEIGHT: int = _CONFIG["window_min_height"]
 
+FORMAT_TYPES: dict[str, str] = {}
+VALID_OUTPUT_FORMATS: dict[str, list[str]] = {}
+
+
+def _build_format_tables() -> None:
+    format_types = {
+        **{fmt: "image" for fmt in IMAGE_FORMATS},
+        **{fmt: "audio" for fmt in AUDIO_FORMATS},
+        **{fmt: "video" for fmt in VIDEO_FORMATS},
+    }
+    FORMAT_TYPES.update(format_types)
+    for stale in set(FORMAT_TYPES) - set(format_types):
+        FORMAT_TYPES.pop(stale, None)
+    VALID_OUTPUT_FORMATS.update({
+        "video": VIDEO_FORMATS + AUDIO_FORMATS,
+        "audio": list(AUDIO_FORMATS),
+        "image": list(IMAGE_FORMATS),
+    })
+
+
+def _on_formats_changed(config: dict) -> None:
+    VIDEO_FORMATS[:] = config["video"]
+    AUDIO_FORMATS[:] = config["audio"]
+    IMAGE_FORMATS[:] = config["image"]
+    LANGUAGES.update(config["languages"])
+    for stale in set(LANGUAGES) - set(config["languages"]):
+        LANGUAGES.pop(stale, None)
+    _build_format_tables()
+
+
+_build_format_tables()
+_STORE.subscribe(_on_formats_changed)
+
+
+def get_format_type(output_format: str) -> str:
+    return FORMAT_TYPES.get(output_format, "unknown")
+
 
 def get_file_type(file_path: str) -> str:
     ext = pathlib.Path(file_path).suffix.lower().lstrip(".")
-    if ext in VIDEO_FORMATS:
-        return "video"
-    if ext in AUDIO_FORMATS:
-        return "audio"
-    if ext in IMAGE_FORMATS:
-        return "image"
-    return "unknown"
+    return FORMAT_TYPES.get(ext, "unknown")
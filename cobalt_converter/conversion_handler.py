@@ -1,23 +1,159 @@
 import logging
+import os
 
 import wx
 
-from cobalt_converter.dialogs import IncompatibleFileDialog
+from cobalt_converter.auto_quality import AutoQualitySearch
+from cobalt_converter.constants import get_file_type
+from cobalt_converter.dialogs import FailedJobsDialog, IncompatibleFileDialog
+from cobalt_converter.edits import load_clip_list
+from cobalt_converter.events import (
+    BatchFinished,
+    BatchProgress,
+    DiskSpaceLow,
+    EngineEvent,
+    EngineMessage,
+    JobCancelled,
+    JobFailed,
+    JobFinished,
+    JobPaused,
+    JobProgress,
+    JobQueued,
+    JobResumed,
+    JobRetrying,
+    JobStarted,
+    QueuePaused,
+    QueueResumed,
+)
+from cobalt_converter.failures import export_failures
+from cobalt_converter.jobs import ConversionJob, JobPriority, JobStatus
+from cobalt_converter.loudness import LoudnessNormalizer
+from cobalt_converter.packaging import PackagingSpec, supports_packaging
+from cobalt_converter.quality_manager import QualityManager
+from cobalt_converter.supervisor import PAUSE_SUPPORTED
 
 
 class ConversionMixin:
     def start_conversion(self) -> None:
+        if not self._check_ready(auto_start=True):
+            return
+        output_format = self.format_combo.GetValue()
+        packaging = self._build_packaging()
+        if not self._check_packaging(packaging, output_format):
+            return
+        self._enter_converting_state()
+
+        quality_flags = self._build_quality_flags()
+        self.settings.remember_choice(get_file_type(self.files[0]), output_format, self._selected_preset_key())
+
+        logging.info(
+            "Starting conversion: %d files, format=%s, quality_flags=%s",
+            len(self.files), output_format, quality_flags,
+        )
+
+        self.engine.start(
+            files=self.files.copy(),
+            output_format=output_format,
+            output_folder=self.output_folder,
+            quality_flags=quality_flags,
+            auto_quality=self._build_auto_quality(),
+            preset=self._selected_preset_key(),
+            loudness=self._build_loudness(),
+            packaging=packaging,
+        )
+
+    def cut_clips(self) -> None:
+        t = self.translator
+        if self.is_converting or not self._check_ready(auto_start=False):
+            return
+        with wx.FileDialog(self, message=t.get("clip_list_dialog_title"), wildcard="CSV (*.csv)|*.csv",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            clip_list = dlg.GetPath()
+        try:
+            clips = load_clip_list(clip_list)
+        except (OSError, ValueError) as e:
+            wx.MessageBox(t.get("clip_list_error_message", error=str(e)), t.get("clip_list_error_title"), wx.ICON_ERROR)
+            return
+        default_input = self.files[0] if len(self.files) == 1 else None
+        if not clips or (default_input is None and any(clip.input_file is None for clip in clips)):
+            wx.MessageBox(t.get("clip_list_needs_input_message"), t.get("clip_list_error_title"), wx.ICON_WARNING)
+            return
+
+        self._enter_converting_state()
+        logging.info("Cutting %d clips listed in %s", len(clips), clip_list)
+        self.engine.start_clips(
+            clips,
+            output_format=self.format_combo.GetValue(),
+            output_folder=self.output_folder,
+            quality_flags=self._build_quality_flags(),
+            preset=self._selected_preset_key(),
+            default_input=default_input,
+        )
+
+    def join_files(self) -> None:
+        if self.is_converting or not self._check_ready(auto_start=False):
+            return
+        if len(self.files) < 2:
+            wx.MessageBox(
+                self.translator.get("join_needs_two_message"), self.translator.get("menu_join_files"), wx.ICON_WARNING,
+            )
+            return
+
+        self._enter_converting_state()
+        logging.info("Joining %d files", len(self.files))
+        self.engine.start_concat(
+            self.files.copy(),
+            output_format=self.format_combo.GetValue(),
+            output_folder=self.output_folder,
+            quality_flags=self._build_quality_flags(),
+            preset=self._selected_preset_key(),
+        )
+
+    def encode_ladder(self) -> None:
+        if self.is_converting or not self._check_ready(auto_start=False):
+            return
+        output_format = self.format_combo.GetValue()
+        if not self.quality_manager.supports_ladder(output_format):
+            wx.MessageBox(
+                self.translator.get("ladder_needs_video_message"),
+                self.translator.get("menu_encode_ladder"),
+                wx.ICON_WARNING,
+            )
+            return
+        packaging = self._build_packaging()
+        if not self._check_packaging(packaging, output_format):
+            return
+
+        self._enter_converting_state()
+        logging.info("Encoding %d files as a resolution ladder", len(self.files))
+        self.engine.start_ladder(
+            self.files.copy(),
+            self.quality_manager.ladder,
+            output_format=output_format,
+            output_folder=self.output_folder,
+            quality_flags=self._build_quality_flags(),
+            preset=self._selected_preset_key(),
+            packaging=packaging,
+        )
+
+    def _check_ready(self, auto_start: bool) -> bool:
         if not self.files:
             wx.MessageBox(self.translator.get("no_files_message"), self.translator.get("no_files_title"), wx.ICON_WARNING)
-            return
+            return False
         if not self.format_combo.GetValue():
             wx.MessageBox(self.translator.get("no_format_message"), self.translator.get("no_format_title"), wx.ICON_WARNING)
-            return
+            return False
         if not self.engine.get_ffmpeg_path():
             self._offer_ffmpeg_download()
-            if not self.engine.get_ffmpeg_path():
-                return  # async download will auto-start conversion when done
+            if not auto_start:
+                # Only a plain conversion is resumed automatically once the download finishes.
+                self._pending_conversion_after_download = False
+            return bool(self.engine.get_ffmpeg_path())
+        return True
 
+    def _enter_converting_state(self) -> None:
         self.is_converting = True
         self.stop_requested = False
         self.convert_btn.Enable(False)
@@ -26,51 +162,63 @@ class ConversionMixin:
         self.clear_btn.Enable(False)
         self.progress_bar.SetValue(0)
 
-        quality_flags = self._build_quality_flags()
-        output_format = self.format_combo.GetValue()
+    def _selected_preset_key(self) -> str:
+        selection = self.quality_combo.GetSelection()
+        if 0 <= selection < len(self._quality_keys):
+            return self._quality_keys[selection]
+        return "default"
 
-        logging.info(
-            "Starting conversion: %d files, format=%s, quality_flags=%s",
-            len(self.files), output_format, quality_flags,
+    def _build_auto_quality(self) -> AutoQualitySearch | None:
+        if not self.auto_quality_check.IsEnabled() or not self.auto_quality_check.GetValue():
+            return None
+        target_key = self._selected_preset_key()
+        if target_key not in QualityManager.PRESET_KEYS:
+            return None
+        return AutoQualitySearch(
+            config=self.quality_manager.auto_quality_config,
+            target_key=target_key,
+            probe_index=self.engine.probe_index,
         )
 
-        self.engine.start(
-            files=self.files.copy(),
-            output_format=output_format,
-            output_folder=self.output_folder,
-            quality_flags=quality_flags,
+    def _build_loudness(self) -> LoudnessNormalizer | None:
+        target_name = self._selected_loudness_target()
+        target = self.quality_manager.loudness_targets.get(target_name) if target_name else None
+        if target is None:
+            return None
+        return LoudnessNormalizer(
+            target_name=target_name,
+            target=target,
+            probe_index=self.engine.probe_index,
         )
 
+    def _build_packaging(self) -> PackagingSpec | None:
+        for packaging, item in self._packaging_menu_items.items():
+            if packaging is not None and item.IsChecked():
+                return self.quality_manager.packaging_spec(packaging)
+        return None
+
+    def _check_packaging(self, packaging: PackagingSpec | None, output_format: str) -> bool:
+        if packaging is None or supports_packaging(output_format):
+            return True
+        wx.MessageBox(
+            self.translator.get("packaging_needs_mp4_message"),
+            self.translator.get("menu_streaming_package"),
+            wx.ICON_WARNING,
+        )
+        return False
+
     def _build_quality_flags(self) -> list[str]:
         output_format = self.format_combo.GetValue()
-        selected = self.quality_combo.GetValue()
-        t = self.translator
+        preset_key = self._selected_preset_key()
+        if preset_key != "custom":
+            return list(self.quality_manager.get_command_plan(output_format, preset_key))
 
-        if selected == t.get("quality_default"):
-            return []
-
-        if selected == t.get("quality_custom"):
-            values: dict[str, str | int] = {}
-            params = self.quality_manager.get_custom_params(output_format)
-            for param in params:
-                name = param["name"]
-                control = self.custom_controls.get(name)
-                if control is None:
-                    continue
-                if param["type"] == "slider":
-                    values[name] = control.GetValue()
-                elif param["type"] == "choice":
-                    values[name] = control.GetValue()
-            return self.quality_manager.build_custom_flags(output_format, values)
-
-        preset_map = {
-            t.get("quality_low"): "low",
-            t.get("quality_medium"): "medium",
-            t.get("quality_high"): "high",
-            t.get("quality_maximum"): "maximum",
-        }
-        preset_key = preset_map.get(selected, "")
-        return self.quality_manager.build_preset_flags(output_format, preset_key)
+        values: dict[str, str | int] = {}
+        for param in self.quality_manager.get_custom_params(output_format):
+            control = self.custom_controls.get(param["name"])
+            if control is not None:
+                values[param["name"]] = control.GetValue()
+        return self.quality_manager.build_custom_flags(output_format, values)
 
     def _stop_conversion(self) -> None:
         title = self.translator.get("stop_conversion_title")
@@ -84,11 +232,103 @@ class ConversionMixin:
             wx.CallAfter(self._set_status, self.translator.get("conversion_stopped_status"))
 
     def _request_format_from_user(self, file_path: str, valid_formats: list[str]) -> str | None:
-        self.dialog_result = None
-        self.dialog_event.clear()
-        wx.CallAfter(self._show_incompatible_dialog, file_path, valid_formats)
-        self.dialog_event.wait()
-        return self.dialog_result
+        with self._dialog_lock:
+            self.dialog_result = None
+            self.dialog_event.clear()
+            # Checked after the clear, so a stop that sets the event from here on still wakes the wait.
+            if self.engine.stop_requested:
+                return None
+            wx.CallAfter(self._show_incompatible_dialog, file_path, valid_formats)
+            self.dialog_event.wait()
+            return self.dialog_result
+
+    def _show_job_menu(self, file_path: str) -> None:
+        job = self.engine.journal.get(self._file_jobs.get(file_path, 0))
+        if not self.is_converting or job is None or job.status.is_terminal:
+            return
+        t = self.translator
+        priorities = list(JobPriority)
+        rank = priorities.index(job.priority)
+        actions = [
+            ("job_run_now", JobPriority.URGENT, job.priority != JobPriority.URGENT),
+            ("job_priority_up", priorities[min(rank + 1, len(priorities) - 1)], job.priority != JobPriority.URGENT),
+            ("job_priority_down", priorities[max(rank - 1, 0)], job.priority != JobPriority.LOW),
+        ]
+        menu = wx.Menu()
+        for key, priority, enabled in actions:
+            item = menu.Append(wx.ID_ANY, t.get(key))
+            item.Enable(enabled)
+            self.Bind(wx.EVT_MENU, lambda e, p=priority: self.engine.set_priority(job.id, p), item)
+        menu.AppendSeparator()
+        pause_item = menu.Append(wx.ID_ANY, t.get("job_pause"))
+        pause_item.Enable(PAUSE_SUPPORTED and job.status == JobStatus.RUNNING)
+        self.Bind(wx.EVT_MENU, lambda e: self.engine.pause(job.id), pause_item)
+        resume_item = menu.Append(wx.ID_ANY, t.get("job_resume"))
+        resume_item.Enable(job.status == JobStatus.PAUSED)
+        self.Bind(wx.EVT_MENU, lambda e: self.engine.resume(job.id), resume_item)
+        self.PopupMenu(menu)
+        menu.Destroy()
+
+    def _on_engine_event(self, event: EngineEvent) -> None:
+        t = self.translator
+        if isinstance(event, JobQueued):
+            self._file_jobs[event.input_file] = event.job_id
+        elif isinstance(event, JobStarted):
+            self._set_status(t.get(
+                "converting_status",
+                current=event.position,
+                total=event.total,
+                filename=os.path.basename(event.input_file),
+            ))
+        elif isinstance(event, JobProgress):
+            self._set_status(event.message)
+        elif isinstance(event, JobFinished) and event.skipped:
+            self._set_status(t.get("skipping_exists_status", filename=os.path.basename(event.input_file)))
+        elif isinstance(event, JobFailed):
+            self._set_status(t.get(
+                "error_converting_status",
+                filename=os.path.basename(event.input_file),
+                error=event.reason,
+            ))
+        elif isinstance(event, JobCancelled) and not self.engine.stop_requested:
+            self._set_status(t.get("job_cancelled_status", filename=os.path.basename(event.input_file)))
+        elif isinstance(event, JobRetrying):
+            self._set_status(t.get(
+                "retrying_status",
+                filename=os.path.basename(event.input_file),
+                delay=round(event.delay),
+                error=event.reason,
+            ))
+        elif isinstance(event, JobPaused):
+            key = "job_preempted_status" if event.preempted_by is not None else "job_paused_status"
+            self._set_status(t.get(key, filename=os.path.basename(event.input_file)))
+        elif isinstance(event, JobResumed):
+            self._set_status(t.get("job_resumed_status", filename=os.path.basename(event.input_file)))
+        elif isinstance(event, QueuePaused) and event.reason == "memory":
+            self._set_status(t.get(
+                "memory_paused_status",
+                filename=os.path.basename(event.path),
+                required=event.required_bytes // (1024 * 1024),
+                free=event.free_bytes // (1024 * 1024),
+            ))
+        elif isinstance(event, (DiskSpaceLow, QueuePaused)):
+            key = "disk_space_paused_status" if isinstance(event, QueuePaused) else "disk_space_low_status"
+            self._set_status(t.get(
+                key,
+                path=event.path,
+                free=event.free_bytes // (1024 * 1024),
+                required=event.required_bytes // (1024 * 1024),
+            ))
+        elif isinstance(event, QueueResumed):
+            self._set_status(t.get("memory_resumed_status" if event.reason == "memory" else "queue_resumed_status"))
+        elif isinstance(event, EngineMessage):
+            self._set_status(event.message)
+        elif isinstance(event, BatchProgress):
+            self._set_file_progress(event.completed, event.total)
+        elif isinstance(event, BatchFinished):
+            self._conversion_finished()
+            if event.failed and not event.stopped:
+                self._show_failed_jobs(event.batch_id)
 
     def _set_progress(self, value: int) -> None:
         self.progress_bar.SetValue(value)
@@ -112,6 +352,46 @@ class ConversionMixin:
             logging.info("Conversion batch finished successfully")
         self._retranslate_ui()
 
+    def _show_failed_jobs(self, batch_id: int) -> None:
+        jobs = self.engine.failed_jobs(batch_id)
+        if not jobs:
+            return
+        dlg = FailedJobsDialog(self, jobs, self.translator)
+        res = dlg.ShowModal()
+        dlg.Destroy()
+        if res == FailedJobsDialog.ID_RETRY:
+            self._retry_failed(batch_id)
+        elif res == FailedJobsDialog.ID_EXPORT:
+            self._export_failed(jobs)
+
+    def _retry_failed(self, batch_id: int) -> None:
+        if self.engine.retry_failed(batch_id=batch_id) is None:
+            return
+        self.is_converting = True
+        self.convert_btn.Enable(False)
+        self.stop_btn.Enable(True)
+        self.select_btn.Enable(False)
+        self.clear_btn.Enable(False)
+        self.progress_bar.SetValue(0)
+
+    def _export_failed(self, jobs: list[ConversionJob]) -> None:
+        with wx.FileDialog(
+            self,
+            self.translator.get("export_failed_dialog_title"),
+            defaultFile="failed_conversions.csv",
+            wildcard="CSV (*.csv)|*.csv",
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+        ) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+        try:
+            count = export_failures(jobs, path)
+            logging.info("Exported %d failed job(s) to %s", count, path)
+        except OSError as e:
+            logging.error("Failed to export failed jobs: %s", e)
+            wx.MessageBox(str(e), self.translator.get("export_failed_dialog_title"), wx.ICON_ERROR)
+
     def _show_incompatible_dialog(self, file_path: str, valid_formats: list[str]) -> None:
         dlg = IncompatibleFileDialog(self, file_path, valid_formats, self.translator)
         res = dlg.ShowModal()
@@ -1,35 +1,149 @@
+import collections
+import concurrent.futures
+import itertools
 import logging
 import os
-import pathlib
+import re
 import subprocess
 import sys
 import threading
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
 
-from cobalt_converter.constants import (
-    AUDIO_FORMATS,
-    IMAGE_FORMATS,
-    VIDEO_FORMATS,
-    get_file_type,
+from cobalt_converter.auto_quality import AutoQualitySearch, replace_flag
+from cobalt_converter.constants import VALID_OUTPUT_FORMATS, get_file_type, get_format_type
+from cobalt_converter.dedup import DuplicateFinder
+from cobalt_converter.edits import Clip, clip_label, concat_list_path, mapped_audio_tracks, plan_command
+from cobalt_converter.events import (
+    BatchFinished,
+    BatchProgress,
+    DiskSpaceLow,
+    EngineEvent,
+    EngineMessage,
+    EventBus,
+    JobCancelled,
+    JobFailed,
+    JobFinished,
+    JobPaused,
+    JobProgress,
+    JobQueued,
+    JobReprioritized,
+    JobResumed,
+    JobRetrying,
+    JobStarted,
+    QueuePaused,
+    QueueResumed,
 )
+from cobalt_converter.failures import FailureInfo, FailureKind, RetryPolicy, classify_failure
+from cobalt_converter.hwaccel import HardwareBackend, hwaccel_args
+from cobalt_converter.jobs import (
+    ConversionJob,
+    JobJournal,
+    JobPriority,
+    JobStatus,
+    enqueue_by_priority,
+    move_in_queue,
+    next_id,
+)
+from cobalt_converter.loudness import LoudnessNormalizer
+from cobalt_converter.memory import (
+    MemoryBudget,
+    cpu_threads,
+    default_memory_budget,
+    estimate_job_memory,
+    process_limit,
+)
+from cobalt_converter.metrics import EngineMetrics
+from cobalt_converter.naming import OutputNamer, batch_source_root, source_fingerprint
+from cobalt_converter.outputs import (
+    DEFAULT_MIN_FREE_BYTES,
+    commit_output,
+    discard_output,
+    estimate_output_size,
+    free_space,
+    link_output,
+    partial_path,
+)
+from cobalt_converter.packaging import PackagingSpec, supports_packaging
+from cobalt_converter.plans import JobKind, validate_range
+from cobalt_converter.probe import MediaInfo, ProbeIndex
+from cobalt_converter.scaling import Rendition
+from cobalt_converter.staging import StagingManager
+from cobalt_converter.supervisor import CommandRunner, ProcessResult, ProcessSupervisor
 from cobalt_converter.utils import get_base_path, get_bundled_path, get_subprocess_env, get_subprocess_flags
 
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+DEFAULT_STALL_TIMEOUT = 120.0
+DEFAULT_SPACE_POLL_INTERVAL = 5.0
+
+
+def _to_seconds(match: re.Match) -> float:
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _check_packaging(packaging: PackagingSpec | None, output_format: str) -> None:
+    if packaging is not None and not supports_packaging(output_format):
+        raise ValueError(f"Streaming packages cannot be built from {output_format} output")
+
+
+@dataclass
+class _BatchState:
+    total: int
+    completed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
 
 class ConversionEngine:
     def __init__(
         self,
-        progress_callback: Callable[[int, int], None],
-        status_callback: Callable[[str], None],
-        incompatible_callback: Callable[[str, list[str]], str | None],
-        finished_callback: Callable[[], None],
+        incompatible_callback: Callable[[str, list[str]], str | None] | None = None,
+        events: EventBus | None = None,
+        max_jobs: int = 1,
+        staging: StagingManager | None = None,
+        probe_index: ProbeIndex | None = None,
     ) -> None:
-        self._progress_callback = progress_callback
-        self._status_callback = status_callback
         self._incompatible_callback = incompatible_callback
-        self._finished_callback = finished_callback
+        self.events = events or EventBus()
+        self.metrics = EngineMetrics(self.events)
+        self.journal = JobJournal()
         self._stop_requested = False
-        self._current_process: subprocess.Popen | None = None
+        self._queue: collections.deque[ConversionJob] = collections.deque()
+        self._batches: dict[int, _BatchState] = {}
+        self._running: set[int] = set()
+        # Paused job ids; True when the engine paused the job itself and should resume it once a slot frees up.
+        self._paused: dict[int, bool] = {}
+        self._cond = threading.Condition()
+        self.supervisor = ProcessSupervisor()
+        self.max_jobs = max(1, max_jobs)
+        # Encoder threads shared by the parallel jobs; None leaves the count to FFmpeg.
+        self.thread_budget: int | None = None
+        self.hardware_backend = HardwareBackend.NONE
+        self.job_timeout: float | None = None
+        self.stall_timeout: float | None = DEFAULT_STALL_TIMEOUT
+        self.retry_policy = RetryPolicy()
+        self._retry_timers: dict[int, threading.Timer] = {}
+        self.min_free_bytes = DEFAULT_MIN_FREE_BYTES
+        self.space_poll_interval = DEFAULT_SPACE_POLL_INTERVAL
+        self.memory_budget = MemoryBudget(default_memory_budget())
+        self.enforce_memory_limits = True
+        self._worker: threading.Thread | None = None
         self.custom_ffmpeg_path: str | None = None
+        self.probe_index = probe_index or ProbeIndex()
+        self.duplicates = DuplicateFinder(self.probe_index)
+        self.deduplicate = True
+        # Duplicate jobs waiting on the job converting the same content, by that job's id.
+        self._duplicates: dict[int, list[ConversionJob]] = {}
+        # Queued jobs whose duplicate check has not finished yet.
+        self._grouping: set[int] = set()
+        self.namer = OutputNamer()
+        self.staging = staging
+        # Input copies started for queued jobs by id; None when the input is read in place.
+        self._staged_inputs: dict[int, concurrent.futures.Future | None] = {}
 
     @property
     def stop_requested(self) -> bool:
@@ -60,119 +174,876 @@ class ConversionEngine:
         output_format: str,
         output_folder: str | None,
         quality_flags: list[str] | None = None,
-    ) -> None:
+        auto_quality: AutoQualitySearch | None = None,
+        preset: str = "default",
+        loudness: LoudnessNormalizer | None = None,
+        packaging: PackagingSpec | None = None,
+        priority: JobPriority = JobPriority.NORMAL,
+    ) -> int:
+        _check_packaging(packaging, output_format)
         self._stop_requested = False
-        threading.Thread(
-            target=self._convert_all,
-            args=(files, output_format, output_folder, quality_flags or []),
-            daemon=True,
-        ).start()
+        jobs = [
+            ConversionJob(
+                file,
+                output_format,
+                output_folder,
+                list(quality_flags or []),
+                preset=preset,
+                packaging=packaging,
+                priority=JobPriority(priority),
+                auto_quality=auto_quality,
+                loudness=loudness,
+            )
+            for file in files
+        ]
+        return self.submit(jobs)
+
+    def start_clips(
+        self,
+        clips: list[Clip],
+        output_format: str,
+        output_folder: str | None,
+        quality_flags: list[str] | None = None,
+        preset: str = "default",
+        default_input: str | None = None,
+    ) -> int:
+        jobs = []
+        for index, clip in enumerate(clips, start=1):
+            input_file = clip.input_file or default_input
+            if not input_file:
+                raise ValueError(f"Clip {index} has no input file")
+            validate_range(clip.start, clip.end)
+            jobs.append(ConversionJob(
+                input_file,
+                output_format,
+                output_folder,
+                list(quality_flags or []),
+                preset=preset,
+                kind=JobKind.TRIM,
+                start=clip.start,
+                end=clip.end,
+                label=clip_label(input_file, clip, index),
+            ))
+        self._stop_requested = False
+        return self.submit(jobs)
+
+    def start_concat(
+        self,
+        files: list[str],
+        output_format: str,
+        output_folder: str | None,
+        quality_flags: list[str] | None = None,
+        preset: str = "default",
+        label: str | None = None,
+    ) -> int:
+        if len(files) < 2:
+            raise ValueError("Concatenation needs at least two inputs")
+        self._stop_requested = False
+        return self.submit([ConversionJob(
+            files[0],
+            output_format,
+            output_folder,
+            list(quality_flags or []),
+            preset=preset,
+            kind=JobKind.CONCAT,
+            extra_inputs=list(files[1:]),
+            label=label or f"{os.path.splitext(os.path.basename(files[0]))[0]}_joined",
+        )])
+
+    def start_ladder(
+        self,
+        files: list[str],
+        renditions: tuple[Rendition, ...],
+        output_format: str,
+        output_folder: str | None,
+        quality_flags: list[str] | None = None,
+        preset: str = "default",
+        packaging: PackagingSpec | None = None,
+    ) -> int:
+        if not renditions:
+            raise ValueError("No ladder renditions are configured")
+        _check_packaging(packaging, output_format)
+        self._stop_requested = False
+        return self.submit([
+            ConversionJob(
+                file,
+                output_format,
+                output_folder,
+                list(quality_flags or []),
+                preset=preset,
+                kind=JobKind.LADDER,
+                renditions=tuple(renditions),
+                packaging=packaging,
+            )
+            for file in files
+        ])
+
+    def submit(self, jobs: list[ConversionJob], deduplicate: bool | None = None) -> int:
+        batch_id = next_id()
+        source_root = batch_source_root([job.input_file for job in jobs])
+        for job in jobs:
+            if job.source_root is None:
+                job.source_root = source_root
+            if job.threads is None and self.thread_budget:
+                job.threads = max(1, self.thread_budget // self.max_jobs)
+        if deduplicate is None:
+            deduplicate = self.deduplicate
+        groups = self._duplicate_candidates(jobs) if deduplicate else []
+        with self._cond:
+            self._batches[batch_id] = _BatchState(total=len(jobs))
+            for job in jobs:
+                job.batch_id = batch_id
+                self.journal.add(job)
+                if job.duplicate_of is None:
+                    enqueue_by_priority(self._queue, job)
+                else:
+                    self._duplicates.setdefault(job.duplicate_of, []).append(job)
+            for group in groups:
+                self._grouping.update(job.id for job in group)
+            self._ensure_worker()
+            self._cond.notify_all()
+        for group in groups:
+            self.duplicates.submit(self._resolve_duplicates, group)
+        for job in jobs:
+            self.events.publish(JobQueued(job.id, batch_id, job.input_file, job.output_format))
+        self._preflight_space(jobs)
+        if not jobs:
+            self.events.publish(BatchFinished(batch_id, 0, 0, 0, stopped=False))
+        return batch_id
+
+    def cancel(self, job_id: int) -> bool:
+        job = self.journal.get(job_id)
+        if job is None or job.status.is_terminal:
+            return False
+        with self._cond:
+            queued = job in self._queue
+            if queued:
+                self._queue.remove(job)
+            waiting = self._duplicates.get(job.duplicate_of, [])
+            if job in waiting:
+                waiting.remove(job)
+                queued = True
+            timer = self._retry_timers.pop(job_id, None)
+            if timer is not None:
+                timer.cancel()
+                queued = True
+        if queued:
+            self._complete(job, JobStatus.CANCELLED)
+        else:
+            job.status = JobStatus.CANCELLED
+            self.supervisor.terminate(job_id)
+        return True
+
+    def queue_position(self, job_id: int) -> int | None:
+        with self._cond:
+            for position, job in enumerate(self._queue):
+                if job.id == job_id:
+                    return position
+        return None
+
+    def set_priority(self, job_id: int, priority: JobPriority | str) -> bool:
+        priority = JobPriority(priority)
+        job = self.journal.get(job_id)
+        if job is None or job.status.is_terminal:
+            return False
+        with self._cond:
+            job.priority = priority
+            if job in self._queue:
+                self._queue.remove(job)
+                enqueue_by_priority(self._queue, job)
+            notices = self._rebalance()
+            self._cond.notify_all()
+        logging.info("Priority of %s set to %s", job.input_file, priority.value)
+        self._publish_all([JobReprioritized(job.id, priority.value, self.queue_position(job.id)), *notices])
+        return True
+
+    def move(self, job_id: int, position: int) -> bool:
+        job = self.journal.get(job_id)
+        if job is None:
+            return False
+        with self._cond:
+            if job not in self._queue:
+                return False
+            move_in_queue(self._queue, job, position)
+            position = self._queue.index(job)
+            self._cond.notify_all()
+        self.events.publish(JobReprioritized(job.id, job.priority.value, position))
+        return True
+
+    def pause(self, job_id: int) -> bool:
+        job = self.journal.get(job_id)
+        if job is None:
+            return False
+        with self._cond:
+            if job.status != JobStatus.RUNNING or not self.supervisor.pause(job_id):
+                return False
+            job.status = JobStatus.PAUSED
+            self._paused[job_id] = False
+            self._cond.notify_all()
+        self.events.publish(JobPaused(job.id, job.input_file))
+        return True
+
+    def resume(self, job_id: int) -> bool:
+        with self._cond:
+            if self._paused.get(job_id) is not False:
+                return False
+            # Hand the job back to the scheduler, which continues it as soon as a slot is free.
+            self._paused[job_id] = True
+            notices = self._rebalance()
+            self._cond.notify_all()
+        self._publish_all(notices)
+        return True
 
     def stop(self) -> None:
         self._stop_requested = True
-        if self._current_process:
-            try:
-                self._current_process.terminate()
-            except (OSError, AttributeError) as exc:
-                logging.debug("Failed to terminate process %r: %s", self._current_process, exc)
+        with self._cond:
+            pending = list(self._queue)
+            self._queue.clear()
+            for job_id, timer in self._retry_timers.items():
+                timer.cancel()
+                job = self.journal.get(job_id)
+                if job is not None:
+                    pending.append(job)
+            self._retry_timers.clear()
+            self._cond.notify_all()
+        self.supervisor.terminate_all()
+        for job in pending:
+            self._complete(job, JobStatus.CANCELLED)
 
-    def _convert_all(self, files: list[str], initial_format: str, output_folder: str | None, quality_flags: list[str] | None = None) -> None:
-        quality_flags = quality_flags or []
-        ffmpeg_path = self.get_ffmpeg_path()
-        if ffmpeg_path is None:
-            self._status_callback("FFmpeg not found")
-            self._finished_callback()
-            return
-        total = len(files)
-        processed = 0
+    def failed_jobs(self, batch_id: int | None = None) -> list[ConversionJob]:
+        return self.journal.failed(batch_id)
+
+    def retry_failed(self, job_ids: list[int] | None = None, batch_id: int | None = None) -> int | None:
+        failed = self.journal.failed(batch_id)
+        if job_ids is not None:
+            wanted = set(job_ids)
+            failed = [job for job in failed if job.id in wanted]
+        if not failed:
+            return None
+        self._stop_requested = False
+        jobs = []
+        for job in failed:
+            job.status = JobStatus.RETRIED
+            jobs.append(job.copy_for_retry())
+        logging.info("Retrying %d failed job(s)", len(jobs))
+        return self.submit(jobs)
+
+    def shutdown(self) -> None:
+        self.stop()
+        self.supervisor.shutdown()
+        self.duplicates.shutdown()
+        if self.staging is not None:
+            self.staging.shutdown()
+        self.probe_index.save()
+
+    def _preflight_space(self, jobs: list[ConversionJob]) -> None:
+        required: dict[str, int] = {}
+        for job in jobs:
+            directory = job.output_folder or os.path.dirname(os.path.abspath(job.input_file))
+            required[directory] = required.get(directory, 0) + self._estimated_size(job)
+        for directory, needed in required.items():
+            free = free_space(directory)
+            if free is not None and free - needed < self.min_free_bytes:
+                logging.warning(
+                    "Batch needs about %d bytes in %s but only %d are free", needed, directory, free,
+                )
+                self.events.publish(DiskSpaceLow(directory, free, needed + self.min_free_bytes))
 
-        for file in files:
-            if self._stop_requested:
+    @staticmethod
+    def _estimated_size(job: ConversionJob) -> int:
+        return sum(estimate_output_size(f, job.output_format) for f in [job.input_file, *job.extra_inputs])
+
+    def _wait_for_space(self, job: ConversionJob) -> bool:
+        directory = os.path.dirname(os.path.abspath(job.output_file))
+        required = self._estimated_size(job) + self.min_free_bytes
+        paused = False
+        while True:
+            free = free_space(directory)
+            if free is None or free >= required:
                 break
+            if not paused:
+                paused = True
+                logging.warning("Pausing queue: %d bytes free in %s, %d required", free, directory, required)
+                self.events.publish(QueuePaused("disk_space", directory, free, required))
+            with self._cond:
+                if self._stop_requested or job.status == JobStatus.CANCELLED:
+                    return False
+                self._cond.wait(self.space_poll_interval)
+        if paused:
+            logging.info("Disk space available in %s, resuming queue", directory)
+            self.events.publish(QueueResumed())
+        return True
 
-            current_format = self._resolve_format(file, initial_format)
-            if current_format is None:
-                self._status_callback(f"Skipping {os.path.basename(file)}")
-                processed += 1
-                self._progress_callback(processed, total)
-                continue
+    def _estimate_memory(self, job: ConversionJob, ffmpeg_path: str) -> int:
+        estimates = []
+        for file in [job.input_file, *job.extra_inputs]:
+            info = self.probe_index.probe(ffmpeg_path, file)
+            scales = [1.0]
+            video = info.video_streams[0] if info is not None and info.video_streams else None
+            if job.renditions and video is not None and video.width and video.height:
+                scales = [
+                    min(1.0, (r.limit.max_width or video.width) / video.width,
+                        (r.limit.max_height or video.height) / video.height) ** 2
+                    for r in job.renditions
+                ]
+            estimates.append(estimate_job_memory(job.output_format, job.quality_flags, info, job.threads, scales))
+        return max(estimates)
 
-            output_file = self._build_output_path(file, current_format, output_folder)
+    def _wait_for_memory(self, job: ConversionJob, ffmpeg_path: str) -> bool:
+        # A retry after running out of memory keeps its old reservation but runs with fewer threads.
+        job.memory_estimate = max(self._estimate_memory(job, ffmpeg_path), job.memory_estimate or 0)
+        paused = False
+        while True:
+            with self._cond:
+                if self._stop_requested or job.status == JobStatus.CANCELLED:
+                    return False
+                if self.memory_budget.reserve(job.id, job.memory_estimate, idle=self._paused):
+                    break
+                if paused:
+                    self._cond.wait(self.space_poll_interval)
+                    continue
+            paused = True
+            in_use = self.memory_budget.reserved()
+            logging.warning(
+                "Holding %s: needs about %d MiB, %d of %d MiB already reserved",
+                job.input_file, job.memory_estimate >> 20, in_use >> 20, self.memory_budget.total >> 20,
+            )
+            self.events.publish(QueuePaused(
+                "memory", job.input_file, max(0, self.memory_budget.total - in_use), job.memory_estimate,
+            ))
+        if paused:
+            logging.info("Memory available, starting %s", job.input_file)
+            self.events.publish(QueueResumed("memory"))
+        return True
 
-            if os.path.exists(output_file):
-                processed += 1
-                self._progress_callback(processed, total)
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            self._stage_upcoming()
+            with self._cond:
+                while True:
+                    notices = self._rebalance()
+                    job = self._next_ready() if self._active_jobs() < self.max_jobs else None
+                    if job is not None or notices or self._unstaged():
+                        break
+                    self._cond.wait()
+                if job is not None:
+                    self._queue.remove(job)
+                    self._running.add(job.id)
+            self._publish_all(notices)
+            if job is None:
                 continue
+            # Analysis passes and waits run on the job's own thread, so the queue keeps moving meanwhile.
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
 
-            self._status_callback(f"Converting ({processed + 1}/{total}): {os.path.basename(file)}...")
-            logging.info("Starting conversion for %s", file)
-            self._run_ffmpeg(ffmpeg_path, file, output_file, quality_flags)
+    def _run_job(self, job: ConversionJob) -> None:
+        launched = False
+        try:
+            launched = self._process(job)
+        except Exception as e:
+            logging.exception("Unexpected error while converting %s", job.input_file)
+            job.error = str(e)
+            self._complete(job, JobStatus.FAILED)
+        finally:
+            if not launched:
+                self._release(job)
 
-            if not self._stop_requested:
-                processed += 1
-                self._progress_callback(processed, total)
+    def _command_runner(self, job: ConversionJob) -> CommandRunner:
+        def run(cmd: list[str], timeout: float | None) -> ProcessResult:
+            if job.status == JobStatus.CANCELLED or self._stop_requested:
+                return ProcessResult(None, "cancelled")
+            # Keyed by job, so cancelling or stopping the job also stops its analysis passes.
+            return self.supervisor.capture(job.id, cmd, timeout)
 
-        if not self._stop_requested:
-            logging.info("All conversions complete.")
+        return run
 
-        self._finished_callback()
+    def _dispatchable(self) -> Iterator[ConversionJob]:
+        return (job for job in self._queue if job.id not in self._grouping)
 
-    def _resolve_format(self, file: str, initial_format: str) -> str | None:
-        file_type = get_file_type(file)
-        valid_formats: list[str] = []
-        if file_type == "video":
-            valid_formats = VIDEO_FORMATS + AUDIO_FORMATS
-        elif file_type == "audio":
-            valid_formats = AUDIO_FORMATS
-        elif file_type == "image":
-            valid_formats = IMAGE_FORMATS
+    def _staging_window(self) -> list[ConversionJob]:
+        return list(itertools.islice(self._dispatchable(), self.staging.read_ahead + 1)) if self.staging else []
+
+    def _unstaged(self) -> bool:
+        return any(job.id not in self._staged_inputs for job in self._staging_window())
+
+    def _stage_upcoming(self) -> None:
+        with self._cond:
+            upcoming = [job for job in self._staging_window() if job.id not in self._staged_inputs]
+        for job in upcoming:
+            self.staging.prefetch(job.id, job.input_file)
+            future = self.staging.input_future(job.id)
+            with self._cond:
+                self._staged_inputs[job.id] = future
+            if future is not None:
+                future.add_done_callback(lambda _future: self._wake())
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
 
+    def _next_ready(self) -> ConversionJob | None:
+        waiting = self._dispatchable()
+        head = next(waiting, None)
+        if head is None or self._input_ready(head):
+            return head
+        # A job whose input is still being copied in lets a ready job of the same priority go first.
+        for job in itertools.islice(waiting, self.staging.read_ahead):
+            if job.priority != head.priority:
+                break
+            if self._input_ready(job):
+                return job
+        return None
+
+    def _input_ready(self, job: ConversionJob) -> bool:
+        if self.staging is None:
+            return True
+        if job.id not in self._staged_inputs:
+            return False
+        future = self._staged_inputs[job.id]
+        return future is None or future.done()
+
+    def _release(self, job: ConversionJob) -> None:
+        with self._cond:
+            self._running.discard(job.id)
+            self._paused.pop(job.id, None)
+            self.memory_budget.release(job.id)
+            notices = self._rebalance()
+            self._cond.notify_all()
+        self._publish_all(notices)
+
+    def _active_jobs(self) -> int:
+        return len(self._running) - len(self._paused)
+
+    def _rebalance(self) -> list[EngineEvent]:
+        notices: list[EngineEvent] = []
+        waiting = [self.journal.get(job_id) for job_id, automatic in self._paused.items() if automatic]
+        waiting.sort(key=lambda job: -job.priority.rank)
+        for job in waiting:
+            if self._active_jobs() >= self.max_jobs:
+                break
+            if self._queue and self._queue[0].priority.rank > job.priority.rank:
+                break
+            del self._paused[job.id]
+            if self.supervisor.resume(job.id) and job.status == JobStatus.PAUSED:
+                job.status = JobStatus.RUNNING
+                notices.append(JobResumed(job.id, job.input_file))
+
+        if not self._queue or self._queue[0].priority != JobPriority.URGENT or self._active_jobs() < self.max_jobs:
+            return notices
+        # Urgent work takes the CPU from the least important running job; SIGSTOP keeps its encoder state.
+        urgent = self._queue[0]
+        candidates = [
+            job for job in map(self.journal.get, self._running)
+            if job is not None and job.id not in self._paused and job.priority.rank < urgent.priority.rank
+        ]
+        for job in sorted(candidates, key=lambda job: job.priority.rank):
+            if job.status == JobStatus.RUNNING and self.supervisor.pause(job.id):
+                job.status = JobStatus.PAUSED
+                self._paused[job.id] = True
+                logging.info("Pausing %s for urgent job %s", job.input_file, urgent.input_file)
+                notices.append(JobPaused(job.id, job.input_file, preempted_by=urgent.id))
+                break
+        return notices
+
+    def _publish_all(self, events: list[EngineEvent]) -> None:
+        for event in events:
+            self.events.publish(event)
+
+    def _process(self, job: ConversionJob) -> bool:
+        ffmpeg_path = self.get_ffmpeg_path()
+        if ffmpeg_path is None:
+            self.events.publish(EngineMessage("FFmpeg not found"))
+            job.error = "FFmpeg not found"
+            self._complete(job, JobStatus.FAILED)
+            return False
+
+        current_format = self._resolve_format(job.input_file, job.output_format)
+        if current_format is None:
+            self.events.publish(EngineMessage(f"Skipping {job.filename}"))
+            self._complete(job, JobStatus.CANCELLED)
+            return False
+
+        job.output_format = current_format
+        job.output_file, skip = self.namer.claim(
+            job,
+            dimensions=lambda file: self._dimensions(ffmpeg_path, file),
+            origin=lambda path: self.probe_index.get(path, "origin"),
+        )
+        if skip:
+            self._complete(job, JobStatus.SKIPPED)
+            return False
+        job.fingerprint = job.fingerprint or source_fingerprint(job)
+        os.makedirs(os.path.dirname(os.path.abspath(job.output_file)), exist_ok=True)
+
+        if not self._wait_for_space(job) or not self._wait_for_memory(job, ffmpeg_path):
+            self._complete(job, JobStatus.CANCELLED)
+            return False
+
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        batch = self._batches.get(job.batch_id)
+        position = batch.completed + 1 if batch else 1
+        total = batch.total if batch else 1
+        self.events.publish(JobStarted(job.id, job.input_file, job.output_file, position, total))
+
+        auto_quality = job.auto_quality
+        if (
+            auto_quality is not None
+            and job.kind == JobKind.CONVERT
+            and "-crf" in job.quality_flags
+            and get_format_type(current_format) == "video"
+        ):
+            self.events.publish(JobProgress(job.id, "analyzing", f"Analyzing quality: {job.filename}..."))
+            crf = auto_quality.find_crf(
+                ffmpeg_path, job.input_file, current_format, job.quality_flags, self._command_runner(job),
+            )
+            if job.status == JobStatus.CANCELLED or self._stop_requested:
+                self._complete(job, JobStatus.CANCELLED)
+                return False
+            if crf is not None:
+                job.quality_flags = replace_flag(job.quality_flags, "-crf", str(crf))
+
+        loudness = job.loudness
+        if (
+            loudness is not None
+            and job.kind == JobKind.CONVERT
+            and get_format_type(current_format) in ("audio", "video")
+            and not any("loudnorm=" in flag for flag in job.quality_flags)
+        ):
+            self.events.publish(JobProgress(job.id, "analyzing", f"Measuring loudness: {job.filename}..."))
+            job.quality_flags = loudness.encode_flags(
+                ffmpeg_path,
+                job.input_file,
+                job.quality_flags,
+                self._command_runner(job),
+                mapped_audio_tracks(ffmpeg_path, job, self.probe_index),
+            )
+            if job.status == JobStatus.CANCELLED or self._stop_requested:
+                self._complete(job, JobStatus.CANCELLED)
+                return False
+
+        if self.staging is not None:
+            job.staged_input = self.staging.acquire_input(job.id, job.input_file)
+        if job.status == JobStatus.CANCELLED:
+            self._complete(job, JobStatus.CANCELLED)
+            return False
+        logging.info("Starting conversion for %s", job.input_file)
+        return self._launch_ffmpeg(ffmpeg_path, job)
+
+    def _dimensions(self, ffmpeg_path: str, file: str) -> tuple[int, int] | None:
+        info = self.probe_index.probe(ffmpeg_path, file)
+        if info is None:
+            return None
+        for stream in info.video_streams:
+            if stream.width and stream.height:
+                return stream.width, stream.height
+        return None
+
+    def _complete(self, job: ConversionJob, status: JobStatus) -> None:
+        self.namer.release(job.id)
+        if self.staging is not None:
+            self.staging.release(job.id)
+            job.staged_input = None
+        with self._cond:
+            self._staged_inputs.pop(job.id, None)
+            if job.finished_at is not None:
+                return
+            job.status = status
+            job.finished_at = time.time()
+            batch = self._batches.get(job.batch_id)
+            if batch is not None:
+                batch.completed += 1
+                if status in (JobStatus.DONE, JobStatus.SKIPPED):
+                    batch.succeeded += 1
+                elif status == JobStatus.FAILED:
+                    batch.failed += 1
+                if batch.completed >= batch.total:
+                    del self._batches[job.batch_id]
+                completed, succeeded, failed = batch.completed, batch.succeeded, batch.failed
+
+        if status == JobStatus.DONE:
+            self.events.publish(JobFinished(job.id, job.input_file, job.output_file))
+        elif status == JobStatus.SKIPPED:
+            self.events.publish(JobFinished(job.id, job.input_file, job.output_file, skipped=True))
+        elif status == JobStatus.FAILED:
+            kind = job.failure.kind.value if job.failure else FailureKind.UNKNOWN.value
+            self.events.publish(JobFailed(job.id, job.input_file, job.error or "unknown error", kind))
+        elif status == JobStatus.CANCELLED:
+            self.events.publish(JobCancelled(job.id, job.input_file))
+
+        if batch is not None:
+            self.events.publish(BatchProgress(job.batch_id, completed, batch.total))
+            if completed >= batch.total:
+                if not self._stop_requested:
+                    logging.info("All conversions complete.")
+                self.events.publish(BatchFinished(
+                    job.batch_id, batch.total, succeeded, failed, stopped=self._stop_requested,
+                ))
+        self._settle_duplicates(job, status)
+
+    @staticmethod
+    def _duplicate_candidates(jobs: list[ConversionJob]) -> list[list[ConversionJob]]:
+        # Only jobs that would be encoded identically can share one output.
+        recipes: dict[tuple, list[ConversionJob]] = {}
+        for job in jobs:
+            single_output = job.packaging is None and len(job.audio_tracks) <= 1
+            if job.kind == JobKind.CONVERT and single_output and job.duplicate_of is None:
+                recipe = (
+                    job.output_format, job.output_folder, tuple(job.quality_flags), job.preset,
+                    job.name_template, job.collision, id(job.auto_quality), id(job.loudness), job.audio_tracks,
+                )
+                recipes.setdefault(recipe, []).append(job)
+        return [group for group in recipes.values() if len(group) > 1]
+
+    def _resolve_duplicates(self, group: list[ConversionJob]) -> None:
+        # Runs on the duplicate finder's thread; the group's jobs stay queued but are not dispatched until it is done.
+        found: list[list[ConversionJob]] = []
+        quality: dict[int, tuple[int, int]] = {}
+        try:
+            found = [
+                [group[n] for n in members]
+                for members in self.duplicates.find(self.get_ffmpeg_path(), [job.input_file for job in group])
+            ]
+            quality = {job.id: self._source_quality(job) for copies in found for job in copies}
+        except Exception:
+            logging.exception("Duplicate detection failed")
+            found = []
+        with self._cond:
+            for copies in found:
+                copies = [job for job in copies if job in self._queue]
+                if len(copies) < 2:
+                    continue
+                # The best-looking copy is the one that gets converted.
+                primary = max(copies, key=lambda job: quality[job.id])
+                for job in copies:
+                    if job is not primary:
+                        self._queue.remove(job)
+                        job.duplicate_of = primary.id
+                        self._duplicates.setdefault(primary.id, []).append(job)
+                        logging.info("%s duplicates %s", job.input_file, primary.input_file)
+            self._grouping.difference_update(job.id for job in group)
+            self._cond.notify_all()
+
+    def _source_quality(self, job: ConversionJob) -> tuple[int, int]:
+        cached = self.probe_index.get(job.input_file, "media")
+        video = MediaInfo.from_dict(cached).video_streams if cached else ()
+        pixels = max(((s.width or 0) * (s.height or 0) for s in video), default=0)
+        try:
+            size = os.path.getsize(job.input_file)
+        except OSError:
+            size = 0
+        return pixels, size
+
+    def _settle_duplicates(self, job: ConversionJob, status: JobStatus) -> None:
+        with self._cond:
+            waiting = self._duplicates.pop(job.id, [])
+        if not waiting:
+            return
+        if status == JobStatus.FAILED:
+            # A near-duplicate is a different file and may well convert where this one failed.
+            with self._cond:
+                for duplicate in waiting:
+                    duplicate.duplicate_of = None
+                    enqueue_by_priority(self._queue, duplicate)
+                self._ensure_worker()
+                self._cond.notify_all()
+            return
+        for duplicate in waiting:
+            if status not in (JobStatus.DONE, JobStatus.SKIPPED) or not job.output_file:
+                self._complete(duplicate, JobStatus.CANCELLED)
+                continue
+            self._link_duplicate(job, duplicate)
+
+    def _link_duplicate(self, job: ConversionJob, duplicate: ConversionJob) -> None:
+        duplicate.output_format = job.output_format
+        duplicate.output_file, skip = self.namer.claim(
+            duplicate, origin=lambda path: self.probe_index.get(path, "origin"),
+        )
+        if skip:
+            self._complete(duplicate, JobStatus.SKIPPED)
+            return
+        duplicate.fingerprint = source_fingerprint(duplicate)
+        self.events.publish(JobProgress(duplicate.id, "linking", f"Linking duplicate of {job.filename}"))
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(duplicate.output_file)), exist_ok=True)
+            link_output(job.output_file, duplicate.output_file)
+        except OSError as e:
+            logging.error("Could not link %s to %s: %s", job.output_file, duplicate.output_file, e)
+            duplicate.error = str(e)
+            duplicate.failure = FailureInfo(FailureKind.UNKNOWN, str(e))
+            self._complete(duplicate, JobStatus.FAILED)
+            return
+        logging.info("Linked %s to the output of %s", duplicate.output_file, job.input_file)
+        self.probe_index.set(duplicate.output_file, "origin", duplicate.fingerprint)
+        duplicate.progress = 1.0
+        self._complete(duplicate, JobStatus.DONE)
+
+    def _resolve_format(self, file: str, initial_format: str) -> str | None:
+        valid_formats = VALID_OUTPUT_FORMATS.get(get_file_type(file), [])
         if initial_format in valid_formats:
             return initial_format
 
+        if self._incompatible_callback is None:
+            return None
         return self._incompatible_callback(file, valid_formats)
 
-    @staticmethod
-    def _build_output_path(file: str, output_format: str, output_folder: str | None) -> str:
-        if output_folder:
-            output_filename = pathlib.Path(file).stem + f".{output_format}"
-            return os.path.join(output_folder, output_filename)
-        return str(pathlib.Path(file).with_suffix(f".{output_format}"))
-
-    def _run_ffmpeg(self, ffmpeg_path: str, input_file: str, output_file: str, quality_flags: list[str] | None = None) -> None:
+    def _launch_ffmpeg(self, ffmpeg_path: str, job: ConversionJob) -> bool:
+        local_output = self.staging.local_output(job.id, job.output_file) if self.staging else None
+        job.partial_file = local_output or partial_path(job.output_file)
+        source = job.staged_input or job.input_file
         try:
-            cmd = [ffmpeg_path, "-y", "-i", input_file] + (quality_flags or []) + [output_file]
-            logging.info("Running command: %s", " ".join(cmd))
-
-            self._current_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                env=get_subprocess_env(),
-                **get_subprocess_flags(),
+            plan = plan_command(ffmpeg_path, job, source, self.probe_index, self._command_runner(job))
+        except (OSError, ValueError) as e:
+            logging.error("Cannot build command for %s: %s", job.input_file, e)
+            job.error = str(e)
+            job.failure = FailureInfo(
+                FailureKind.MISSING_INPUT if isinstance(e, FileNotFoundError) else FailureKind.UNKNOWN, str(e),
             )
+            self._complete(job, JobStatus.FAILED)
+            return False
+        if job.status == JobStatus.CANCELLED or self._stop_requested:
+            self._complete(job, JobStatus.CANCELLED)
+            return False
+        job.rendition_files = list(plan.outputs)
+        threads = ["-threads", str(job.threads)] if job.threads else []
+        hwaccel = [] if plan.stream_copy else hwaccel_args(self.hardware_backend)
+        cmd = [ffmpeg_path, "-y", *threads, *hwaccel, *plan.input_args, *threads, *plan.output_args]
+        if not plan.outputs:
+            cmd.append(job.partial_file)
+        for action in plan.streams:
+            logging.info("Stream %s", action.describe())
+        logging.info("Running command: %s", " ".join(cmd))
+        duration = plan.duration
 
-            for line in self._current_process.stdout:
-                line = line.strip()
-                if line:
-                    logging.debug(line)
-                    if "frame=" in line or "time=" in line:
-                        self._status_callback(f"FFmpeg: {line[:80]}")
+        def on_line(line: str) -> None:
+            nonlocal duration
+            logging.debug(line)
+            if duration is None:
+                match = _DURATION_RE.search(line)
+                if match:
+                    duration = _to_seconds(match)
+            if "frame=" in line or "time=" in line:
+                fraction = None
+                match = _TIME_RE.search(line)
+                if match and duration:
+                    fraction = min(_to_seconds(match) / duration, 1.0)
+                    job.progress = fraction
+                self.events.publish(JobProgress(job.id, "encoding", f"FFmpeg: {line[:80]}", fraction))
 
-            self._current_process.wait()
+        memory_limit = None
+        if self.enforce_memory_limits and job.memory_estimate:
+            memory_limit = process_limit(job.memory_estimate)
+        future = self.supervisor.run(
+            job.id,
+            cmd,
+            on_line=on_line,
+            timeout=self.job_timeout,
+            stall_timeout=self.stall_timeout,
+            memory_limit=memory_limit,
+            threads=job.threads,
+        )
+        future.add_done_callback(lambda f: self._on_ffmpeg_done(job, f))
+        return True
 
-            rc = self._current_process.returncode
-            if rc != 0:
-                logging.error("FFmpeg exited with code %d", rc)
-                if os.path.exists(output_file):
-                    os.remove(output_file)
-            else:
-                logging.info("FFmpeg finished successfully for %s", input_file)
+    def _on_ffmpeg_done(self, job: ConversionJob, future: concurrent.futures.Future) -> None:
+        if self.staging is None:
+            try:
+                self._finish_ffmpeg(job, future)
+            finally:
+                self._release(job)
+            return
+        # The encode slot is free once ffmpeg exits; moving a staged output back runs on the I/O pool.
+        self._release(job)
+        self.staging.submit(self._finish_ffmpeg, job, future)
+
+    def _finish_ffmpeg(self, job: ConversionJob, future: concurrent.futures.Future) -> None:
+        try:
+            status = self._ffmpeg_status(job, future)
+        except Exception as e:
+            logging.exception("Unexpected error while finishing %s", job.input_file)
+            job.error = str(e)
+            status = JobStatus.FAILED
+        if status == JobStatus.QUEUED:
+            self._schedule_retry(job)
+        else:
+            self._complete(job, status)
 
+    def _schedule_retry(self, job: ConversionJob) -> None:
+        delay = self.retry_policy.delay(job.attempts - 1)
+        self.events.publish(JobRetrying(job.id, job.input_file, job.attempts, delay, job.error or ""))
+        with self._cond:
+            timer = threading.Timer(delay, self._requeue, (job,))
+            timer.daemon = True
+            self._retry_timers[job.id] = timer
+            timer.start()
+
+    def _requeue(self, job: ConversionJob) -> None:
+        with self._cond:
+            if self._retry_timers.pop(job.id, None) is None:
+                return
+            enqueue_by_priority(self._queue, job)
+            self._cond.notify_all()
+
+    def _ffmpeg_status(self, job: ConversionJob, future: concurrent.futures.Future) -> JobStatus:
+        if job.kind == JobKind.CONCAT:
+            discard_output(concat_list_path(job.partial_file))
+        outputs = job.rendition_files or [(job.partial_file, job.output_file)]
+        try:
+            result: ProcessResult = future.result()
         except OSError as e:
             logging.exception("Exception during FFmpeg run: %s", e)
-        finally:
-            self._current_process = None
+            for partial, _final in outputs:
+                discard_output(partial)
+            job.failure = FailureInfo(FailureKind.UNKNOWN, str(e))
+            job.error = str(e)
+            return JobStatus.FAILED
+
+        if result.returncode == 0 and result.stop_reason is None:
+            pending = list(outputs)
+            try:
+                while pending:
+                    partial, final = pending[0]
+                    if partial != partial_path(final):
+                        self.staging.write_back(partial, final)
+                    else:
+                        commit_output(partial, final)
+                    pending.pop(0)
+            except OSError as e:
+                logging.error("Could not move %s into place: %s", pending[0][0], e)
+                for partial, _final in pending:
+                    discard_output(partial)
+                job.failure = FailureInfo(FailureKind.UNKNOWN, str(e))
+                job.error = str(e)
+                return JobStatus.FAILED
+            logging.info("FFmpeg finished successfully for %s", job.input_file)
+            for _partial, final in outputs:
+                self.probe_index.set(final, "origin", job.fingerprint)
+            job.progress = 1.0
+            return JobStatus.DONE
+
+        for partial, _final in outputs:
+            discard_output(partial)
+        if job.status == JobStatus.CANCELLED or self._stop_requested:
+            logging.info("FFmpeg stopped for %s", job.input_file)
+            return JobStatus.CANCELLED
+        failure = classify_failure(result)
+        job.failure = failure
+        job.error = failure.reason
+        logging.error(
+            "FFmpeg failed for %s with code %s: %s (%s)",
+            job.input_file, result.returncode, failure.reason, failure.kind.value,
+        )
+        if failure.kind == FailureKind.OUT_OF_MEMORY:
+            # Every encoder thread keeps its own frames in flight, so fewer threads need less memory.
+            job.threads = max(1, (job.threads or cpu_threads()) // 2)
+        if self.retry_policy.should_retry(failure, job.attempts):
+            job.attempts += 1
+            job.status = JobStatus.QUEUED
+            job.progress = None
+            logging.warning("Retrying %s (attempt %d)", job.input_file, job.attempts + 1)
+            return JobStatus.QUEUED
+        return JobStatus.FAILED
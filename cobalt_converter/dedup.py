@@ -0,0 +1,282 @@
+import array
+import concurrent.futures
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from cobalt_converter.constants import get_file_type
+from cobalt_converter.probe import MediaInfo, ProbeIndex
+from cobalt_converter.utils import get_subprocess_env, get_subprocess_flags
+
+DEFAULT_HASH_WORKERS = 4
+HEAD_TAIL_BYTES = 1024 * 1024
+DURATION_TOLERANCE = 1.0
+FRAME_POSITIONS = (0.1, 0.3, 0.5, 0.7, 0.9)
+# Bits out of 64 two difference hashes of the same frame may differ by after a re-encode or rescale.
+FRAME_DISTANCE = 10
+# Flat frames (black, white, a single colour) hash to nearly all zeros or ones and say nothing about the content.
+_MIN_HASH_BITS = 8
+_MIN_DETAILED_FRAMES = 3
+AUDIO_SECONDS = 120
+AUDIO_SIMILARITY = 0.85
+_AUDIO_RATE = 2000
+_AUDIO_WINDOW = _AUDIO_RATE // 4
+_MIN_AUDIO_BITS = 40
+# Silence never gets louder, so its fingerprint is almost all zeros.
+_MIN_AUDIO_RISES = 0.1
+_READ_CHUNK = 1024 * 1024
+_SAMPLE_TIMEOUT = 60
+
+
+@dataclass(frozen=True)
+class ContentSignature:
+    # None when the file has no such stream; empty when the stream could not be sampled.
+    frames: tuple[int, ...] | None = None
+    audio: str | None = None
+
+    def matches(self, other: "ContentSignature") -> bool:
+        if (self.frames is None) != (other.frames is None) or (self.audio is None) != (other.audio is None):
+            return False
+        if self.frames is None and self.audio is None:
+            return False
+        # Every stream both files have must agree; one matching stream is not enough.
+        if self.frames is not None and not _frames_match(self.frames, other.frames):
+            return False
+        return self.audio is None or _audio_match(self.audio, other.audio)
+
+
+def _detailed(frame: int) -> bool:
+    return _MIN_HASH_BITS <= frame.bit_count() <= 64 - _MIN_HASH_BITS
+
+
+def _frames_match(a: tuple[int, ...], b: tuple[int, ...]) -> bool:
+    if not a or len(a) != len(b):
+        return False
+    if any((x ^ y).bit_count() > FRAME_DISTANCE for x, y in zip(a, b)):
+        return False
+    return sum(_detailed(x) and _detailed(y) for x, y in zip(a, b)) >= min(_MIN_DETAILED_FRAMES, len(a))
+
+
+def _audio_match(a: str, b: str) -> bool:
+    length = min(len(a), len(b))
+    if length < _MIN_AUDIO_BITS:
+        return False
+    if min(a[:length].count("1"), b[:length].count("1")) < length * _MIN_AUDIO_RISES:
+        return False
+    return sum(x == y for x, y in zip(a, b)) / length >= AUDIO_SIMILARITY
+
+
+def quick_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    size = os.path.getsize(path)
+    digest.update(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        digest.update(f.read(HEAD_TAIL_BYTES))
+        if size > HEAD_TAIL_BYTES:
+            f.seek(max(HEAD_TAIL_BYTES, size - HEAD_TAIL_BYTES))
+            digest.update(f.read(HEAD_TAIL_BYTES))
+    return digest.hexdigest()
+
+
+def full_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _run_sample(cmd: list[str]) -> bytes | None:
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            timeout=_SAMPLE_TIMEOUT,
+            env=get_subprocess_env(),
+            **get_subprocess_flags(),
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.debug("Content sampling failed: %s", e)
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def frame_hash(ffmpeg_path: str, file_path: str, position: float) -> int | None:
+    # Difference hash: the frame shrunk to 9x8 grey pixels, one bit per horizontally adjacent pair.
+    data = _run_sample([
+        ffmpeg_path, "-hide_banner", "-nostdin", "-ss", f"{position:.3f}", "-i", file_path,
+        "-map", "0:v:0", "-frames:v", "1", "-vf", "scale=9:8:flags=area,format=gray", "-f", "rawvideo", "-",
+    ])
+    if data is None or len(data) < 72:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (data[row * 9 + col] < data[row * 9 + col + 1])
+    return bits
+
+
+def audio_fingerprint(ffmpeg_path: str, file_path: str) -> str | None:
+    # One bit per quarter second: whether the loudness rose from the previous quarter.
+    data = _run_sample([
+        ffmpeg_path, "-hide_banner", "-nostdin", "-i", file_path, "-map", "0:a:0", "-t", str(AUDIO_SECONDS),
+        "-ac", "1", "-ar", str(_AUDIO_RATE), "-f", "s16le", "-",
+    ])
+    if not data:
+        return None
+    samples = array.array("h", data[: len(data) - len(data) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    energies = [
+        sum(s * s for s in samples[i:i + _AUDIO_WINDOW])
+        for i in range(0, len(samples) - _AUDIO_WINDOW + 1, _AUDIO_WINDOW)
+    ]
+    return "".join("1" if b > a else "0" for a, b in zip(energies, energies[1:]))
+
+
+class _Groups:
+    def __init__(self, size: int) -> None:
+        self._parent = list(range(size))
+
+    def find(self, n: int) -> int:
+        while self._parent[n] != n:
+            self._parent[n] = self._parent[self._parent[n]]
+            n = self._parent[n]
+        return n
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self._parent[max(a, b)] = min(a, b)
+
+    def members(self) -> list[list[int]]:
+        groups: dict[int, list[int]] = {}
+        for n in range(len(self._parent)):
+            groups.setdefault(self.find(n), []).append(n)
+        return [group for group in groups.values() if len(group) > 1]
+
+
+class DuplicateFinder:
+    def __init__(self, probe_index: ProbeIndex, workers: int = DEFAULT_HASH_WORKERS) -> None:
+        self._probe_index = probe_index
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="cobalt-dedup",
+        )
+        self._scanner = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="cobalt-dedup-scan")
+        self._scan_lock = threading.Lock()
+        self._scan: concurrent.futures.Future | None = None
+
+    def _cached(self, file_path: str, section: str, compute):
+        value = self._probe_index.get(file_path, section)
+        if value is None:
+            try:
+                value = compute()
+            except OSError as e:
+                logging.debug("Could not hash %s: %s", file_path, e)
+                return None
+            if value is not None:
+                self._probe_index.set(file_path, section, value)
+        return value
+
+    def quick_hash(self, file_path: str) -> str | None:
+        return self._cached(file_path, "quick_hash", lambda: quick_hash(file_path))
+
+    def full_hash(self, file_path: str) -> str | None:
+        return self._cached(file_path, "full_hash", lambda: full_hash(file_path))
+
+    def signature(self, ffmpeg_path: str, file_path: str, info: MediaInfo) -> ContentSignature:
+        frames = None
+        if info.video_streams:
+            def sample() -> list[int] | None:
+                hashes = [frame_hash(ffmpeg_path, file_path, info.duration * p) for p in FRAME_POSITIONS]
+                return None if None in hashes else hashes
+
+            frames = self._cached(file_path, "frame_hashes", sample)
+        audio = None
+        if info.audio_streams:
+            audio = self._cached(file_path, "audio_fingerprint", lambda: audio_fingerprint(ffmpeg_path, file_path))
+        return ContentSignature(
+            tuple(frames or ()) if info.video_streams else None, (audio or "") if info.audio_streams else None,
+        )
+
+    def find(self, ffmpeg_path: str | None, files: list[str]) -> list[list[int]]:
+        groups = _Groups(len(files))
+        self._exact(files, groups)
+        if ffmpeg_path:
+            self._similar(ffmpeg_path, files, groups)
+        found = groups.members()
+        if found:
+            logging.info("Found %d group(s) of duplicate inputs", len(found))
+        return found
+
+    def submit(self, fn: Callable, *args) -> concurrent.futures.Future:
+        return self._scanner.submit(fn, *args)
+
+    def prefetch(self, ffmpeg_path: str | None, files: list[str]) -> None:
+        # Warms the hash cache in the background so the scan at submit time is quick.
+        with self._scan_lock:
+            if self._scan is not None:
+                self._scan.cancel()
+            self._scan = self._scanner.submit(self.find, ffmpeg_path, list(files))
+
+    def _exact(self, files: list[str], groups: _Groups) -> None:
+        by_size: dict[int, list[int]] = {}
+        for n, file in enumerate(files):
+            try:
+                by_size.setdefault(os.path.getsize(file), []).append(n)
+            except OSError:
+                continue
+        # Each stage only looks at files the cheaper stage before it could not tell apart.
+        candidates = [n for group in by_size.values() if len(group) > 1 for n in group]
+        by_quick = _bucket(candidates, self._pool.map(self.quick_hash, [files[n] for n in candidates]))
+        candidates = [n for group in by_quick for n in group]
+        for group in _bucket(candidates, self._pool.map(self.full_hash, [files[n] for n in candidates])):
+            for n in group[1:]:
+                groups.union(group[0], n)
+
+    def _similar(self, ffmpeg_path: str, files: list[str], groups: _Groups) -> None:
+        representatives = [n for n in range(len(files)) if groups.find(n) == n]
+        media = [n for n in representatives if get_file_type(files[n]) in ("video", "audio")]
+        infos = dict(zip(media, self._pool.map(lambda n: self._probe_index.probe(ffmpeg_path, files[n]), media)))
+        timed = sorted((info.duration, n) for n, info in infos.items() if info is not None and info.duration)
+        pairs = []
+        for i, (duration, a) in enumerate(timed):
+            for other, b in timed[i + 1:]:
+                if other - duration > DURATION_TOLERANCE:
+                    break
+                if bool(infos[a].video_streams) == bool(infos[b].video_streams):
+                    pairs.append((a, b))
+        needed = sorted({n for pair in pairs for n in pair})
+        signatures = dict(zip(
+            needed, self._pool.map(lambda n: self.signature(ffmpeg_path, files[n], infos[n]), needed),
+        ))
+        matched = {frozenset(pair) for pair in pairs if signatures[pair[0]].matches(signatures[pair[1]])}
+        # Near matches are not transitive: a file only joins a group if it matches every file already in it.
+        clusters: list[list[int]] = []
+        for n in needed:
+            for cluster in clusters:
+                if all(frozenset((n, m)) in matched for m in cluster):
+                    cluster.append(n)
+                    break
+            else:
+                clusters.append([n])
+        for cluster in clusters:
+            for n in cluster[1:]:
+                groups.union(cluster[0], n)
+
+    def shutdown(self) -> None:
+        self._scanner.shutdown(wait=False, cancel_futures=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _bucket(indices: list[int], keys) -> list[list[int]]:
+    buckets: dict[str, list[int]] = {}
+    for n, key in zip(indices, keys):
+        if key is not None:
+            buckets.setdefault(key, []).append(n)
+    return [group for group in buckets.values() if len(group) > 1]
@@ -5,7 +5,10 @@ from typing import TYPE_CHECKING
 
 import wx
 
+from cobalt_converter.naming import TEMPLATE_FIELDS, CollisionPolicy, validate_template
+
 if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
     from cobalt_converter.translator import Translator
 
 
@@ -47,3 +50,93 @@ class IncompatibleFileDialog(wx.Dialog):
 
     def get_selected_format(self) -> str:
         return self.combo.GetValue()
+
+
+class FailedJobsDialog(wx.Dialog):
+    ID_RETRY = wx.NewIdRef()
+    ID_EXPORT = wx.NewIdRef()
+
+    def __init__(self, parent: wx.Window, jobs: list[ConversionJob], translator: Translator) -> None:
+        title = translator.get("failed_jobs_dialog_title")
+        super().__init__(parent, title=title, style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.translator = translator
+        self._build_ui(jobs)
+
+    def _build_ui(self, jobs: list[ConversionJob]) -> None:
+        t = self.translator
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        label = wx.StaticText(self, label=t.get("failed_jobs_message", count=len(jobs)))
+        sizer.Add(label, 0, wx.ALL | wx.EXPAND, 8)
+
+        self.list_ctrl = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL, size=(560, 240))
+        self.list_ctrl.InsertColumn(0, t.get("failed_jobs_file_column"), width=200)
+        self.list_ctrl.InsertColumn(1, t.get("failed_jobs_reason_column"), width=340)
+        for index, job in enumerate(jobs):
+            self.list_ctrl.InsertItem(index, job.filename)
+            self.list_ctrl.SetItem(index, 1, job.error or "")
+        sizer.Add(self.list_ctrl, 1, wx.ALL | wx.EXPAND, 8)
+
+        buttons = wx.BoxSizer(wx.HORIZONTAL)
+        retry_btn = wx.Button(self, self.ID_RETRY, t.get("retry_failed_btn"))
+        export_btn = wx.Button(self, self.ID_EXPORT, t.get("export_failed_btn"))
+        close_btn = wx.Button(self, wx.ID_CLOSE, t.get("close_btn"))
+        for button in (retry_btn, export_btn, close_btn):
+            buttons.Add(button, 0, wx.ALL, 4)
+            button.Bind(wx.EVT_BUTTON, lambda e: self.EndModal(e.GetId()))
+        sizer.Add(buttons, 0, wx.ALL | wx.ALIGN_RIGHT, 4)
+
+        self.SetEscapeId(wx.ID_CLOSE)
+        self.SetSizerAndFit(sizer)
+
+
+class OutputNamingDialog(wx.Dialog):
+    def __init__(
+        self,
+        parent: wx.Window,
+        template: str,
+        policy: CollisionPolicy,
+        translator: Translator,
+    ) -> None:
+        title = translator.get("output_naming_dialog_title")
+        super().__init__(parent, title=title, style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.translator = translator
+        self._policies = list(CollisionPolicy)
+        self._build_ui(template, policy)
+
+    def _build_ui(self, template: str, policy: CollisionPolicy) -> None:
+        t = self.translator
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        sizer.Add(wx.StaticText(self, label=t.get("name_template_label")), 0, wx.ALL, 8)
+        self.template_edit = wx.TextCtrl(self, value=template, size=(360, -1))
+        sizer.Add(self.template_edit, 0, wx.LEFT | wx.RIGHT | wx.EXPAND, 8)
+        fields = " ".join(f"{{{name}}}" for name in TEMPLATE_FIELDS)
+        hint = wx.StaticText(self, label=t.get("name_template_hint", fields=fields))
+        sizer.Add(hint, 0, wx.ALL, 8)
+
+        sizer.Add(wx.StaticText(self, label=t.get("collision_policy_label")), 0, wx.ALL, 8)
+        self.policy_choice = wx.Choice(
+            self, choices=[t.get(f"collision_{p.value}") for p in self._policies]
+        )
+        self.policy_choice.SetSelection(self._policies.index(policy))
+        sizer.Add(self.policy_choice, 0, wx.LEFT | wx.RIGHT | wx.EXPAND, 8)
+
+        buttons = self.CreateSeparatedButtonSizer(wx.OK | wx.CANCEL)
+        sizer.Add(buttons, 0, wx.ALL | wx.EXPAND, 8)
+        self.Bind(wx.EVT_BUTTON, self._on_ok, id=wx.ID_OK)
+
+        self.SetSizerAndFit(sizer)
+
+    def _on_ok(self, event: wx.CommandEvent) -> None:
+        try:
+            validate_template(self.get_template())
+        except ValueError as e:
+            wx.MessageBox(str(e), self.GetTitle(), wx.ICON_WARNING)
+            return
+        event.Skip()
+
+    def get_template(self) -> str:
+        return self.template_edit.GetValue().strip()
+
+    def get_policy(self) -> CollisionPolicy:
+        return self._policies[self.policy_choice.GetSelection()]
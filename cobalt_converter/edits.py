@@ -0,0 +1,342 @@
+import bisect
+import csv
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TextIO
+
+from cobalt_converter.constants import get_file_type, get_format_type
+from cobalt_converter.gif import GIF_FORMAT, plan_gif
+from cobalt_converter.outputs import partial_path
+from cobalt_converter.packaging import plan_package
+from cobalt_converter.plans import CommandPlan, JobKind, validate_range
+from cobalt_converter.probe import MediaInfo, ProbeIndex
+from cobalt_converter.scaling import ladder_renditions, rendition_flags, rendition_path, split_flag, split_graph
+from cobalt_converter.streams import CONTAINERS, plan_convert, plan_extract_audio
+from cobalt_converter.supervisor import CommandRunner
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+
+KEYFRAME_TOLERANCE = 0.04
+_KEYFRAME_TIMEOUT = 600
+_PTS_TIME_RE = re.compile(r"pts_time:\s*(-?\d+(?:\.\d+)?)")
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+@dataclass(frozen=True)
+class Clip:
+    start: float
+    end: float | None = None
+    name: str | None = None
+    input_file: str | None = None
+
+
+def parse_timecode(value: str | float | int) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        text = str(value).strip()
+        parts = text.split(":")
+        if not text or len(parts) > 3:
+            raise ValueError(f"Invalid timecode: {value!r}")
+        try:
+            numbers = [float(part) for part in parts]
+        except ValueError:
+            raise ValueError(f"Invalid timecode: {value!r}") from None
+        seconds = 0.0
+        for number in numbers:
+            seconds = seconds * 60 + number
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"Invalid timecode: {value!r}")
+    return seconds
+
+
+def read_clip_list(stream: TextIO, base_dir: str | None = None) -> list[Clip]:
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        return []
+    columns = {name.strip().lower(): name for name in reader.fieldnames if name}
+    if "start" not in columns:
+        raise ValueError("Clip list needs a 'start' column")
+
+    clips = []
+    for row_number, row in enumerate(reader, start=2):
+        values = {key: (row.get(original) or "").strip() for key, original in columns.items()}
+        if not any(values.values()):
+            continue
+        try:
+            start = parse_timecode(values["start"])
+            end = parse_timecode(values["end"]) if values.get("end") else None
+            validate_range(start, end)
+        except ValueError as e:
+            raise ValueError(f"Row {row_number}: {e}") from None
+        input_file = values.get("input") or values.get("file") or None
+        if input_file and base_dir and not os.path.isabs(input_file):
+            input_file = os.path.join(base_dir, input_file)
+        clips.append(Clip(start, end, values.get("name") or None, input_file))
+    return clips
+
+
+def load_clip_list(path: str) -> list[Clip]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return read_clip_list(f, os.path.dirname(os.path.abspath(path)))
+
+
+def clip_label(input_file: str, clip: Clip, index: int) -> str:
+    if clip.name:
+        name = _UNSAFE_NAME_RE.sub("_", clip.name).strip(" .")
+        if name:
+            return name
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return f"{stem}_clip{index:03d}"
+
+
+def concat_list_path(partial_file: str) -> str:
+    return partial_file + ".ffconcat"
+
+
+def _same_container(job: "ConversionJob", files: list[str]) -> bool:
+    target = job.output_format.lower()
+    return all(os.path.splitext(f)[1].lower().lstrip(".") == target for f in files)
+
+
+def find_keyframes(ffmpeg_path: str, input_file: str, run: CommandRunner) -> list[float] | None:
+    cmd = [
+        ffmpeg_path, "-hide_banner", "-nostdin", "-skip_frame", "nokey", "-i", input_file,
+        "-map", "0:v:0", "-an", "-sn", "-dn", "-vf", "showinfo", "-f", "null", "-",
+    ]
+    try:
+        result = run(cmd, _KEYFRAME_TIMEOUT)
+    except OSError as e:
+        logging.warning("Keyframe scan failed for %s: %s", input_file, e)
+        return None
+    if not result.succeeded:
+        logging.warning(
+            "Keyframe scan for %s ended with %s", input_file, result.stop_reason or f"code {result.returncode}",
+        )
+        return None
+    return sorted(float(match) for match in _PTS_TIME_RE.findall("\n".join(result.output or [])))
+
+
+def keyframes(ffmpeg_path: str, input_file: str, probe_index: ProbeIndex, run: CommandRunner) -> list[float] | None:
+    cached = probe_index.get(input_file, "keyframes")
+    if cached is not None:
+        return cached
+    logging.info("Scanning keyframes of %s", input_file)
+    found = find_keyframes(ffmpeg_path, input_file, run)
+    if found is not None:
+        probe_index.set(input_file, "keyframes", found)
+    return found
+
+
+def keyframe_at(times: list[float], position: float) -> float | None:
+    index = bisect.bisect_right(times, position + KEYFRAME_TOLERANCE)
+    if index == 0:
+        return None
+    candidate = times[index - 1]
+    return candidate if position - candidate <= KEYFRAME_TOLERANCE else None
+
+
+def plan_trim(
+    ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex, run: CommandRunner,
+) -> CommandPlan:
+    start = job.start or 0.0
+    validate_range(start, job.end)
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    if job.end is not None:
+        duration = job.end - start
+    elif info is not None and info.duration:
+        duration = max(info.duration - start, 0.0)
+    else:
+        duration = None
+
+    seek = start
+    copy = not job.quality_flags and _same_container(job, [job.input_file])
+    if copy and start > 0 and (info is None or info.video_streams):
+        # A stream copy can only begin on a keyframe; anywhere else needs a re-encode to stay frame accurate.
+        times = keyframes(ffmpeg_path, job.input_file, probe_index, run)
+        keyframe = keyframe_at(times, start) if times else None
+        if keyframe is None:
+            copy = False
+        else:
+            seek = keyframe
+
+    input_args = (["-ss", f"{seek:.3f}"] if seek > 0 else []) + ["-i", source]
+    output_args = ["-t", f"{duration:.3f}"] if job.end is not None else []
+    if copy:
+        output_args += ["-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        output_args += list(job.quality_flags)
+    logging.info(
+        "Trimming %s from %.3fs (%s)", job.input_file, start, "stream copy" if copy else "re-encode",
+    )
+    return CommandPlan(tuple(input_args), tuple(output_args), duration, copy)
+
+
+def _stream_signature(info: MediaInfo) -> tuple:
+    return tuple(
+        (s.kind, s.codec, s.width, s.height, s.fps, s.sample_rate, s.channels)
+        for s in info.streams
+        if s.kind in ("video", "audio")
+    )
+
+
+def _concat_filter(infos: list[MediaInfo], video_filter: str | None = None) -> tuple[str, list[str]]:
+    has_video = all(info.video_streams for info in infos)
+    has_audio = all(info.audio_streams for info in infos)
+    if not has_video and not has_audio:
+        raise ValueError("Inputs have no audio or video stream in common")
+
+    chains = []
+    segments = []
+    if has_video:
+        first = infos[0].video_streams[0]
+        steps = []
+        if first.width and first.height:
+            steps.append(
+                f"scale={first.width}:{first.height}:force_original_aspect_ratio=decrease,"
+                f"pad={first.width}:{first.height}:(ow-iw)/2:(oh-ih)/2"
+            )
+        steps.append("setsar=1")
+        if first.fps:
+            steps.append(f"fps={first.fps:g}")
+    for n in range(len(infos)):
+        if has_video:
+            chains.append(f"[{n}:v:0]{','.join(steps)}[v{n}]")
+            segments.append(f"[v{n}]")
+        if has_audio:
+            segments.append(f"[{n}:a:0]")
+
+    filter_video = has_video and bool(video_filter)
+    outputs = (["[outv]"] if has_video else []) + (["[outa]"] if has_audio else [])
+    joined = (["[joinedv]" if filter_video else "[outv]"] if has_video else []) + (["[outa]"] if has_audio else [])
+    chains.append(
+        "".join(segments) + f"concat=n={len(infos)}:v={int(has_video)}:a={int(has_audio)}" + "".join(joined)
+    )
+    if filter_video:
+        # -vf cannot be combined with -filter_complex, so preset scaling runs after the join.
+        chains.append(f"[joinedv]{video_filter}[outv]")
+    maps = []
+    for label in outputs:
+        maps += ["-map", label]
+    return ";".join(chains), maps
+
+
+def _write_concat_list(path: str, files: list[str]) -> None:
+    lines = ["ffconcat version 1.0"]
+    for file in files:
+        escaped = os.path.abspath(file).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def plan_concat(ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex) -> CommandPlan:
+    originals = [job.input_file, *job.extra_inputs]
+    sources = [source, *job.extra_inputs]
+    missing = [f for f in originals if not os.path.isfile(f)]
+    if missing:
+        raise FileNotFoundError(f"Missing concat input: {missing[0]}")
+    infos = [probe_index.probe(ffmpeg_path, f) for f in originals]
+    probed = [info for info in infos if info is not None]
+    durations = [info.duration for info in probed]
+    duration = sum(durations) if len(probed) == len(infos) and all(durations) else None
+
+    if len(probed) == len(infos):
+        signatures = {_stream_signature(info) for info in probed}
+        if len(signatures) == 1 and not job.quality_flags and _same_container(job, originals):
+            list_path = concat_list_path(job.partial_file)
+            _write_concat_list(list_path, sources)
+            logging.info("Joining %d inputs into %s without re-encoding", len(sources), job.output_file)
+            return CommandPlan(
+                ("-f", "concat", "-safe", "0", "-i", list_path),
+                ("-map", "0", "-c", "copy"),
+                duration,
+                True,
+            )
+        video_filter, flags = split_flag(job.quality_flags, "-vf")
+        graph, maps = _concat_filter(probed, video_filter)
+        input_args = []
+        for file in sources:
+            input_args += ["-i", file]
+        logging.info("Joining %d inputs into %s with re-encode", len(sources), job.output_file)
+        return CommandPlan(
+            tuple(input_args),
+            ("-filter_complex", graph, *maps, *flags),
+            duration,
+        )
+
+    # Without stream details, fall back to the demuxer and let ffmpeg re-encode.
+    list_path = concat_list_path(job.partial_file)
+    _write_concat_list(list_path, sources)
+    return CommandPlan(
+        ("-f", "concat", "-safe", "0", "-i", list_path),
+        tuple(job.quality_flags),
+        duration,
+    )
+
+
+def plan_ladder(ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex) -> CommandPlan:
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    renditions = ladder_renditions(job, info)
+
+    # Each rendition carries its own size limit, so the preset's single -vf scale is dropped.
+    _, base_flags = split_flag(job.quality_flags, "-vf")
+    output_args: list[str] = []
+    outputs = []
+    for n, rendition in enumerate(renditions):
+        final = rendition_path(job.output_file, rendition.name)
+        partial = partial_path(final)
+        output_args += ["-map", f"[v{n}]", "-map", "0:a?", *rendition_flags(base_flags, rendition), partial]
+        outputs.append((partial, final))
+    logging.info(
+        "Encoding %s as %s from one decode", job.input_file, ", ".join(r.name for r in renditions),
+    )
+    return CommandPlan(
+        ("-i", source),
+        ("-filter_complex", split_graph(renditions), *output_args),
+        info.duration if info else None,
+        outputs=tuple(outputs),
+    )
+
+
+def _is_extraction(job: "ConversionJob") -> bool:
+    return get_format_type(job.output_format) == "audio" and get_file_type(job.input_file) == "video"
+
+
+def mapped_audio_tracks(ffmpeg_path: str, job: "ConversionJob", probe_index: ProbeIndex) -> tuple[int, ...]:
+    # The input audio tracks a convert job writes; track N of a container output is its audio stream a:N.
+    if job.packaging is not None:
+        return (0,)
+    if _is_extraction(job):
+        return job.audio_tracks or (0,)
+    rules = CONTAINERS.get(job.output_format.lower())
+    if rules is None or not rules.multiple_audio:
+        return (0,)
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    if info is None or not info.video_streams or not info.audio_streams:
+        return (0,)
+    return tuple(range(len(info.audio_streams)))
+
+
+def plan_command(
+    ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex, run: CommandRunner,
+) -> CommandPlan:
+    if job.packaging is not None:
+        return plan_package(ffmpeg_path, job, source, probe_index)
+    if job.output_format.lower() == GIF_FORMAT:
+        if job.kind not in (JobKind.CONVERT, JobKind.TRIM):
+            raise ValueError(f"{job.kind.value} jobs cannot produce a GIF")
+        return plan_gif(ffmpeg_path, job, source, probe_index, run)
+    if job.kind == JobKind.TRIM:
+        return plan_trim(ffmpeg_path, job, source, probe_index, run)
+    if job.kind == JobKind.CONCAT:
+        return plan_concat(ffmpeg_path, job, source, probe_index)
+    if job.kind == JobKind.LADDER:
+        return plan_ladder(ffmpeg_path, job, source, probe_index)
+    if _is_extraction(job):
+        return plan_extract_audio(ffmpeg_path, job, source, probe_index)
+    return plan_convert(ffmpeg_path, job, source, probe_index)
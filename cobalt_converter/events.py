@@ -0,0 +1,163 @@
+import logging
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True)
+class EngineEvent:
+    pass
+
+
+@dataclass(frozen=True)
+class EngineMessage(EngineEvent):
+    message: str
+
+
+@dataclass(frozen=True)
+class JobQueued(EngineEvent):
+    job_id: int
+    batch_id: int
+    input_file: str
+    output_format: str
+
+
+@dataclass(frozen=True)
+class JobStarted(EngineEvent):
+    job_id: int
+    input_file: str
+    output_file: str
+    position: int
+    total: int
+
+
+@dataclass(frozen=True)
+class JobProgress(EngineEvent):
+    job_id: int
+    stage: str
+    message: str
+    fraction: float | None = None
+
+
+@dataclass(frozen=True)
+class JobFinished(EngineEvent):
+    job_id: int
+    input_file: str
+    output_file: str
+    skipped: bool = False
+
+
+@dataclass(frozen=True)
+class JobFailed(EngineEvent):
+    job_id: int
+    input_file: str
+    reason: str
+    kind: str = "unknown"
+
+
+@dataclass(frozen=True)
+class JobCancelled(EngineEvent):
+    job_id: int
+    input_file: str
+
+
+@dataclass(frozen=True)
+class JobRetrying(EngineEvent):
+    job_id: int
+    input_file: str
+    attempt: int
+    delay: float
+    reason: str
+
+
+@dataclass(frozen=True)
+class JobPaused(EngineEvent):
+    job_id: int
+    input_file: str
+    preempted_by: int | None = None
+
+
+@dataclass(frozen=True)
+class JobResumed(EngineEvent):
+    job_id: int
+    input_file: str
+
+
+@dataclass(frozen=True)
+class JobReprioritized(EngineEvent):
+    job_id: int
+    priority: str
+    position: int | None
+
+
+@dataclass(frozen=True)
+class DiskSpaceLow(EngineEvent):
+    path: str
+    free_bytes: int
+    required_bytes: int
+
+
+@dataclass(frozen=True)
+class QueuePaused(EngineEvent):
+    reason: str
+    path: str
+    free_bytes: int
+    required_bytes: int
+
+
+@dataclass(frozen=True)
+class QueueResumed(EngineEvent):
+    reason: str = "disk_space"
+
+
+@dataclass(frozen=True)
+class BatchProgress(EngineEvent):
+    batch_id: int
+    completed: int
+    total: int
+
+
+@dataclass(frozen=True)
+class BatchFinished(EngineEvent):
+    batch_id: int
+    total: int
+    succeeded: int
+    failed: int
+    stopped: bool
+
+
+EventCallback = Callable[[EngineEvent], None]
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._subscribers: list[tuple[EventCallback, tuple[type, ...] | None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        callback: EventCallback,
+        event_types: tuple[type, ...] | None = None,
+    ) -> Callable[[], None]:
+        entry = (callback, event_types)
+        with self._lock:
+            self._subscribers = self._subscribers + [entry]
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not entry]
+
+        return unsubscribe
+
+    def publish(self, event: EngineEvent) -> None:
+        for callback, event_types in self._subscribers:
+            if event_types is not None and not isinstance(event, event_types):
+                continue
+            try:
+                callback(event)
+            except Exception:
+                logging.exception("Event subscriber %r failed on %r", callback, event)
+
+
+def event_to_dict(event: EngineEvent) -> dict:
+    return {"type": type(event).__name__, **asdict(event)}
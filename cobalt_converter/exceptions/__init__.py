@@ -1,3 +1,12 @@
+from cobalt_converter.exceptions.cluster_exceptions import (
+    ClusterError,
+    CoordinatorUnavailableError,
+    WorkerNotRegisteredError,
+)
+from cobalt_converter.exceptions.config_exceptions import (
+    ConfigError,
+    ConfigValidationError,
+)
 from cobalt_converter.exceptions.ffmpeg_exceptions import (
     FFmpegDownloadError,
     FFmpegExtractionError,
@@ -5,7 +14,12 @@ from cobalt_converter.exceptions.ffmpeg_exceptions import (
 )
 
 __all__ = [
+    "ClusterError",
+    "ConfigError",
+    "ConfigValidationError",
+    "CoordinatorUnavailableError",
     "FFmpegDownloadError",
     "FFmpegExtractionError",
     "UnsupportedPlatformError",
+    "WorkerNotRegisteredError",
 ]
@@ -0,0 +1,10 @@
+class ClusterError(Exception):
+    pass
+
+
+class CoordinatorUnavailableError(ClusterError):
+    pass
+
+
+class WorkerNotRegisteredError(ClusterError):
+    pass
@@ -0,0 +1,6 @@
+class ConfigError(Exception):
+    pass
+
+
+class ConfigValidationError(ConfigError):
+    pass
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import csv
+import re
+import signal
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+    from cobalt_converter.supervisor import ProcessResult
+
+
+class FailureKind(str, Enum):
+    CORRUPT_INPUT = "corrupt_input"
+    UNSUPPORTED_CODEC = "unsupported_codec"
+    MISSING_INPUT = "missing_input"
+    PERMISSION_DENIED = "permission_denied"
+    DISK_FULL = "disk_full"
+    OUT_OF_MEMORY = "out_of_memory"
+    KILLED = "killed"
+    STALLED = "stalled"
+    TIMEOUT = "timeout"
+    UNKNOWN = "unknown"
+
+    @property
+    def transient(self) -> bool:
+        return self in _TRANSIENT_KINDS
+
+
+_TRANSIENT_KINDS = frozenset({
+    FailureKind.DISK_FULL,
+    FailureKind.OUT_OF_MEMORY,
+    FailureKind.KILLED,
+    FailureKind.STALLED,
+})
+
+_PATTERNS: tuple[tuple[FailureKind, re.Pattern], ...] = (
+    (FailureKind.DISK_FULL, re.compile(r"No space left on device|Disk quota exceeded", re.I)),
+    (FailureKind.OUT_OF_MEMORY, re.compile(r"Cannot allocate memory|Out of memory|\bENOMEM\b", re.I)),
+    (FailureKind.MISSING_INPUT, re.compile(r"No such file or directory", re.I)),
+    (FailureKind.PERMISSION_DENIED, re.compile(r"Permission denied|Operation not permitted", re.I)),
+    (FailureKind.UNSUPPORTED_CODEC, re.compile(
+        r"Unknown encoder|Unknown decoder|Decoder \(codec .+\) not found|Encoder \(codec .+\) not found"
+        r"|codec not currently supported in container|Could not find tag for codec"
+        r"|Unsupported codec|Unknown format|Requested output format .+ is not a suitable output format",
+        re.I,
+    )),
+    # Only demuxer and decoder errors: muxers and encoders warn about "corrupt" or "truncated" data without failing.
+    (FailureKind.CORRUPT_INPUT, re.compile(
+        r"Invalid data found when processing input|moov atom not found|Invalid NAL unit size"
+        r"|error while decoding MB|corrupt decoded frame|Header missing|EBML header parsing failed"
+        r"|partial file",
+        re.I,
+    )),
+)
+
+_KILL_SIGNALS = frozenset({getattr(signal, "SIGKILL", 9), signal.SIGTERM})
+# How an encoder dies when it hits its memory limit: the cgroup OOM killer, or abort() on a failed allocation.
+_LIMIT_SIGNALS = frozenset({getattr(signal, "SIGKILL", 9), signal.SIGABRT})
+
+
+@dataclass(frozen=True)
+class FailureInfo:
+    kind: FailureKind
+    reason: str
+    detail: str = ""
+
+    @property
+    def transient(self) -> bool:
+        return self.kind.transient
+
+
+def _last_meaningful_line(tail: list[str]) -> str:
+    for line in reversed(tail):
+        if not line.startswith(("frame=", "size=")) and "time=" not in line:
+            return line
+    return ""
+
+
+def classify_failure(result: ProcessResult) -> FailureInfo:
+    detail = _last_meaningful_line(result.tail)
+    if result.stop_reason == "stalled":
+        return FailureInfo(FailureKind.STALLED, "FFmpeg stalled (no output)", detail)
+    if result.stop_reason == "timeout":
+        return FailureInfo(FailureKind.TIMEOUT, "FFmpeg timed out", detail)
+
+    # Scan newest lines first so the error ffmpeg bailed out on wins over earlier warnings.
+    for line in reversed(result.tail):
+        for kind, pattern in _PATTERNS:
+            if pattern.search(line):
+                return FailureInfo(kind, line, detail)
+
+    returncode = result.returncode
+    if returncode is not None and returncode < 0:
+        try:
+            name = signal.Signals(-returncode).name
+        except ValueError:
+            name = f"signal {-returncode}"
+        if result.memory_limit and -returncode in _LIMIT_SIGNALS:
+            reason = f"FFmpeg exceeded its {result.memory_limit // (1024 * 1024)} MiB memory limit ({name})"
+            return FailureInfo(FailureKind.OUT_OF_MEMORY, reason, detail)
+        kind = FailureKind.KILLED if -returncode in _KILL_SIGNALS else FailureKind.UNKNOWN
+        return FailureInfo(kind, f"FFmpeg was killed ({name})", detail)
+    return FailureInfo(FailureKind.UNKNOWN, detail or f"FFmpeg exited with code {returncode}", detail)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 2
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+
+    def should_retry(self, failure: FailureInfo, attempts: int) -> bool:
+        return failure.transient and attempts < self.max_retries
+
+    def delay(self, attempts: int) -> float:
+        return min(self.base_delay * (2 ** attempts), self.max_delay)
+
+
+FAILURE_EXPORT_FIELDS = ("input_file", "output_format", "kind", "reason", "attempts", "batch_id")
+
+
+def write_failures_csv(jobs: Iterable[ConversionJob], stream: TextIO) -> int:
+    writer = csv.writer(stream)
+    writer.writerow(FAILURE_EXPORT_FIELDS)
+    count = 0
+    for job in jobs:
+        kind = job.failure.kind.value if job.failure else FailureKind.UNKNOWN.value
+        writer.writerow([job.input_file, job.output_format, kind, job.error or "", job.attempts, job.batch_id])
+        count += 1
+    return count
+
+
+def export_failures(jobs: Iterable[ConversionJob], path: str) -> int:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return write_failures_csv(jobs, f)
@@ -17,12 +17,15 @@ class FFmpegResolver:
     def __init__(
         self,
         bin_dir: pathlib.Path,
-        config_path: pathlib.Path,
+        config_path: pathlib.Path | None = None,
         progress_callback: Callable[[int, int], None] | None = None,
         status_callback: Callable[[str], None] | None = None,
+        config: dict | None = None,
     ) -> None:
+        if config is None and config_path is None:
+            raise FFmpegDownloadError("Either config or config_path is required")
         self._bin_dir = bin_dir
-        self._config = self._load_config(config_path)
+        self._config = config if config is not None else self._load_config(config_path)
         self._progress_callback = progress_callback
         self._status_callback = status_callback
 
@@ -5,6 +5,7 @@ import threading
 
 import wx
 
+from cobalt_converter.config_store import get_store
 from cobalt_converter.exceptions.ffmpeg_exceptions import (
     FFmpegDownloadError,
     FFmpegExtractionError,
@@ -58,7 +59,7 @@ class FFmpegDownloadMixin:
         try:
             resolver = FFmpegResolver(
                 bin_dir=pathlib.Path(get_base_path()) / "bin",
-                config_path=pathlib.Path(os.path.dirname(__file__)) / "config" / "ffmpeg_sources.json",
+                config=get_store("ffmpeg_sources").data,
                 progress_callback=lambda downloaded, total: wx.CallAfter(
                     self._set_download_progress, downloaded, total
                 ),
@@ -3,12 +3,8 @@ import os
 
 import wx
 
-from cobalt_converter.constants import (
-    AUDIO_FORMATS,
-    IMAGE_FORMATS,
-    VIDEO_FORMATS,
-    get_file_type,
-)
+from cobalt_converter.constants import VALID_OUTPUT_FORMATS, get_file_type
+from cobalt_converter.previews import THUMB_HEIGHT, THUMB_WIDTH, Preview, format_badge
 
 
 class FileHandlingMixin:
@@ -37,23 +33,68 @@ class FileHandlingMixin:
         if added:
             self.list_sizer.Layout()
             self.scroll.FitInside()
+            wx.CallAfter(self._request_visible_previews)
+            if self.engine.deduplicate and len(self.files) > 1:
+                self.engine.duplicates.prefetch(getattr(self, "_cached_ffmpeg_path", None), self.files)
 
     def _add_file_item(self, file_path: str) -> None:
         panel = wx.Panel(self.scroll)
         sizer = wx.BoxSizer(wx.HORIZONTAL)
+        panel.thumb = wx.StaticBitmap(panel, size=(THUMB_WIDTH, THUMB_HEIGHT))
+        sizer.Add(panel.thumb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 2)
         label = wx.StaticText(panel, label=os.path.basename(file_path))
         label.SetToolTip(file_path)
-        sizer.Add(label, 1, wx.ALL | wx.EXPAND, 4)
+        sizer.Add(label, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 4)
+        panel.badge = wx.StaticText(panel)
+        panel.badge.SetForegroundColour(wx.Colour(128, 128, 128))
+        sizer.Add(panel.badge, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 4)
 
         remove_btn = wx.Button(panel, label="X", size=(28, 24))
         remove_btn.SetForegroundColour(wx.Colour(255, 0, 0))
         remove_btn.Bind(wx.EVT_BUTTON, lambda ev, f=file_path, p=panel: self._remove_file(f, p))
         sizer.Add(remove_btn, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 4)
         panel.SetSizer(sizer)
+        panel.Bind(wx.EVT_CONTEXT_MENU, lambda ev, f=file_path: self._show_job_menu(f))
 
         panel.file_path = file_path
+        panel.preview_requested = False
+        panel.preview_applied = False
+        self._file_panels[file_path] = panel
         self.list_sizer.Insert(self.list_sizer.GetItemCount() - 1, panel, 0, wx.EXPAND | wx.ALL, 2)
 
+    def _request_visible_previews(self) -> None:
+        if not self._file_panels:
+            return
+        visible_height = self.scroll.GetClientSize().height
+        ffmpeg_path = getattr(self, "_cached_ffmpeg_path", None)
+        for file_path, panel in self._file_panels.items():
+            if panel.preview_applied:
+                continue
+            top = panel.GetPosition().y
+            visible = top + panel.GetSize().height >= 0 and top <= visible_height
+            if visible and not panel.preview_requested:
+                panel.preview_requested = True
+                self.previews.request(ffmpeg_path, file_path, lambda p: wx.CallAfter(self._apply_preview, p))
+            elif not visible and panel.preview_requested:
+                panel.preview_requested = False
+                self.previews.forget(file_path)
+
+    def _apply_preview(self, preview: Preview) -> None:
+        panel = self._file_panels.get(preview.file_path)
+        if panel is None:
+            return
+        panel.preview_applied = True
+        if preview.image_path:
+            image = wx.Image(preview.image_path)
+            if image.IsOk():
+                panel.thumb.SetBitmap(wx.Bitmap(image))
+        panel.badge.SetLabel(format_badge(preview))
+        panel.Layout()
+
+    def _on_file_list_scrolled(self, event: wx.Event) -> None:
+        event.Skip()
+        wx.CallAfter(self._request_visible_previews)
+
     def _remove_file(self, file_to_remove: str, panel: wx.Panel | None = None) -> None:
         if self.is_converting:
             wx.MessageBox(
@@ -64,6 +105,8 @@ class FileHandlingMixin:
             return
         try:
             self.files.remove(file_to_remove)
+            self._file_panels.pop(file_to_remove, None)
+            self.previews.forget(file_to_remove)
             if panel is not None:
                 self.list_sizer.Hide(panel)
                 panel.Destroy()
@@ -89,6 +132,9 @@ class FileHandlingMixin:
             return
         logging.debug("Clearing all files (%d)", len(self.files))
         self.files.clear()
+        for file_path in self._file_panels:
+            self.previews.forget(file_path)
+        self._file_panels.clear()
         for child in list(self.scroll.GetChildren()):
             if hasattr(child, "file_path"):
                 child.Destroy()
@@ -102,15 +148,9 @@ class FileHandlingMixin:
         if not self.files:
             self.format_combo.Clear()
             return
-        current_selection = self.format_combo.GetValue()
         file_type = get_file_type(self.files[0])
-        formats: list[str] = []
-        if file_type == "video":
-            formats = VIDEO_FORMATS + AUDIO_FORMATS
-        elif file_type == "audio":
-            formats = AUDIO_FORMATS
-        elif file_type == "image":
-            formats = IMAGE_FORMATS
+        current_selection = self.format_combo.GetValue() or self.settings.last_used(file_type)[0]
+        formats = VALID_OUTPUT_FORMATS.get(file_type, [])
         self.format_combo.Clear()
         for f in formats:
             self.format_combo.Append(f)
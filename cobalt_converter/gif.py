@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from cobalt_converter.plans import CommandPlan, validate_range
+from cobalt_converter.probe import MediaInfo, ProbeIndex
+from cobalt_converter.scaling import split_flag
+from cobalt_converter.utils import get_base_path
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+    from cobalt_converter.supervisor import CommandRunner
+
+GIF_FORMAT = "gif"
+DEFAULT_DITHER = "sierra2_4a"
+DITHER_MODES = (
+    "bayer", "heckbert", "floyd_steinberg", "sierra2", "sierra2_4a", "sierra3", "burkes", "atkinson", "none",
+)
+STATS_MODES = ("full", "diff", "single")
+# paletteuse holds every frame until the palette exists; longer inputs get their palette from a separate pass.
+ONE_PASS_BUFFER_BYTES = 512 * 1024 * 1024
+_GIF_FLAGS = ("-gif_fps", "-gif_width", "-gif_colors", "-gif_dither", "-gif_stats")
+_PALETTE_TIMEOUT = 600
+_FALLBACK_FPS = 15.0
+# Frame delays are stored in hundredths of a second and viewers slow anything under 2 down to 10.
+MAX_FPS = 50.0
+
+
+def palette_dir() -> str:
+    return os.path.join(get_base_path(), "palettes")
+
+
+def _source_fps(info: MediaInfo | None) -> float | None:
+    return info.video_streams[0].fps if info is not None and info.video_streams else None
+
+
+@dataclass(frozen=True)
+class GifSettings:
+    fps: float | None = None
+    max_fps: float | None = None
+    width: int | None = None
+    scale_filter: str | None = None
+    colors: int = 256
+    dither: str = DEFAULT_DITHER
+    stats_mode: str = "full"
+
+    @classmethod
+    def from_flags(cls, flags: list[str] | tuple[str, ...]) -> tuple["GifSettings", list[str]]:
+        values: dict[str, str] = {}
+        rest = list(flags)
+        for flag in (*_GIF_FLAGS, "-r", "-fpsmax", "-vf"):
+            value, rest = split_flag(rest, flag)
+            if value is not None:
+                values[flag] = value
+        fps = values.get("-gif_fps", values.get("-r"))
+        dither = values.get("-gif_dither", DEFAULT_DITHER)
+        stats_mode = values.get("-gif_stats", "full")
+        if dither.split(":")[0] not in DITHER_MODES:
+            raise ValueError(f"Unknown GIF dither mode: {dither!r}")
+        if stats_mode not in STATS_MODES:
+            raise ValueError(f"Unknown GIF palette mode: {stats_mode!r}")
+        settings = cls(
+            fps=float(fps) if fps else None,
+            max_fps=float(values["-fpsmax"]) if "-fpsmax" in values else None,
+            width=int(values["-gif_width"]) if "-gif_width" in values else None,
+            scale_filter=values.get("-vf"),
+            colors=max(2, min(256, int(values.get("-gif_colors", 256)))),
+            dither=dither,
+            stats_mode=stats_mode,
+        )
+        return settings, rest
+
+    def output_fps(self, info: MediaInfo | None) -> float:
+        fps = self.fps or _source_fps(info) or _FALLBACK_FPS
+        return min(fps, self.max_fps or MAX_FPS, MAX_FPS)
+
+    def source_filters(self, info: MediaInfo | None) -> str:
+        fps = self.output_fps(info)
+        steps = [] if fps == _source_fps(info) else [f"fps={fps:g}"]
+        if self.scale_filter:
+            steps.append(self.scale_filter)
+        if self.width:
+            steps.append(f"scale=w='min(iw,{self.width})':h=-2:flags=lanczos")
+        return ",".join(steps) or "null"
+
+    def palettegen(self) -> str:
+        return f"palettegen=max_colors={self.colors}:stats_mode={self.stats_mode}"
+
+    def paletteuse(self) -> str:
+        # diff palettes suit screen recordings: only the changed rectangle of each frame is redithered.
+        diff = ":diff_mode=rectangle" if self.stats_mode == "diff" else ""
+        return f"paletteuse=dither={self.dither}{diff}"
+
+
+def one_pass_buffer(info: MediaInfo | None, settings: GifSettings, duration: float | None) -> int | None:
+    if info is None or not info.video_streams or not duration:
+        return None
+    stream = info.video_streams[0]
+    if not stream.width or not stream.height:
+        return None
+    width = min(stream.width, settings.width) if settings.width else stream.width
+    height = stream.height * width / stream.width
+    return int(duration * settings.output_fps(info) * width * height * 4)
+
+
+def palette_path(input_file: str, start: float, end: float | None, filters: str, settings: GifSettings) -> str:
+    try:
+        stat = os.stat(input_file)
+        signature = f"{stat.st_size}:{stat.st_mtime}"
+    except OSError:
+        signature = ""
+    key = "|".join([
+        os.path.abspath(input_file), signature, f"{start:.3f}", f"{end:.3f}" if end is not None else "",
+        filters, settings.palettegen(),
+    ])
+    return os.path.join(palette_dir(), hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
+
+
+def cached_palette(path: str) -> bool:
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+def generate_palette(
+    ffmpeg_path: str, input_args: list[str], filters: str, settings: GifSettings, path: str, run: "CommandRunner",
+) -> bool:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp.png"
+    cmd = [
+        ffmpeg_path, "-hide_banner", "-nostdin", "-y", *input_args,
+        "-vf", f"{filters},{settings.palettegen()}", "-frames:v", "1", "-update", "1", temp_path,
+    ]
+    try:
+        result = run(cmd, _PALETTE_TIMEOUT)
+    except OSError as e:
+        logging.warning("Palette generation failed for %s: %s", path, e)
+        return False
+    if not result.succeeded or not cached_palette(temp_path):
+        logging.warning("Palette generation ended with %s", result.stop_reason or f"code {result.returncode}")
+        return False
+    os.replace(temp_path, path)
+    return True
+
+
+def plan_gif(
+    ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex, run: "CommandRunner",
+) -> CommandPlan:
+    settings, flags = GifSettings.from_flags(job.quality_flags)
+    start = job.start or 0.0
+    validate_range(start, job.end)
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    if info is not None and not info.video_streams:
+        raise ValueError(f"{job.filename} has no video stream to animate")
+    if job.end is not None:
+        duration = job.end - start
+    elif info is not None and info.duration:
+        duration = max(info.duration - start, 0.0)
+    else:
+        duration = None
+
+    # The range is cut on the input side so the palette only sees frames that end up in the GIF.
+    input_args = (["-ss", f"{start:.3f}"] if start > 0 else []) + (
+        ["-t", f"{duration:.3f}"] if job.end is not None else []
+    ) + ["-i", source]
+    filters = settings.source_filters(info)
+    palette = palette_path(job.input_file, start, job.end, filters, settings)
+    buffer = one_pass_buffer(info, settings, duration)
+    if not cached_palette(palette) and (buffer is None or buffer > ONE_PASS_BUFFER_BYTES):
+        logging.info("Generating GIF palette for %s in a separate pass", job.input_file)
+        generate_palette(ffmpeg_path, input_args, filters, settings, palette, run)
+
+    output_args = ["-map", "[out]", "-an", "-sn", "-dn", *flags]
+    if cached_palette(palette):
+        logging.info("Encoding %s as GIF with cached palette %s", job.input_file, palette)
+        graph = f"[0:v:0]{filters}[x];[x][1:v]{settings.paletteuse()}[out]"
+        return CommandPlan(
+            (*input_args, "-i", palette),
+            ("-filter_complex", graph, *output_args),
+            duration,
+        )
+
+    # One decode feeds both palettegen and paletteuse; the palette is also kept for later runs.
+    os.makedirs(os.path.dirname(palette), exist_ok=True)
+    graph = (
+        f"[0:v:0]{filters},split[a][b];[a]{settings.palettegen()},split[p][keep];"
+        f"[b][p]{settings.paletteuse()}[out]"
+    )
+    logging.info("Encoding %s as GIF with palette generation in one pass", job.input_file)
+    return CommandPlan(
+        tuple(input_args),
+        ("-filter_complex", graph, "-map", "[keep]", "-frames:v", "1", "-update", "1", palette, *output_args),
+        duration,
+    )
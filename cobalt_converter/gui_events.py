@@ -0,0 +1,66 @@
+import threading
+from collections.abc import Callable, Hashable
+
+import wx
+
+from cobalt_converter.events import BatchProgress, EngineEvent, EventBus, JobProgress
+
+FRAME_INTERVAL_MS = 50
+
+
+class CoalescingEventDispatcher:
+    def __init__(
+        self,
+        bus: EventBus,
+        handler: Callable[[EngineEvent], None],
+        interval_ms: int = FRAME_INTERVAL_MS,
+    ) -> None:
+        self._handler = handler
+        self._interval_ms = interval_ms
+        self._pending: dict[Hashable, EngineEvent] = {}
+        self._sequence = 0
+        self._scheduled = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._unsubscribe = bus.subscribe(self._on_event)
+
+    def close(self) -> None:
+        self._unsubscribe()
+        # A flush may already be scheduled on the event loop; it must not reach a destroyed window.
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+
+    @staticmethod
+    def _coalesce_key(event: EngineEvent) -> Hashable | None:
+        if isinstance(event, JobProgress):
+            return ("progress", event.job_id)
+        if isinstance(event, BatchProgress):
+            return ("batch_progress", event.batch_id)
+        return None
+
+    def _on_event(self, event: EngineEvent) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            key = self._coalesce_key(event)
+            if key is None:
+                self._sequence += 1
+                key = ("event", self._sequence)
+            else:
+                self._pending.pop(key, None)
+            self._pending[key] = event
+            if self._scheduled:
+                return
+            self._scheduled = True
+        wx.CallAfter(wx.CallLater, self._interval_ms, self._flush)
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._scheduled = False
+        for event in events:
+            self._handler(event)
@@ -0,0 +1,16 @@
+from enum import Enum
+
+
+class HardwareBackend(str, Enum):
+    NONE = "none"
+    AUTO = "auto"
+    CUDA = "cuda"
+    QSV = "qsv"
+    VAAPI = "vaapi"
+    VIDEOTOOLBOX = "videotoolbox"
+    D3D11VA = "d3d11va"
+
+
+def hwaccel_args(backend: HardwareBackend) -> list[str]:
+    # Decode only: frames are copied back to system memory, so filters and software encoders work unchanged.
+    return [] if backend == HardwareBackend.NONE else ["-hwaccel", backend.value]
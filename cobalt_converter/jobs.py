@@ -0,0 +1,203 @@
+import collections
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+
+from cobalt_converter.auto_quality import AutoQualitySearch
+from cobalt_converter.failures import FailureInfo
+from cobalt_converter.loudness import LoudnessNormalizer
+from cobalt_converter.packaging import PackagingSpec
+from cobalt_converter.plans import JobKind
+from cobalt_converter.scaling import Rendition
+
+_ids = itertools.count(1)
+_ids_lock = threading.Lock()
+
+
+def next_id() -> int:
+    with _ids_lock:
+        return next(_ids)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    RETRIED = "retried"
+
+    @property
+    def is_terminal(self) -> bool:
+        return self not in (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.PAUSED)
+
+
+class JobPriority(str, Enum):
+    LOW = "low"
+    NORMAL = "normal"
+    HIGH = "high"
+    URGENT = "urgent"
+
+    @property
+    def rank(self) -> int:
+        return _PRIORITY_RANKS[self]
+
+
+_PRIORITY_RANKS = {JobPriority.LOW: 0, JobPriority.NORMAL: 1, JobPriority.HIGH: 2, JobPriority.URGENT: 3}
+
+
+@dataclass
+class ConversionJob:
+    input_file: str
+    output_format: str
+    output_folder: str | None = None
+    quality_flags: list[str] = field(default_factory=list)
+    preset: str = "default"
+    name_template: str | None = None
+    collision: str | None = None
+    kind: JobKind = JobKind.CONVERT
+    start: float | None = None
+    end: float | None = None
+    extra_inputs: list[str] = field(default_factory=list)
+    renditions: tuple[Rendition, ...] = ()
+    audio_tracks: tuple[int, ...] = ()
+    label: str | None = None
+    packaging: PackagingSpec | None = None
+    priority: JobPriority = JobPriority.NORMAL
+    threads: int | None = None
+    duplicate_of: int | None = None
+    id: int = field(default_factory=next_id)
+    batch_id: int = 0
+    status: JobStatus = JobStatus.QUEUED
+    output_file: str | None = None
+    partial_file: str | None = None
+    rendition_files: list[tuple[str, str]] = field(default_factory=list, repr=False)
+    staged_input: str | None = field(default=None, repr=False)
+    source_root: str | None = None
+    fingerprint: str | None = field(default=None, repr=False)
+    memory_estimate: int | None = None
+    error: str | None = None
+    failure: FailureInfo | None = field(default=None, compare=False)
+    progress: float | None = None
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    auto_quality: AutoQualitySearch | None = field(default=None, repr=False, compare=False)
+    loudness: LoudnessNormalizer | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.input_file)
+
+    def copy_for_retry(self) -> "ConversionJob":
+        return ConversionJob(
+            self.input_file,
+            self.output_format,
+            self.output_folder,
+            list(self.quality_flags),
+            preset=self.preset,
+            name_template=self.name_template,
+            collision=self.collision,
+            kind=self.kind,
+            start=self.start,
+            end=self.end,
+            extra_inputs=list(self.extra_inputs),
+            renditions=self.renditions,
+            audio_tracks=self.audio_tracks,
+            label=self.label,
+            packaging=self.packaging,
+            priority=self.priority,
+            threads=self.threads,
+            source_root=self.source_root,
+            auto_quality=self.auto_quality,
+            loudness=self.loudness,
+        )
+
+    def _rendition_outputs(self) -> list[str]:
+        if self.packaging is None and self.rendition_files:
+            return [final for _partial, final in self.rendition_files]
+        return [r.name for r in self.renditions]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "batch_id": self.batch_id,
+            "kind": self.kind.value,
+            "input_file": self.input_file,
+            "extra_inputs": list(self.extra_inputs),
+            "start": self.start,
+            "end": self.end,
+            "output_format": self.output_format,
+            "output_folder": self.output_folder,
+            "output_file": self.output_file,
+            "renditions": self._rendition_outputs(),
+            "audio_tracks": [n + 1 for n in self.audio_tracks],
+            "packaging": self.packaging.format.value if self.packaging else None,
+            "package_dir": self.rendition_files[0][1] if self.packaging and self.rendition_files else None,
+            "quality_flags": list(self.quality_flags),
+            "preset": self.preset,
+            "priority": self.priority.value,
+            "threads": self.threads,
+            "duplicate_of": self.duplicate_of,
+            "memory_estimate": self.memory_estimate,
+            "loudness": getattr(self.loudness, "target_name", None),
+            "status": self.status.value,
+            "error": self.error,
+            "failure_kind": self.failure.kind.value if self.failure else None,
+            "progress": self.progress,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def enqueue_by_priority(queue: collections.deque[ConversionJob], job: ConversionJob, ahead: bool = False) -> None:
+    # Equal priorities stay first in, first out unless the job is ahead of its peers (e.g. a lost lease).
+    position = len(queue)
+    while position > 0 and (
+        queue[position - 1].priority.rank < job.priority.rank
+        or (ahead and queue[position - 1].priority == job.priority)
+    ):
+        position -= 1
+    queue.insert(position, job)
+
+
+def move_in_queue(queue: collections.deque[ConversionJob], job: ConversionJob, position: int) -> None:
+    queue.remove(job)
+    queue.insert(max(0, min(position, len(queue))), job)
+
+
+class JobJournal:
+    def __init__(self) -> None:
+        self._jobs: dict[int, ConversionJob] = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: ConversionJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def get(self, job_id: int) -> ConversionJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def all(self) -> list[ConversionJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def by_batch(self, batch_id: int) -> list[ConversionJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.batch_id == batch_id]
+
+    def failed(self, batch_id: int | None = None) -> list[ConversionJob]:
+        with self._lock:
+            return [
+                job for job in self._jobs.values()
+                if job.status == JobStatus.FAILED and (batch_id is None or job.batch_id == batch_id)
+            ]
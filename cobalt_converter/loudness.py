@@ -0,0 +1,141 @@
+import json
+import logging
+import re
+
+from cobalt_converter.probe import ProbeIndex
+from cobalt_converter.supervisor import CommandRunner
+
+_MEASUREMENT_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+_JSON_BLOCK_RE = re.compile(r"\[Parsed_loudnorm[^\]]*\]\s*(\{.*?\})", re.S)
+_DEFAULT_SAMPLE_RATE = 48000
+_ANALYSIS_TIMEOUT = 3600
+
+
+def parse_loudnorm_output(text: str) -> dict[str, float] | None:
+    match = _JSON_BLOCK_RE.search(text)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1))
+        measurement = {key: float(data[key]) for key in _MEASUREMENT_KEYS}
+    except (json.JSONDecodeError, KeyError, ValueError):
+        return None
+    # Silent input reports -inf loudness, which cannot be normalized.
+    if any(value != value or value in (float("inf"), float("-inf")) for value in measurement.values()):
+        return None
+    return measurement
+
+
+def _audio_filter(flags: list[str]) -> str | None:
+    for flag in ("-af", "-filter:a"):
+        if flag in flags:
+            position = flags.index(flag)
+            if position + 1 < len(flags):
+                return flags[position + 1]
+    return None
+
+
+def merge_audio_filter(flags: list[str], audio_filter: str) -> list[str]:
+    result = list(flags)
+    for flag in ("-af", "-filter:a"):
+        if flag in result:
+            position = result.index(flag)
+            if position + 1 < len(result):
+                result[position + 1] = f"{result[position + 1]},{audio_filter}"
+                return result
+    return result + ["-af", audio_filter]
+
+
+class LoudnessNormalizer:
+    def __init__(
+        self,
+        target_name: str,
+        target: dict,
+        probe_index: ProbeIndex,
+    ) -> None:
+        self.target_name = target_name
+        self._integrated = float(target["integrated"])
+        self._true_peak = float(target["true_peak"])
+        self._range = float(target["range"])
+        self._probe_index = probe_index
+
+    @property
+    def target_spec(self) -> str:
+        return f"I={self._integrated:g}:TP={self._true_peak:g}:LRA={self._range:g}"
+
+    def measure(
+        self, ffmpeg_path: str, input_file: str, run: CommandRunner, track: int = 0,
+    ) -> dict[str, float] | None:
+        key = f"a:{track}:{self.target_spec}"
+        cached = self._probe_index.get(input_file, "loudness") or {}
+        if key in cached:
+            logging.info("Using cached loudness measurement for audio track %d of %s", track + 1, input_file)
+            return cached[key]
+
+        cmd = [
+            ffmpeg_path, "-hide_banner", "-nostdin", "-i", input_file,
+            "-map", f"0:a:{track}",
+            "-af", f"loudnorm={self.target_spec}:print_format=json",
+            "-f", "null", "-",
+        ]
+        logging.info("Measuring loudness of audio track %d of %s", track + 1, input_file)
+        try:
+            result = run(cmd, _ANALYSIS_TIMEOUT)
+        except OSError as e:
+            logging.warning("Loudness analysis failed for %s: %s", input_file, e)
+            return None
+        if result.stop_reason is not None:
+            logging.warning("Loudness analysis of %s stopped (%s)", input_file, result.stop_reason)
+            return None
+        measurement = parse_loudnorm_output("\n".join(result.output or []))
+        if measurement is None:
+            logging.warning("Could not measure loudness of %s", input_file)
+            return None
+        cached = dict(cached)
+        cached[key] = measurement
+        self._probe_index.set(input_file, "loudness", cached)
+        return measurement
+
+    def _filter(self, measurement: dict[str, float], sample_rate: int | None) -> str:
+        audio_filter = (
+            f"loudnorm={self.target_spec}"
+            f":measured_I={measurement['input_i']:.2f}"
+            f":measured_TP={measurement['input_tp']:.2f}"
+            f":measured_LRA={measurement['input_lra']:.2f}"
+            f":measured_thresh={measurement['input_thresh']:.2f}"
+            f":offset={measurement['target_offset']:.2f}"
+            ":linear=true:print_format=summary"
+        )
+        # loudnorm upsamples to 192 kHz internally; keep the source rate.
+        return f"{audio_filter},aresample={sample_rate}" if sample_rate else audio_filter
+
+    def encode_flags(
+        self,
+        ffmpeg_path: str,
+        input_file: str,
+        base_flags: list[str],
+        run: CommandRunner,
+        tracks: tuple[int, ...] = (0,),
+    ) -> list[str]:
+        info = self._probe_index.probe(ffmpeg_path, input_file)
+        filters = {}
+        for track in tracks:
+            measurement = self.measure(ffmpeg_path, input_file, run, track)
+            if measurement is None:
+                continue
+            sample_rate = None
+            if "-ar" not in base_flags:
+                streams = info.audio_streams if info else []
+                sample_rate = streams[track].sample_rate if track < len(streams) else None
+                sample_rate = sample_rate or _DEFAULT_SAMPLE_RATE
+            filters[track] = self._filter(measurement, sample_rate)
+        if not filters:
+            return base_flags
+        if len(tracks) == 1:
+            return merge_audio_filter(base_flags, filters[tracks[0]])
+        # Each track gets its own measured filter; the preset's audio filter runs ahead of it on every track.
+        preset_filter = _audio_filter(base_flags)
+        flags = list(base_flags)
+        for track, audio_filter in filters.items():
+            flags += [f"-filter:a:{track}", f"{preset_filter},{audio_filter}" if preset_filter else audio_filter]
+        return flags
@@ -1,4 +1,5 @@
 import logging
+import os
 import threading
 
 import wx
@@ -10,13 +11,20 @@ from cobalt_converter.constants import (
     WINDOW_MIN_WIDTH,
     WINDOW_WIDTH,
 )
+from cobalt_converter.config_store import start_config_watcher, stop_config_watcher
 from cobalt_converter.conversion_handler import ConversionMixin
 from cobalt_converter.converter import ConversionEngine
-from cobalt_converter.dialogs import FileDropTarget
+from cobalt_converter.dialogs import FileDropTarget, OutputNamingDialog
 from cobalt_converter.ffmpeg_handler import FFmpegDownloadMixin
 from cobalt_converter.file_handling import FileHandlingMixin
+from cobalt_converter.gui_events import CoalescingEventDispatcher
+from cobalt_converter.packaging import PackagingFormat
+from cobalt_converter.previews import PreviewCache, PreviewService
+from cobalt_converter.probe import ProbeIndex
 from cobalt_converter.quality_manager import QualityManager
 from cobalt_converter.settings_manager import SettingsManager
+from cobalt_converter.staging import StagingManager, StagingMode
+from cobalt_converter.startup_profile import StartupProfiler, profile_phase
 from cobalt_converter.translator import Translator
 from cobalt_converter.ui_builder import UIBuilderMixin
 from cobalt_converter.utils import detect_system_language, set_debug_mode, setup_logging
@@ -35,32 +43,53 @@ class CobaltConverterFrame(
 
         self.settings = settings
         self.files: list[str] = []
+        self._file_panels: dict[str, wx.Panel] = {}
+        self._file_jobs: dict[str, int] = {}
         self.is_converting = False
         self.stop_requested = False
         self.output_folder: str | None = None
-        self.translator = Translator()
-        self.quality_manager = QualityManager()
+        with profile_phase("translator"):
+            self.translator = Translator()
+        with profile_phase("quality_manager"):
+            self.quality_manager = QualityManager()
 
         self.dialog_event = threading.Event()
+        # Parallel jobs can all hit an incompatible format; they share the one dialog in turn.
+        self._dialog_lock = threading.Lock()
         self.dialog_result: str | None = None
         self._pending_conversion_after_download = False
 
-        self.engine = ConversionEngine(
-            progress_callback=lambda cur, total: wx.CallAfter(self._set_file_progress, cur, total),
-            status_callback=lambda msg: wx.CallAfter(self._set_status, msg),
-            incompatible_callback=self._request_format_from_user,
-            finished_callback=lambda: wx.CallAfter(self._conversion_finished),
-        )
-
-        self._build_menu_bar()
-        self._build_ui()
-        self.SetDropTarget(FileDropTarget(self))
-        self.refresh_ffmpeg_cache()
-
-        detected = detect_system_language()
-        display = "עברית" if detected == "he" else "English"
-        self.language_choice.SetStringSelection(display)
-        self.change_language(display)
+        with profile_phase("engine"):
+            cache_dir = settings.cache_dir
+            self.engine = ConversionEngine(
+                incompatible_callback=self._request_format_from_user,
+                max_jobs=settings.max_jobs,
+                staging=StagingManager(mode=settings.staging_mode, scratch_dir=settings.scratch_dir),
+                probe_index=ProbeIndex(os.path.join(cache_dir, "probe_index.json") if cache_dir else None),
+            )
+            self.engine.thread_budget = settings.thread_budget
+            self.engine.hardware_backend = settings.hardware_backend
+            self.engine.namer.configure(settings.name_template, settings.collision_policy)
+            self._event_dispatcher = CoalescingEventDispatcher(self.engine.events, self._on_engine_event)
+            self.previews = PreviewService(
+                cache=PreviewCache(
+                    os.path.join(cache_dir, "thumbnails") if cache_dir else None, settings.preview_cache_bytes,
+                ),
+                probe_index=self.engine.probe_index,
+            )
+
+        with profile_phase("build_ui"):
+            self._build_menu_bar()
+            self._build_ui()
+            self.SetDropTarget(FileDropTarget(self))
+        with profile_phase("ffmpeg_probe"):
+            self.refresh_ffmpeg_cache()
+
+        with profile_phase("language"):
+            detected = detect_system_language()
+            display = "עברית" if detected == "he" else "English"
+            self.language_choice.SetStringSelection(display)
+            self.change_language(display)
 
         self.Centre()
         self.Show()
@@ -72,17 +101,61 @@ class CobaltConverterFrame(
         self._debug_menu_item = self._settings_menu.AppendCheckItem(wx.ID_ANY, "Debug Mode")
         self._debug_menu_item.Check(self.settings.debug)
         self.Bind(wx.EVT_MENU, self._on_toggle_debug, self._debug_menu_item)
+        self._naming_menu_item = self._settings_menu.Append(wx.ID_ANY, "Output Naming...")
+        self.Bind(wx.EVT_MENU, self._on_output_naming, self._naming_menu_item)
+        self._staging_menu_item = self._settings_menu.AppendCheckItem(wx.ID_ANY, "Stage Network Files Locally")
+        self._staging_menu_item.Check(self.settings.staging_mode != StagingMode.OFF)
+        self.Bind(wx.EVT_MENU, self._on_toggle_staging, self._staging_menu_item)
+
+        self._tools_menu = wx.Menu()
+        self._cut_clips_menu_item = self._tools_menu.Append(wx.ID_ANY, "Cut Clips From List...")
+        self.Bind(wx.EVT_MENU, lambda e: self.cut_clips(), self._cut_clips_menu_item)
+        self._join_files_menu_item = self._tools_menu.Append(wx.ID_ANY, "Join Files Into One")
+        self.Bind(wx.EVT_MENU, lambda e: self.join_files(), self._join_files_menu_item)
+        self._ladder_menu_item = self._tools_menu.Append(wx.ID_ANY, "Encode Resolution Ladder")
+        self.Bind(wx.EVT_MENU, lambda e: self.encode_ladder(), self._ladder_menu_item)
+        self._tools_menu.AppendSeparator()
+        self._packaging_menu = wx.Menu()
+        self._packaging_menu_items = {
+            packaging: self._packaging_menu.AppendRadioItem(wx.ID_ANY, label)
+            for packaging, label in (
+                (None, "Single File"),
+                (PackagingFormat.HLS, "HLS (fMP4)"),
+                (PackagingFormat.HLS_TS, "HLS (TS)"),
+                (PackagingFormat.DASH, "DASH"),
+            )
+        }
+        self._packaging_submenu_item = self._tools_menu.AppendSubMenu(self._packaging_menu, "Streaming Package")
 
         self._menu_bar.Append(self._settings_menu, "&Settings")
+        self._menu_bar.Append(self._tools_menu, "&Tools")
         self.SetMenuBar(self._menu_bar)
 
     def _on_toggle_debug(self, _event: wx.CommandEvent) -> None:
         enabled = self._debug_menu_item.IsChecked()
         self.settings.debug = enabled
-        set_debug_mode(enabled)
+        set_debug_mode(enabled, self.settings.log_level)
         self._retranslate_ui()
         logging.info("Debug mode toggled to %s via UI", enabled)
 
+    def _on_toggle_staging(self, _event: wx.CommandEvent) -> None:
+        mode = StagingMode.AUTO if self._staging_menu_item.IsChecked() else StagingMode.OFF
+        self.settings.staging_mode = mode
+        self.engine.staging.mode = mode
+        logging.info("Staging mode set to %s via UI", mode.value)
+
+    def _on_output_naming(self, _event: wx.CommandEvent) -> None:
+        dlg = OutputNamingDialog(self, self.settings.name_template, self.settings.collision_policy, self.translator)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.settings.name_template = dlg.get_template()
+            self.settings.collision_policy = dlg.get_policy()
+            self.engine.namer.configure(self.settings.name_template, self.settings.collision_policy)
+            logging.info(
+                "Output naming set to %r with collision policy %s",
+                self.settings.name_template, self.settings.collision_policy.value,
+            )
+        dlg.Destroy()
+
     def on_close(self, event: wx.CloseEvent) -> None:
         if self.is_converting:
             title = self.translator.get("conversion_in_progress_title")
@@ -91,21 +164,41 @@ class CobaltConverterFrame(
                 self.engine.stop()
                 if not self.dialog_event.is_set():
                     self.dialog_event.set()
-                self.Destroy()
+                self._shutdown()
             else:
                 event.Veto()
         else:
-            self.Destroy()
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        self._event_dispatcher.close()
+        self.previews.shutdown()
+        self.engine.shutdown()
+        self.settings.flush()
+        stop_config_watcher()
+        self.Destroy()
 
 
-def main(debug: bool = False) -> None:
-    settings = SettingsManager()
+def main(debug: bool = False, profiler: StartupProfiler | None = None) -> None:
+    with profile_phase("settings"):
+        settings = SettingsManager()
     effective_debug = debug or settings.debug
 
-    log_path = setup_logging(debug=effective_debug)
+    with profile_phase("logging"):
+        log_path = setup_logging(debug=effective_debug, level=settings.log_level)
     logging.info("Starting CobaltConverter (debug=%s, log=%s)", effective_debug, log_path)
 
-    app = wx.App(False)
-    frame = CobaltConverterFrame(settings)
+    start_config_watcher()
+    with profile_phase("wx_app"):
+        app = wx.App(False)
+    with profile_phase("frame"):
+        frame = CobaltConverterFrame(settings)
     frame.Bind(wx.EVT_CLOSE, frame.on_close)
+    if profiler is not None:
+        # Update() paints the shown window synchronously, so the mark is the first complete paint.
+        with profiler.phase("first_paint"):
+            frame.Update()
+        profiler.mark("first_paint")
+        wx.CallAfter(frame.Close)
     app.MainLoop()
+    settings.flush()
@@ -0,0 +1,285 @@
+import ctypes
+import logging
+import os
+import re
+import sys
+import threading
+from collections.abc import Callable, Hashable, Iterable
+
+from cobalt_converter.constants import get_format_type
+from cobalt_converter.gif import GIF_FORMAT, ONE_PASS_BUFFER_BYTES, GifSettings, one_pass_buffer
+from cobalt_converter.probe import MediaInfo
+from cobalt_converter.scaling import split_flag
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MIB = 1024 * 1024
+DEFAULT_BUDGET_FRACTION = 0.75
+BASE_JOB_BYTES = 96 * MIB
+AUDIO_JOB_BYTES = 160 * MIB
+LIMIT_HEADROOM = 1.5
+# Address space is reserved well beyond what is resident: a thread stack plus a malloc arena per thread.
+_ADDRESS_SPACE_PER_THREAD = 72 * MIB
+_ADDRESS_SPACE_BASE = 512 * MIB
+
+_CGROUP_MOUNT = "/sys/fs/cgroup"
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.I)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": MIB, "g": 1024 * MIB, "t": 1024 * 1024 * MIB}
+
+_DEFAULT_ENCODERS = {
+    "mp4": "libx264", "mkv": "libx264", "mov": "libx264", "webm": "libvpx-vp9",
+    "avi": "mpeg4", "wmv": "wmv2", "flv": "flv", "gif": "gif",
+}
+# Relative working-set size per frame held by the encoder, libx264 being 1.
+_ENCODER_FACTORS = {
+    "libx264": 1.0, "libx265": 2.5, "libvpx-vp9": 1.5, "libvpx": 1.0, "libaom-av1": 4.0,
+    "libsvtav1": 3.0, "mpeg4": 0.4, "wmv2": 0.4, "flv": 0.3, "gif": 0.5, "copy": 0.0,
+}
+# Frames the encoder keeps in flight per preset: lookahead plus reference frames.
+_PRESET_FRAMES = {
+    "ultrafast": 4, "superfast": 8, "veryfast": 16, "faster": 24, "fast": 32,
+    "medium": 48, "slow": 64, "slower": 80, "veryslow": 96, "placebo": 128,
+}
+_DEFAULT_FRAMES = _PRESET_FRAMES["medium"]
+_DECODE_FRAMES = 8
+_FALLBACK_RESOLUTION = (1920, 1080)
+
+
+def cpu_threads() -> int:
+    return os.cpu_count() or 4
+
+
+def _cgroup_path() -> str | None:
+    try:
+        with open("/proc/self/cgroup", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return os.path.join(_CGROUP_MOUNT, line[3:].strip().lstrip("/"))
+    except OSError:
+        pass
+    return None
+
+
+def _read_int(path: str) -> int | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def physical_memory() -> int | None:
+    total = None
+    if sys.platform == "win32":
+        class _MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("length", ctypes.c_ulong), ("load", ctypes.c_ulong),
+                ("total_phys", ctypes.c_ulonglong), ("avail_phys", ctypes.c_ulonglong),
+                ("total_page", ctypes.c_ulonglong), ("avail_page", ctypes.c_ulonglong),
+                ("total_virtual", ctypes.c_ulonglong), ("avail_virtual", ctypes.c_ulonglong),
+                ("avail_extended", ctypes.c_ulonglong),
+            ]
+
+        status = _MemoryStatus()
+        status.length = ctypes.sizeof(status)
+        try:
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                total = status.total_phys
+        except (AttributeError, OSError):
+            pass
+        return total
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        pass
+    # Inside a container the cgroup limit is the memory that is really available.
+    cgroup = _cgroup_path()
+    limit = _read_int(os.path.join(cgroup, "memory.max")) if cgroup else None
+    if limit and (total is None or limit < total):
+        total = limit
+    return total
+
+
+def parse_memory_size(text: str, total: int | None = None) -> int | None:
+    text = text.strip().lower()
+    if text in ("off", "none", "0"):
+        return None
+    if text.endswith("%"):
+        if total is None:
+            raise ValueError("Cannot size a memory budget as a percentage: total memory is unknown")
+        return int(total * float(text[:-1]) / 100)
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid memory size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def default_memory_budget() -> int | None:
+    total = physical_memory()
+    return int(total * DEFAULT_BUDGET_FRACTION) if total else None
+
+
+def estimate_job_memory(
+    output_format: str,
+    quality_flags: list[str] | tuple[str, ...],
+    info: MediaInfo | None,
+    threads: int | None = None,
+    scales: Iterable[float] = (1.0,),
+) -> int:
+    if get_format_type(output_format) != "video":
+        return AUDIO_JOB_BYTES
+    width, height = _FALLBACK_RESOLUTION
+    if info is not None and info.video_streams and info.video_streams[0].width:
+        width, height = info.video_streams[0].width, info.video_streams[0].height or height
+    threads = threads or cpu_threads()
+    frame_bytes = width * height * 3 // 2
+    encoder, _ = split_flag(quality_flags, "-c:v")
+    preset, _ = split_flag(quality_flags, "-preset")
+    encoder = encoder or _DEFAULT_ENCODERS.get(output_format, "libx264")
+    frames = _PRESET_FRAMES.get(preset or "", _DEFAULT_FRAMES) + 2 * threads
+    encode_bytes = frame_bytes * frames * _ENCODER_FACTORS.get(encoder, 1.0)
+    decode_bytes = frame_bytes * (_DECODE_FRAMES + threads)
+    if output_format == GIF_FORMAT:
+        # A one-pass GIF holds its frames until the palette is ready; longer ones are planned in two passes.
+        try:
+            settings, _ = GifSettings.from_flags(quality_flags)
+        except ValueError:
+            settings = GifSettings()
+        buffered = one_pass_buffer(info, settings, info.duration if info else None)
+        decode_bytes += min(buffered or ONE_PASS_BUFFER_BYTES, ONE_PASS_BUFFER_BYTES)
+    return int(BASE_JOB_BYTES + decode_bytes + sum(encode_bytes * scale for scale in scales))
+
+
+def process_limit(estimate: int) -> int:
+    return int(estimate * LIMIT_HEADROOM)
+
+
+class MemoryBudget:
+    def __init__(self, total: int | None) -> None:
+        self.total = total
+        self._lock = threading.Lock()
+        self._reserved: dict[Hashable, int] = {}
+
+    @classmethod
+    def from_setting(cls, setting: str | None) -> "MemoryBudget":
+        if setting is None:
+            return cls(default_memory_budget())
+        return cls(parse_memory_size(setting, physical_memory()))
+
+    def reserved(self, idle: Iterable[Hashable] = ()) -> int:
+        with self._lock:
+            return self._in_use(set(idle))
+
+    def _in_use(self, idle: set[Hashable]) -> int:
+        return sum(size for key, size in self._reserved.items() if key not in idle)
+
+    def reserve(self, key: Hashable, size: int, idle: Iterable[Hashable] = ()) -> bool:
+        with self._lock:
+            # Idle keys are stopped jobs: their pages can be swapped out without thrashing the running ones.
+            in_use = self._in_use(set(idle))
+            # A job larger than the whole budget still runs, on its own.
+            if self.total is not None and in_use and in_use + size > self.total:
+                return False
+            self._reserved[key] = size
+            return True
+
+    def release(self, key: Hashable) -> None:
+        with self._lock:
+            self._reserved.pop(key, None)
+
+
+def _delegated_cgroup() -> str | None:
+    # Child groups need a writable cgroup with the memory controller enabled for its subtree, e.g. the
+    # parent of the service's own leaf when it runs with systemd's Delegate=yes.
+    own = _cgroup_path()
+    if not sys.platform.startswith("linux") or own is None:
+        return None
+    for directory in (own, os.path.dirname(own)):
+        try:
+            with open(os.path.join(directory, "cgroup.subtree_control"), "r", encoding="utf-8") as f:
+                controllers = f.read().split()
+        except OSError:
+            continue
+        if "memory" in controllers and os.access(directory, os.W_OK):
+            return directory
+    return None
+
+
+class ProcessMemoryLimiter:
+    def __init__(self) -> None:
+        self._cgroup_root = _delegated_cgroup()
+        self._groups: dict[Hashable, str] = {}
+        if self._cgroup_root:
+            logging.info("Limiting FFmpeg memory with cgroups under %s", self._cgroup_root)
+
+    @property
+    def available(self) -> bool:
+        return self._cgroup_root is not None or resource is not None
+
+    def prepare(self, key: Hashable, limit: int, threads: int | None = None) -> dict:
+        # Encoder threads each reserve a stack and arena, so the address-space allowance grows with them.
+        address_space = limit + _ADDRESS_SPACE_BASE + (threads or cpu_threads()) * _ADDRESS_SPACE_PER_THREAD
+        fallback = _rlimit_setter(address_space) if resource is not None else None
+        if self._cgroup_root is not None:
+            group = os.path.join(self._cgroup_root, f"cobalt-{os.getpid()}-{key}")
+            try:
+                os.makedirs(group, exist_ok=True)
+                _write(os.path.join(group, "memory.max"), str(limit))
+                if os.path.exists(os.path.join(group, "memory.swap.max")):
+                    _write(os.path.join(group, "memory.swap.max"), "0")
+                self._groups[key] = group
+                return {"preexec_fn": _cgroup_joiner(group, fallback)}
+            except OSError as e:
+                logging.warning("Could not create a memory cgroup, falling back to RLIMIT_AS: %s", e)
+                self._remove_group(group)
+        return {"preexec_fn": fallback} if fallback is not None else {}
+
+    def release(self, key: Hashable) -> None:
+        group = self._groups.pop(key, None)
+        if group is not None:
+            self._remove_group(group)
+
+    @staticmethod
+    def _remove_group(group: str) -> None:
+        try:
+            os.rmdir(group)
+        except OSError:
+            pass
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(value)
+
+
+def _cgroup_joiner(group: str, fallback: Callable[[], None] | None) -> Callable[[], None]:
+    procs = os.path.join(group, "cgroup.procs").encode()
+
+    # Runs in the child between fork and exec, so FFmpeg starts inside the group and is never unlimited.
+    def join() -> None:
+        try:
+            fd = os.open(procs, os.O_WRONLY)
+            try:
+                os.write(fd, b"0")
+            finally:
+                os.close(fd)
+        except OSError:
+            if fallback is not None:
+                fallback()
+
+    return join
+
+
+def _rlimit_setter(limit: int) -> Callable[[], None]:
+    _soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+
+    def apply() -> None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return apply
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from cobalt_converter.events import (
+    BatchFinished,
+    EngineEvent,
+    EventBus,
+    JobCancelled,
+    JobFailed,
+    JobFinished,
+    JobQueued,
+    JobStarted,
+)
+
+
+class EngineMetrics:
+    def __init__(self, bus: EventBus) -> None:
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._job_start: dict[int, float] = {}
+        self._counters = {
+            "jobs_queued": 0,
+            "jobs_started": 0,
+            "jobs_succeeded": 0,
+            "jobs_skipped": 0,
+            "jobs_failed": 0,
+            "jobs_cancelled": 0,
+            "batches_finished": 0,
+        }
+        self._encode_seconds = 0.0
+        bus.subscribe(self._on_event)
+
+    def _on_event(self, event: EngineEvent) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if isinstance(event, JobQueued):
+                self._counters["jobs_queued"] += 1
+            elif isinstance(event, JobStarted):
+                self._counters["jobs_started"] += 1
+                self._job_start[event.job_id] = now
+            elif isinstance(event, JobFinished):
+                self._counters["jobs_skipped" if event.skipped else "jobs_succeeded"] += 1
+                self._close_job(event.job_id, now)
+            elif isinstance(event, JobFailed):
+                self._counters["jobs_failed"] += 1
+                self._close_job(event.job_id, now)
+            elif isinstance(event, JobCancelled):
+                self._counters["jobs_cancelled"] += 1
+                self._close_job(event.job_id, now)
+            elif isinstance(event, BatchFinished):
+                self._counters["batches_finished"] += 1
+
+    def _close_job(self, job_id: int, now: float) -> None:
+        started = self._job_start.pop(job_id, None)
+        if started is not None:
+            self._encode_seconds += now - started
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "jobs_running": len(self._job_start),
+                "encode_seconds": round(self._encode_seconds, 3),
+                "uptime_seconds": round(time.time() - self._started_at, 3),
+            }
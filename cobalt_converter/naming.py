@@ -0,0 +1,182 @@
+import hashlib
+import os
+import pathlib
+import re
+import string
+import threading
+from collections.abc import Callable
+from enum import Enum
+
+from cobalt_converter.jobs import ConversionJob
+from cobalt_converter.packaging import package_dir
+from cobalt_converter.plans import JobKind
+from cobalt_converter.scaling import rendition_path
+from cobalt_converter.streams import track_path
+
+DEFAULT_NAME_TEMPLATE = "{stem}"
+MIRROR_NAME_TEMPLATE = "{relative_dir}/{stem}"
+TEMPLATE_FIELDS = ("stem", "relative_dir", "preset", "format", "width", "height", "hash8")
+
+_PATH_SPLIT_RE = re.compile(r"[\\/]+")
+_MAX_SUFFIX = 10000
+
+DimensionsLookup = Callable[[str], tuple[int, int] | None]
+OriginLookup = Callable[[str], str | None]
+
+
+class CollisionPolicy(str, Enum):
+    SKIP = "skip"
+    OVERWRITE = "overwrite"
+    SUFFIX = "suffix"
+    VERIFY = "verify"
+
+
+def validate_template(template: str) -> None:
+    if not template.strip():
+        raise ValueError("Name template is empty")
+    for _, field_name, format_spec, conversion in string.Formatter().parse(template):
+        if field_name is None:
+            continue
+        if field_name not in TEMPLATE_FIELDS:
+            raise ValueError(f"Unknown template field: {{{field_name}}}")
+        if conversion or format_spec:
+            raise ValueError(f"Formatting is not supported in template field {{{field_name}}}")
+
+
+def _file_identity(path: str) -> str:
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return ""
+
+
+def source_fingerprint(job: ConversionJob) -> str:
+    parts = [os.path.abspath(job.input_file), _file_identity(job.input_file), job.output_format, *job.quality_flags]
+    if job.loudness is not None:
+        parts.append(job.loudness.target_spec)
+    if job.packaging is not None:
+        parts += [job.packaging.format.value, f"{job.packaging.segment_seconds:g}"]
+    if job.audio_tracks:
+        parts += [f"track{track}" for track in job.audio_tracks]
+    if job.kind != JobKind.CONVERT:
+        parts += [job.kind.value, str(job.start), str(job.end)]
+        for path in job.extra_inputs:
+            parts += [os.path.abspath(path), _file_identity(path)]
+        for rendition in job.renditions:
+            parts += [rendition.name, repr(rendition.limit), *rendition.flags]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def output_paths(job: ConversionJob, path: str) -> list[str]:
+    if job.packaging is not None:
+        return [package_dir(path, job.packaging.format)]
+    if job.renditions:
+        return [rendition_path(path, rendition.name) for rendition in job.renditions]
+    if len(job.audio_tracks) > 1:
+        return [track_path(path, track) for track in job.audio_tracks]
+    return [path]
+
+
+def batch_source_root(files: list[str]) -> str | None:
+    if not files:
+        return None
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    except ValueError:
+        return None
+
+
+class OutputNamer:
+    def __init__(
+        self,
+        template: str = DEFAULT_NAME_TEMPLATE,
+        policy: CollisionPolicy = CollisionPolicy.SKIP,
+    ) -> None:
+        validate_template(template)
+        self.template = template
+        self.policy = CollisionPolicy(policy)
+        self._lock = threading.Lock()
+        self._reserved: dict[str, int] = {}
+        self._claims: dict[int, str] = {}
+
+    def configure(self, template: str, policy: CollisionPolicy | str) -> None:
+        validate_template(template)
+        with self._lock:
+            self.template = template
+            self.policy = CollisionPolicy(policy)
+
+    def render(self, job: ConversionJob, dimensions: tuple[int, int] | None = None) -> str:
+        template = job.name_template or self.template
+        source = pathlib.Path(job.input_file)
+        relative_dir = ""
+        if job.source_root:
+            relative = os.path.relpath(source.parent.absolute(), job.source_root)
+            if relative != "." and not relative.startswith(".."):
+                relative_dir = relative
+        width, height = dimensions or (0, 0)
+        name = template.format(
+            stem=job.label or source.stem,
+            relative_dir=relative_dir,
+            preset=job.preset,
+            format=job.output_format,
+            width=width,
+            height=height,
+            hash8=hashlib.sha256(os.path.abspath(job.input_file).encode("utf-8")).hexdigest()[:8],
+        )
+        parts = [p for p in _PATH_SPLIT_RE.split(name) if p not in ("", ".", "..")]
+        relative_name = os.path.join(*parts) if parts else source.stem
+        base = job.output_folder or str(source.parent)
+        return os.path.join(base, f"{relative_name}.{job.output_format}")
+
+    def claim(
+        self,
+        job: ConversionJob,
+        dimensions: DimensionsLookup | None = None,
+        origin: OriginLookup | None = None,
+    ) -> tuple[str, bool]:
+        with self._lock:
+            claimed = self._claims.get(job.id)
+            if claimed is not None:
+                return claimed, False
+            template = job.name_template or self.template
+            needs_dimensions = "{width}" in template or "{height}" in template
+            path = self.render(job, dimensions(job.input_file) if dimensions and needs_dimensions else None)
+            policy = CollisionPolicy(job.collision) if job.collision else self.policy
+            key = os.path.normcase(os.path.abspath(path))
+            reserved = key in self._reserved
+            existing = [p for p in output_paths(job, path) if os.path.exists(p)]
+
+            if not reserved and existing:
+                if policy == CollisionPolicy.SKIP:
+                    return path, True
+                if policy == CollisionPolicy.VERIFY and origin is not None:
+                    fingerprint = source_fingerprint(job)
+                    if all(origin(p) == fingerprint for p in existing):
+                        return path, True
+                elif policy == CollisionPolicy.OVERWRITE:
+                    return self._reserve(job, path), False
+            elif not reserved:
+                return self._reserve(job, path), False
+
+            return self._reserve(job, self._next_free(job, path)), False
+
+    def release(self, job_id: int) -> None:
+        with self._lock:
+            path = self._claims.pop(job_id, None)
+            if path is not None:
+                self._reserved.pop(os.path.normcase(os.path.abspath(path)), None)
+
+    def _reserve(self, job: ConversionJob, path: str) -> str:
+        self._reserved[os.path.normcase(os.path.abspath(path))] = job.id
+        self._claims[job.id] = path
+        return path
+
+    def _next_free(self, job: ConversionJob, path: str) -> str:
+        root, ext = os.path.splitext(path)
+        for n in range(1, _MAX_SUFFIX):
+            candidate = f"{root} ({n}){ext}"
+            key = os.path.normcase(os.path.abspath(candidate))
+            if key not in self._reserved and not any(os.path.exists(p) for p in output_paths(job, candidate)):
+                return candidate
+        raise OSError(f"No free output name for {path}")
@@ -0,0 +1,115 @@
+import logging
+import os
+import pathlib
+import shutil
+import sys
+
+PARTIAL_MARKER = ".partial"
+DEFAULT_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+_DEFAULT_SIZE_RATIO = 1.2
+# Rough output/input size ratios for targets that inflate compressed sources.
+_SIZE_RATIOS = {
+    "wav": 10.0,
+    "aiff": 10.0,
+    "flac": 6.0,
+    "bmp": 20.0,
+    "tiff": 10.0,
+    "png": 4.0,
+    "gif": 3.0,
+}
+
+
+def partial_path(output_file: str) -> str:
+    path = pathlib.Path(output_file)
+    return str(path.with_name(f".{path.stem}{PARTIAL_MARKER}{path.suffix}"))
+
+
+def _fsync_file(path: str) -> None:
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(directory: str) -> None:
+    if sys.platform == "win32":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _commit_directory(partial_dir: str, output_dir: str) -> None:
+    for root, _dirs, files in os.walk(partial_dir):
+        for name in files:
+            _fsync_file(os.path.join(root, name))
+    # A directory cannot replace a non-empty one, so the previous package is moved aside first.
+    previous = None
+    if os.path.isdir(output_dir):
+        previous = partial_path(output_dir) + ".old"
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(output_dir, previous)
+    os.replace(partial_dir, output_dir)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def commit_output(partial_file: str, output_file: str) -> None:
+    if os.path.isdir(partial_file):
+        _commit_directory(partial_file, output_file)
+    else:
+        _fsync_file(partial_file)
+        os.replace(partial_file, output_file)
+    try:
+        _fsync_dir(os.path.dirname(os.path.abspath(output_file)))
+    except OSError as e:
+        logging.debug("Could not fsync directory of %s: %s", output_file, e)
+
+
+def _link_or_copy(source: str, target: str) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def link_output(source: str, output_file: str) -> None:
+    # Hard links cost no space; across volumes (or where links are unsupported) the output is copied.
+    partial = partial_path(output_file)
+    discard_output(partial)
+    if os.path.isdir(source):
+        shutil.copytree(source, partial, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(source, partial)
+    commit_output(partial, output_file)
+
+
+def discard_output(partial_file: str | None) -> None:
+    if not partial_file:
+        return
+    try:
+        if os.path.isdir(partial_file):
+            shutil.rmtree(partial_file)
+        else:
+            os.remove(partial_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning("Could not remove partial output %s: %s", partial_file, e)
+
+
+def estimate_output_size(input_file: str, output_format: str) -> int:
+    try:
+        size = os.path.getsize(input_file)
+    except OSError:
+        return 0
+    return int(size * _SIZE_RATIOS.get(output_format, _DEFAULT_SIZE_RATIO))
+
+
+def free_space(directory: str) -> int | None:
+    try:
+        return shutil.disk_usage(directory).free
+    except OSError as e:
+        logging.debug("Could not read free space for %s: %s", directory, e)
+        return None
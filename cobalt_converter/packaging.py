@@ -0,0 +1,177 @@
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from cobalt_converter.outputs import partial_path
+from cobalt_converter.plans import CommandPlan, JobKind
+from cobalt_converter.probe import MediaInfo, ProbeIndex
+from cobalt_converter.scaling import ladder_renditions, rendition_flags, split_flag, split_graph
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+
+DEFAULT_SEGMENT_SECONDS = 6.0
+PACKAGING_OUTPUT_FORMATS = ("mp4",)
+
+
+class PackagingFormat(str, Enum):
+    HLS = "hls"
+    HLS_TS = "hls_ts"
+    DASH = "dash"
+
+    @property
+    def is_hls(self) -> bool:
+        return self in (PackagingFormat.HLS, PackagingFormat.HLS_TS)
+
+    @property
+    def manifest_name(self) -> str:
+        return "master.m3u8" if self.is_hls else "manifest.mpd"
+
+
+_COPY_VIDEO_CODECS = {
+    PackagingFormat.HLS: frozenset({"h264", "hevc"}),
+    PackagingFormat.HLS_TS: frozenset({"h264"}),
+    PackagingFormat.DASH: frozenset({"h264", "hevc", "av1", "vp9"}),
+}
+_COPY_AUDIO_CODECS = {
+    PackagingFormat.HLS: frozenset({"aac", "ac3", "eac3"}),
+    PackagingFormat.HLS_TS: frozenset({"aac", "mp3", "ac3"}),
+    PackagingFormat.DASH: frozenset({"aac", "ac3", "eac3", "opus"}),
+}
+
+
+@dataclass(frozen=True)
+class PackagingSpec:
+    format: PackagingFormat
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS
+
+    @classmethod
+    def from_config(cls, packaging_format: PackagingFormat | str, config: dict) -> "PackagingSpec":
+        return cls(PackagingFormat(packaging_format), float(config.get("segment_seconds", DEFAULT_SEGMENT_SECONDS)))
+
+
+def supports_packaging(output_format: str) -> bool:
+    return output_format in PACKAGING_OUTPUT_FORMATS
+
+
+def package_dir(output_file: str, packaging_format: PackagingFormat) -> str:
+    root, _ = os.path.splitext(output_file)
+    return f"{root}_{'hls' if packaging_format.is_hls else 'dash'}"
+
+
+def can_stream_copy(info: MediaInfo, packaging_format: PackagingFormat) -> bool:
+    if not info.video_streams:
+        return False
+    video_ok = info.video_streams[0].codec in _COPY_VIDEO_CODECS[packaging_format]
+    audio_ok = not info.audio_streams or info.audio_streams[0].codec in _COPY_AUDIO_CODECS[packaging_format]
+    return video_ok and audio_ok
+
+
+def stream_flags(flags: list[str] | tuple[str, ...], specifier: str) -> list[str]:
+    result = []
+    for i in range(0, len(flags) - 1, 2):
+        flag, value = flags[i], flags[i + 1]
+        name, _, stream = flag.partition(":")
+        if stream.startswith("a"):
+            result += [flag, value]
+        else:
+            result += [f"{name}:{specifier}", value]
+    return result
+
+
+def muxer_args(spec: PackagingSpec, target_dir: str, variants: list[str], has_audio: bool) -> list[str]:
+    segment = f"{spec.segment_seconds:g}"
+    if spec.format.is_hls:
+        fmp4 = spec.format == PackagingFormat.HLS
+        variant_dir = "%v" if len(variants) > 1 else ""
+        args = [
+            "-f", "hls",
+            "-hls_time", segment,
+            "-hls_playlist_type", "vod",
+            "-hls_flags", "independent_segments",
+            "-hls_segment_type", "fmp4" if fmp4 else "mpegts",
+            "-master_pl_name", spec.format.manifest_name,
+            "-hls_segment_filename", os.path.join(target_dir, variant_dir, "seg_%05d.m4s" if fmp4 else "seg_%05d.ts"),
+        ]
+        if fmp4:
+            args += ["-hls_fmp4_init_filename", "init.mp4"]
+        if len(variants) > 1:
+            entries = ["a:0,agroup:audio,name:audio"] if has_audio else []
+            group = ",agroup:audio" if has_audio else ""
+            entries += [f"v:{n},name:{name}{group}" for n, name in enumerate(variants)]
+            args += ["-var_stream_map", " ".join(entries)]
+        return args + [os.path.join(target_dir, variant_dir, "index.m3u8")]
+
+    adaptation_sets = "id=0,streams=v" + (" id=1,streams=a" if has_audio else "")
+    return [
+        "-f", "dash",
+        "-seg_duration", segment,
+        "-use_template", "1",
+        "-use_timeline", "1",
+        "-adaptation_sets", adaptation_sets,
+        "-init_seg_name", "init-$RepresentationID$.m4s",
+        "-media_seg_name", "chunk-$RepresentationID$-$Number%05d$.m4s",
+        os.path.join(target_dir, spec.format.manifest_name),
+    ]
+
+
+def plan_package(ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex) -> CommandPlan:
+    if job.kind not in (JobKind.CONVERT, JobKind.LADDER):
+        raise ValueError(f"{job.kind.value} jobs cannot be packaged for streaming")
+    spec = job.packaging
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    if info is None:
+        raise ValueError(f"Could not read the streams of {job.filename}")
+    if not info.video_streams:
+        raise ValueError(f"{job.filename} has no video stream to package")
+    has_audio = bool(info.audio_streams)
+
+    final_dir = package_dir(job.output_file, spec.format)
+    # Segments land next to the job's partial file so staged jobs write them to local scratch first.
+    target_dir = os.path.join(os.path.dirname(job.partial_file), os.path.basename(partial_path(final_dir)))
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.makedirs(target_dir)
+
+    # Segments must start on a keyframe, so re-encodes place one at every segment boundary.
+    keyframe_args = ["-force_key_frames:v", f"expr:gte(t,n_forced*{spec.segment_seconds:g})"]
+    codec_args = []
+    if "-c:v" not in job.quality_flags:
+        codec_args += ["-c:v", "libx264"]
+    if has_audio and "-c:a" not in job.quality_flags:
+        codec_args += ["-c:a", "aac"]
+    audio_map = ["-map", "0:a:0"] if has_audio else []
+
+    if job.kind == JobKind.LADDER:
+        renditions = ladder_renditions(job, info)
+        _, base_flags = split_flag(job.quality_flags, "-vf")
+        output_args = ["-filter_complex", split_graph(renditions)]
+        for n in range(len(renditions)):
+            output_args += ["-map", f"[v{n}]"]
+        output_args += audio_map + codec_args + keyframe_args
+        for n, rendition in enumerate(renditions):
+            output_args += stream_flags(rendition_flags(base_flags, rendition), f"v:{n}")
+        variants = [r.name for r in renditions]
+        copy = False
+    else:
+        variants = ["main"]
+        output_args = ["-map", "0:v:0", *audio_map]
+        copy = not job.quality_flags and can_stream_copy(info, spec.format)
+        if copy:
+            output_args += ["-c", "copy"]
+        else:
+            output_args += list(job.quality_flags) + codec_args + keyframe_args
+    output_args += muxer_args(spec, target_dir, variants, has_audio)
+    logging.info(
+        "Packaging %s as %s with %d variant(s) (%s)",
+        job.input_file, spec.format.value, len(variants), "stream copy" if copy else "re-encode",
+    )
+    return CommandPlan(
+        ("-i", source),
+        tuple(output_args),
+        info.duration,
+        copy,
+        outputs=((target_dir, final_dir),),
+    )
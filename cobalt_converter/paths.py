@@ -0,0 +1,17 @@
+import os
+import sys
+
+
+def get_base_path() -> str:
+    if getattr(sys, "frozen", False):
+        exe_dir = os.path.dirname(sys.executable)
+        if sys.platform == "darwin" and exe_dir.endswith(os.path.join("Contents", "MacOS")):
+            return os.path.dirname(os.path.dirname(os.path.dirname(exe_dir)))
+        return exe_dir
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_bundled_path() -> str:
+    if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
+        return sys._MEIPASS
+    return get_base_path()
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cobalt_converter.streams import StreamAction
+
+
+class JobKind(str, Enum):
+    CONVERT = "convert"
+    TRIM = "trim"
+    CONCAT = "concat"
+    LADDER = "ladder"
+
+
+@dataclass(frozen=True)
+class CommandPlan:
+    input_args: tuple[str, ...]
+    output_args: tuple[str, ...]
+    duration: float | None = None
+    stream_copy: bool = False
+    outputs: tuple[tuple[str, str], ...] = ()
+    streams: tuple["StreamAction", ...] = ()
+
+
+def validate_range(start: float, end: float | None) -> None:
+    if end is not None and end <= start:
+        raise ValueError(f"Clip end ({end:g}s) must be after its start ({start:g}s)")
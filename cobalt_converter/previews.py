@@ -0,0 +1,245 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from cobalt_converter.constants import get_file_type
+from cobalt_converter.paths import get_base_path
+from cobalt_converter.probe import MediaInfo, ProbeIndex, parse_probe_output
+from cobalt_converter.utils import get_subprocess_env, get_subprocess_flags
+
+THUMB_WIDTH = 96
+THUMB_HEIGHT = 54
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_PREVIEW_WORKERS = 2
+_PREVIEW_TIMEOUT = 30
+_POSTER_FRACTION = 0.1
+_DEFAULT_SEEK = 1.0
+_WAVEFORM_COLOR = "0x3a7bd5"
+
+
+@dataclass(frozen=True)
+class Preview:
+    file_path: str
+    image_path: str | None
+    media: MediaInfo | None
+
+    @property
+    def duration(self) -> float | None:
+        return self.media.duration if self.media else None
+
+    @property
+    def resolution(self) -> tuple[int, int] | None:
+        if self.media is None:
+            return None
+        for stream in self.media.video_streams:
+            if stream.width and stream.height:
+                return stream.width, stream.height
+        return None
+
+
+def format_badge(preview: Preview) -> str:
+    parts = []
+    if preview.duration:
+        total = int(round(preview.duration))
+        hours, rest = divmod(total, 3600)
+        minutes, seconds = divmod(rest, 60)
+        parts.append(f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}")
+    if preview.resolution:
+        parts.append("{}×{}".format(*preview.resolution))
+    return " · ".join(parts)
+
+
+class PreviewCache:
+    def __init__(self, cache_dir: str | None = None, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.cache_dir = cache_dir or os.path.join(get_base_path(), "thumbnails")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    def key(self, file_path: str) -> str | None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        identity = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{THUMB_WIDTH}x{THUMB_HEIGHT}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".png", base + ".json"
+
+    def get(self, file_path: str) -> Preview | None:
+        key = self.key(file_path)
+        if key is None:
+            return None
+        image_path, meta_path = self.paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(meta_path)
+        except (OSError, json.JSONDecodeError):
+            return None
+        media = MediaInfo.from_dict(meta["media"]) if meta.get("media") else None
+        has_image = os.path.isfile(image_path)
+        if has_image:
+            os.utime(image_path)
+        return Preview(file_path, image_path if has_image else None, media)
+
+    def put(self, file_path: str, key: str, media: MediaInfo | None) -> Preview:
+        image_path, meta_path = self.paths(key)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"media": media.to_dict() if media else None}, f)
+        os.replace(tmp_path, meta_path)
+        added = os.path.getsize(meta_path)
+        if os.path.isfile(image_path):
+            added += os.path.getsize(image_path)
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += added
+        self.prune()
+        return Preview(file_path, image_path if os.path.isfile(image_path) else None, media)
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def prune(self) -> None:
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._scan()
+            total = sum(size for _mtime, size, _path in entries)
+            self._total_bytes = total
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _mtime, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes * 0.8:
+                    break
+            self._total_bytes = total
+            logging.debug("Pruned thumbnail cache to %d bytes", total)
+
+
+def _preview_command(ffmpeg_path: str, file_path: str, image_path: str, seek: float | None) -> list[str]:
+    cmd = [ffmpeg_path, "-hide_banner", "-nostdin", "-y"]
+    file_type = get_file_type(file_path)
+    if file_type == "audio":
+        graph = f"showwavespic=s={THUMB_WIDTH}x{THUMB_HEIGHT}:colors={_WAVEFORM_COLOR}"
+        return cmd + ["-i", file_path, "-filter_complex", graph, "-frames:v", "1", image_path]
+    if file_type == "video" and seek:
+        cmd += ["-ss", f"{seek:.3f}"]
+    scale = f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease"
+    return cmd + ["-i", file_path, "-an", "-sn", "-vf", scale, "-frames:v", "1", image_path]
+
+
+def generate_preview(ffmpeg_path: str, file_path: str, image_path: str, seek: float | None) -> MediaInfo | None:
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    cmd = _preview_command(ffmpeg_path, file_path, image_path, seek)
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=_PREVIEW_TIMEOUT,
+            env=get_subprocess_env(),
+            **get_subprocess_flags(),
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.debug("Preview generation failed for %s: %s", file_path, e)
+        return None
+    if result.returncode != 0:
+        logging.debug("Preview generation for %s exited with %d", file_path, result.returncode)
+    return parse_probe_output(result.stderr)
+
+
+class PreviewService:
+    def __init__(
+        self,
+        cache: PreviewCache | None = None,
+        workers: int = DEFAULT_PREVIEW_WORKERS,
+        probe_index: ProbeIndex | None = None,
+    ) -> None:
+        self.cache = cache or PreviewCache()
+        self._probe_index = probe_index
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="cobalt-preview",
+        )
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[Callable[[Preview], None]]] = {}
+        self._wanted: set[str] = set()
+
+    def request(self, ffmpeg_path: str | None, file_path: str, callback: Callable[[Preview], None]) -> None:
+        with self._lock:
+            self._wanted.add(file_path)
+            if file_path in self._pending:
+                self._pending[file_path].append(callback)
+                return
+            self._pending[file_path] = [callback]
+        self._pool.submit(self._run, ffmpeg_path, file_path)
+
+    def forget(self, file_path: str) -> None:
+        with self._lock:
+            self._wanted.discard(file_path)
+
+    def _run(self, ffmpeg_path: str | None, file_path: str) -> None:
+        with self._lock:
+            wanted = file_path in self._wanted
+        preview = self.cache.get(file_path) if wanted else None
+        if wanted and preview is None and ffmpeg_path:
+            preview = self._generate(ffmpeg_path, file_path)
+        with self._lock:
+            callbacks = self._pending.pop(file_path, [])
+        if preview is None:
+            return
+        for callback in callbacks:
+            try:
+                callback(preview)
+            except Exception:
+                logging.exception("Preview callback failed for %s", file_path)
+
+    def _generate(self, ffmpeg_path: str, file_path: str) -> Preview | None:
+        key = self.cache.key(file_path)
+        if key is None:
+            return None
+        image_path, _ = self.cache.paths(key)
+        known = self._probe_index.get(file_path, "media") if self._probe_index else None
+        duration = known.get("duration") if known else None
+        seek = duration * _POSTER_FRACTION if duration else _DEFAULT_SEEK
+        media = generate_preview(ffmpeg_path, file_path, image_path, seek)
+        if not os.path.isfile(image_path) and get_file_type(file_path) == "video" and seek:
+            # Clips shorter than the guessed seek point produce no frame; take the first one instead.
+            media = generate_preview(ffmpeg_path, file_path, image_path, None) or media
+        if media is not None and media.streams and self._probe_index is not None and known is None:
+            self._probe_index.set(file_path, "media", media.to_dict())
+        try:
+            return self.cache.put(file_path, key, media)
+        except OSError as e:
+            logging.debug("Could not cache preview for %s: %s", file_path, e)
+            return Preview(file_path, image_path if os.path.isfile(image_path) else None, media)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._wanted.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+
+from cobalt_converter.utils import get_base_path, get_subprocess_env, get_subprocess_flags
+
+_INDEX_FILENAME = "probe_index.json"
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_BITRATE_RE = re.compile(r"bitrate: (\d+) kb/s")
+_STREAM_RE = re.compile(
+    r"Stream #\d+:(\d+)(?:\[0x[0-9a-fA-F]+\])?(?:\((\w+)\))?: (\w+): (\w+)(.*)"
+)
+_RESOLUTION_RE = re.compile(r"\b(\d{2,5})x(\d{2,5})\b")
+_FPS_RE = re.compile(r"(\d+(?:\.\d+)?) fps")
+_AUDIO_RE = re.compile(r"(\d+) Hz, ([^,]+)")
+_CHAPTER_RE = re.compile(r"Chapter #\d+:\d+")
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    index: int
+    kind: str
+    codec: str
+    language: str | None = None
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    sample_rate: int | None = None
+    channels: str | None = None
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    duration: float | None = None
+    bitrate_kbps: int | None = None
+    streams: tuple[StreamInfo, ...] = field(default_factory=tuple)
+    chapter_count: int = 0
+
+    def streams_of(self, kind: str) -> tuple[StreamInfo, ...]:
+        return tuple(s for s in self.streams if s.kind == kind)
+
+    @property
+    def video_streams(self) -> tuple[StreamInfo, ...]:
+        return self.streams_of("video")
+
+    @property
+    def audio_streams(self) -> tuple[StreamInfo, ...]:
+        return self.streams_of("audio")
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MediaInfo":
+        streams = tuple(StreamInfo(**s) for s in data.get("streams", []))
+        return cls(
+            duration=data.get("duration"),
+            bitrate_kbps=data.get("bitrate_kbps"),
+            streams=streams,
+            chapter_count=data.get("chapter_count", 0),
+        )
+
+
+def parse_probe_output(text: str) -> MediaInfo:
+    duration: float | None = None
+    bitrate: int | None = None
+    streams: list[StreamInfo] = []
+
+    match = _DURATION_RE.search(text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _BITRATE_RE.search(text)
+    if match:
+        bitrate = int(match.group(1))
+
+    for line in text.splitlines():
+        match = _STREAM_RE.search(line)
+        if not match:
+            continue
+        index, language, kind, codec, details = match.groups()
+        info: dict = {
+            "index": int(index),
+            "kind": kind.lower(),
+            "codec": codec.lower(),
+            "language": language if language and language != "und" else None,
+        }
+        if info["kind"] == "video":
+            resolution = _RESOLUTION_RE.search(details)
+            if resolution:
+                info["width"], info["height"] = int(resolution.group(1)), int(resolution.group(2))
+            fps = _FPS_RE.search(details)
+            if fps:
+                info["fps"] = float(fps.group(1))
+        elif info["kind"] == "audio":
+            audio = _AUDIO_RE.search(details)
+            if audio:
+                info["sample_rate"] = int(audio.group(1))
+                info["channels"] = audio.group(2).strip()
+        streams.append(StreamInfo(**info))
+
+    return MediaInfo(
+        duration=duration,
+        bitrate_kbps=bitrate,
+        streams=tuple(streams),
+        chapter_count=len(_CHAPTER_RE.findall(text)),
+    )
+
+
+def probe_media(ffmpeg_path: str, file_path: str, timeout: int = 30) -> MediaInfo | None:
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-i", file_path],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=timeout,
+            env=get_subprocess_env(),
+            **get_subprocess_flags(),
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.warning("Failed to probe %s: %s", file_path, e)
+        return None
+    info = parse_probe_output(result.stderr)
+    if not info.streams:
+        logging.debug("Probe found no streams in %s", file_path)
+        return None
+    return info
+
+
+class ProbeIndex:
+    def __init__(self, path: str | None = None) -> None:
+        self._path = path or os.path.join(get_base_path(), _INDEX_FILENAME)
+        self._entries: dict[str, dict] | None = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @staticmethod
+    def _signature(file_path: str) -> tuple[int, float] | None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def _ensure_loaded(self) -> dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.isfile(self._path):
+                try:
+                    with open(self._path, "r", encoding="utf-8") as f:
+                        stored = json.load(f)
+                    if isinstance(stored, dict):
+                        self._entries = stored
+                except (json.JSONDecodeError, OSError) as e:
+                    logging.warning("Failed to load probe index from %s: %s", self._path, e)
+        return self._entries
+
+    def get(self, file_path: str, section: str):
+        signature = self._signature(file_path)
+        if signature is None:
+            return None
+        with self._lock:
+            entry = self._ensure_loaded().get(os.path.abspath(file_path))
+            if not entry or (entry.get("size"), entry.get("mtime")) != signature:
+                return None
+            return entry.get("data", {}).get(section)
+
+    def set(self, file_path: str, section: str, value) -> None:
+        signature = self._signature(file_path)
+        if signature is None:
+            return
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entries = self._ensure_loaded()
+            entry = entries.get(key)
+            if not entry or (entry.get("size"), entry.get("mtime")) != signature:
+                entry = {"size": signature[0], "mtime": signature[1], "data": {}}
+                entries[key] = entry
+            entry["data"][section] = value
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            tmp_path = self._path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self._path)
+                self._dirty = False
+            except OSError as e:
+                logging.error("Failed to save probe index to %s: %s", self._path, e)
+
+    def probe(self, ffmpeg_path: str, file_path: str) -> MediaInfo | None:
+        cached = self.get(file_path, "media")
+        if cached is not None:
+            return MediaInfo.from_dict(cached)
+        info = probe_media(ffmpeg_path, file_path)
+        if info is not None:
+            self.set(file_path, "media", info.to_dict())
+        return info
@@ -1,62 +1,172 @@
-import json
 import logging
-import os
+import threading
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from cobalt_converter.config_store import get_store
+from cobalt_converter.constants import FORMAT_TYPES, VALID_OUTPUT_FORMATS, get_file_type, get_format_type
+from cobalt_converter.gif import GIF_FORMAT
+from cobalt_converter.packaging import PackagingFormat, PackagingSpec
+from cobalt_converter.scaling import DEFAULT_SCALER, Rendition, ScaleLimit
+
+
+@dataclass(frozen=True)
+class FormatPlan:
+    output_format: str
+    file_type: str
+    lossless: bool
+    presets: Mapping[str, tuple[str, ...]]
+    custom_params: tuple[Mapping, ...]
+    limits: Mapping[str, ScaleLimit]
+
+
+@dataclass(frozen=True)
+class _CompiledPlans:
+    digests: tuple[str | None, str | None]
+    config: dict
+    lossless: frozenset[str]
+    ladder: tuple[Rendition, ...]
+    format_plans: Mapping[str, FormatPlan]
+    command_plans: Mapping[tuple[str, str], tuple[str, ...]]
+    valid_outputs: Mapping[str, tuple[str, ...]]
+
 
 class QualityManager:
     PRESET_KEYS = ["low", "medium", "high", "maximum"]
 
     def __init__(self) -> None:
-        self._config = self._load_config()
+        self._presets_store = get_store("quality_presets")
+        self._formats_store = get_store("formats")
+        self._compile_lock = threading.Lock()
+        self._plans: _CompiledPlans | None = None
+        self._compile()
+        self._presets_store.subscribe(self._on_config_changed)
+        self._formats_store.subscribe(self._on_config_changed)
+
+    def _on_config_changed(self, _config: dict) -> None:
+        self._compile()
+
+    def _compile(self) -> None:
+        with self._compile_lock:
+            digests = (self._presets_store.digest, self._formats_store.digest)
+            if self._plans is not None and digests == self._plans.digests:
+                return
+            # Readers take one reference to the snapshot, so they never mix plans from two reloads.
+            self._plans = self._compile_tables(self._presets_store.data, digests)
+            logging.debug("Compiled quality plans (presets=%s)", (digests[0] or "")[:12])
 
     @staticmethod
-    def _load_config() -> dict:
-        config_path = os.path.join(os.path.dirname(__file__), "config", "quality_presets.json")
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    def _compile_tables(config: dict, digests: tuple[str | None, str | None]) -> _CompiledPlans:
+        lossless = frozenset(config.get("lossless_formats", []))
+        type_defaults = config.get("type_defaults", {})
+        overrides = config.get("format_overrides", {})
+
+        format_plans: dict[str, FormatPlan] = {}
+        command_plans: dict[tuple[str, str], tuple[str, ...]] = {}
+        for output_format, file_type in FORMAT_TYPES.items():
+            defaults = type_defaults.get(file_type, {})
+            override = overrides.get(output_format, {})
+            presets = override.get("presets", defaults.get("presets", {}))
+            custom = override.get("custom", defaults.get("custom", []))
+            limits = override.get("limits", defaults.get("limits", {})) if file_type == "video" else {}
+            plan = FormatPlan(
+                output_format=output_format,
+                file_type=file_type,
+                lossless=output_format in lossless,
+                presets=MappingProxyType({key: tuple(flags) for key, flags in presets.items()}),
+                custom_params=tuple(MappingProxyType(dict(param)) for param in custom),
+                limits=MappingProxyType({key: ScaleLimit.from_dict(limit) for key, limit in limits.items()}),
+            )
+            format_plans[output_format] = plan
+            command_plans[(output_format, "default")] = ()
+            for key, flags in plan.presets.items():
+                limit = plan.limits.get(key)
+                if plan.lossless:
+                    command_plans[(output_format, key)] = ()
+                else:
+                    command_plans[(output_format, key)] = flags + (limit.flags() if limit else ())
+
+        ladder = config.get("ladder", {})
+        scaler = ladder.get("scaler", DEFAULT_SCALER)
+
+        return _CompiledPlans(
+            digests=digests,
+            config=config,
+            lossless=lossless,
+            ladder=tuple(Rendition.from_dict(r, scaler) for r in ladder.get("renditions", [])),
+            format_plans=MappingProxyType(format_plans),
+            command_plans=MappingProxyType(command_plans),
+            valid_outputs=MappingProxyType({
+                file_type: tuple(formats) for file_type, formats in VALID_OUTPUT_FORMATS.items()
+            }),
+        )
 
     @property
     def lossless_formats(self) -> list[str]:
-        return self._config.get("lossless_formats", [])
+        return self._plans.config.get("lossless_formats", [])
 
     def is_lossless(self, output_format: str) -> bool:
-        return output_format in self.lossless_formats
-
-    def get_presets_for_format(self, output_format: str) -> dict[str, list[str]]:
-        overrides = self._config.get("format_overrides", {})
-        if output_format in overrides and "presets" in overrides[output_format]:
-            return overrides[output_format]["presets"]
-
-        file_type = self._get_type_for_format(output_format)
-        type_defaults = self._config.get("type_defaults", {})
-        if file_type in type_defaults:
-            return type_defaults[file_type].get("presets", {})
-        return {}
-
-    def get_custom_params(self, output_format: str) -> list[dict]:
-        overrides = self._config.get("format_overrides", {})
-        if output_format in overrides and "custom" in overrides[output_format]:
-            return overrides[output_format]["custom"]
-
-        file_type = self._get_type_for_format(output_format)
-        type_defaults = self._config.get("type_defaults", {})
-        if file_type in type_defaults:
-            return type_defaults[file_type].get("custom", [])
-        return []
-
-    def build_preset_flags(self, output_format: str, preset_key: str) -> list[str]:
-        if preset_key == "default" or self.is_lossless(output_format):
-            return []
-        presets = self.get_presets_for_format(output_format)
-        flags = list(presets.get(preset_key, []))
-        logging.debug("Preset flags for %s/%s: %s", output_format, preset_key, flags)
-        return flags
+        return output_format in self._plans.lossless
+
+    @property
+    def auto_quality_config(self) -> dict:
+        return self._plans.config.get("auto_quality", {})
+
+    def supports_auto_quality(self, output_format: str) -> bool:
+        plans = self._plans
+        plan = plans.format_plans.get(output_format)
+        if plan is None or plan.lossless or not plans.config.get("auto_quality"):
+            return False
+        return any("-crf" in flags for flags in plan.presets.values())
+
+    @property
+    def loudness_targets(self) -> dict[str, dict]:
+        return self._plans.config.get("loudness", {}).get("targets", {})
+
+    def supports_loudness(self, output_format: str) -> bool:
+        if output_format == GIF_FORMAT:
+            return False
+        return bool(self.loudness_targets) and get_format_type(output_format) in ("audio", "video")
+
+    @property
+    def ladder(self) -> tuple[Rendition, ...]:
+        return self._plans.ladder
+
+    def supports_ladder(self, output_format: str) -> bool:
+        return bool(self._plans.ladder) and get_format_type(output_format) == "video" and output_format != GIF_FORMAT
+
+    def packaging_spec(self, packaging_format: PackagingFormat | str) -> PackagingSpec:
+        return PackagingSpec.from_config(packaging_format, self._plans.config.get("packaging", {}))
+
+    def get_command_plan(self, output_format: str, preset_key: str) -> tuple[str, ...]:
+        return self._plans.command_plans.get((output_format, preset_key), ())
+
+    def plan_batch(
+        self,
+        files: Iterable[str],
+        output_format: str,
+        preset_key: str,
+    ) -> dict[str, tuple[str, ...] | None]:
+        plans = self._plans
+        flags = plans.command_plans.get((output_format, preset_key), ())
+        accepted = {file_type: output_format in formats for file_type, formats in plans.valid_outputs.items()}
+        return {file: flags if accepted.get(get_file_type(file), False) else None for file in files}
+
+    def get_presets_for_format(self, output_format: str) -> Mapping[str, tuple[str, ...]]:
+        plan = self._plans.format_plans.get(output_format)
+        return plan.presets if plan else MappingProxyType({})
+
+    def get_custom_params(self, output_format: str) -> tuple[Mapping, ...]:
+        plan = self._plans.format_plans.get(output_format)
+        return plan.custom_params if plan else ()
 
     def build_custom_flags(self, output_format: str, values: dict[str, str | int]) -> list[str]:
-        if self.is_lossless(output_format):
+        plan = self._plans.format_plans.get(output_format)
+        if plan is None or plan.lossless:
             return []
-        params = self.get_custom_params(output_format)
         flags: list[str] = []
-        for param in params:
+        for param in plan.custom_params:
             name = param["name"]
             if name in values:
                 value = str(values[name])
@@ -64,15 +174,3 @@ class QualityManager:
                 flags.extend([param["flag"], f"{value}{suffix}"])
         logging.debug("Custom flags for %s (values=%s): %s", output_format, values, flags)
         return flags
-
-    @staticmethod
-    def _get_type_for_format(output_format: str) -> str:
-        from cobalt_converter.constants import AUDIO_FORMATS, IMAGE_FORMATS, VIDEO_FORMATS
-
-        if output_format in VIDEO_FORMATS:
-            return "video"
-        if output_format in AUDIO_FORMATS:
-            return "audio"
-        if output_format in IMAGE_FORMATS:
-            return "image"
-        return "unknown"
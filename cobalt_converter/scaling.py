@@ -0,0 +1,131 @@
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+    from cobalt_converter.probe import MediaInfo
+
+DEFAULT_SCALER = "bicubic"
+SCALERS = ("fast_bilinear", "bilinear", "bicubic", "neighbor", "area", "bicublin", "gauss", "sinc", "lanczos", "spline")
+LIMIT_FLAGS = ("-vf", "-fpsmax")
+
+
+@dataclass(frozen=True)
+class ScaleLimit:
+    max_width: int | None = None
+    max_height: int | None = None
+    max_fps: float | None = None
+    scaler: str = DEFAULT_SCALER
+
+    @classmethod
+    def from_dict(cls, data: dict, default_scaler: str = DEFAULT_SCALER) -> "ScaleLimit":
+        scaler = data.get("scaler", default_scaler)
+        if scaler not in SCALERS:
+            raise ValueError(f"Unknown scaler: {scaler!r}")
+        return cls(
+            max_width=data.get("max_width"),
+            max_height=data.get("max_height"),
+            max_fps=data.get("max_fps"),
+            scaler=scaler,
+        )
+
+    def video_filter(self) -> str | None:
+        if not self.max_width and not self.max_height:
+            return None
+        width = f"'min(iw,{self.max_width})'" if self.max_width else "iw"
+        height = f"'min(ih,{self.max_height})'" if self.max_height else "ih"
+        # Bounding-box downscale only: sources already inside the box pass through untouched.
+        return (
+            f"scale=w={width}:h={height}:force_original_aspect_ratio=decrease"
+            f":force_divisible_by=2:flags={self.scaler}"
+        )
+
+    def flags(self) -> tuple[str, ...]:
+        flags: list[str] = []
+        video_filter = self.video_filter()
+        if video_filter:
+            flags += ["-vf", video_filter]
+        if self.max_fps:
+            flags += ["-fpsmax", f"{self.max_fps:g}"]
+        return tuple(flags)
+
+
+@dataclass(frozen=True)
+class Rendition:
+    name: str
+    limit: ScaleLimit
+    flags: tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict, default_scaler: str = DEFAULT_SCALER) -> "Rendition":
+        return cls(
+            name=data["name"],
+            limit=ScaleLimit.from_dict(data, default_scaler),
+            flags=tuple(data.get("flags", [])),
+        )
+
+
+def rendition_path(output_file: str, name: str) -> str:
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{name}{ext}"
+
+
+def select_renditions(renditions: list[Rendition], width: int | None, height: int | None) -> list[Rendition]:
+    # Renditions larger than the source would only re-encode the same pixels; keep the ones that downscale.
+    selected = [
+        r for r in renditions
+        if (r.limit.max_height is None or height is None or r.limit.max_height <= height)
+        and (r.limit.max_width is None or width is None or r.limit.max_width <= width)
+    ]
+    if not selected and renditions:
+        selected = [min(renditions, key=lambda r: (r.limit.max_height or 0, r.limit.max_width or 0))]
+    return selected
+
+
+def split_flag(flags: list[str] | tuple[str, ...], flag: str) -> tuple[str | None, list[str]]:
+    result = list(flags)
+    if flag in result:
+        position = result.index(flag)
+        if position + 1 < len(result):
+            value = result[position + 1]
+            del result[position:position + 2]
+            return value, result
+    return None, result
+
+
+def merge_flags(base: list[str] | tuple[str, ...], overrides: list[str] | tuple[str, ...]) -> list[str]:
+    result = list(base)
+    for i in range(0, len(overrides) - 1, 2):
+        flag, value = overrides[i], overrides[i + 1]
+        if flag in result and result.index(flag) + 1 < len(result):
+            result[result.index(flag) + 1] = value
+        else:
+            result += [flag, value]
+    return result
+
+
+def ladder_renditions(job: "ConversionJob", info: "MediaInfo | None") -> list[Rendition]:
+    video = info.video_streams[0] if info and info.video_streams else None
+    if info is not None and video is None:
+        raise ValueError(f"{job.filename} has no video stream to scale")
+    renditions = select_renditions(
+        list(job.renditions), video.width if video else None, video.height if video else None,
+    )
+    if not renditions:
+        raise ValueError("No ladder renditions are configured")
+    return renditions
+
+
+def split_graph(renditions: list[Rendition]) -> str:
+    chains = [f"[0:v:0]split={len(renditions)}" + "".join(f"[s{n}]" for n in range(len(renditions)))]
+    for n, rendition in enumerate(renditions):
+        chains.append(f"[s{n}]{rendition.limit.video_filter() or 'null'}[v{n}]")
+    return ";".join(chains)
+
+
+def rendition_flags(base_flags: list[str], rendition: Rendition) -> list[str]:
+    flags = merge_flags(base_flags, rendition.flags)
+    if rendition.limit.max_fps:
+        flags = merge_flags(flags, ("-fpsmax", f"{rendition.limit.max_fps:g}"))
+    return flags
@@ -1,19 +1,46 @@
 import json
 import logging
 import os
+import threading
 
+from cobalt_converter.config_schemas import SETTINGS_SCHEMA
+from cobalt_converter.config_store import validate
+from cobalt_converter.exceptions.config_exceptions import ConfigValidationError
+from cobalt_converter.hwaccel import HardwareBackend
+from cobalt_converter.naming import DEFAULT_NAME_TEMPLATE, CollisionPolicy, validate_template
+from cobalt_converter.previews import DEFAULT_CACHE_BYTES
+from cobalt_converter.staging import StagingMode
 from cobalt_converter.utils import get_base_path
 
 _SETTINGS_FILENAME = "settings.json"
-_DEFAULTS: dict[str, bool | str] = {
+# Changes made within this many seconds of each other are written together.
+SAVE_DELAY = 1.0
+_MB = 1024 * 1024
+_DEFAULTS: dict[str, object] = {
     "debug": False,
+    "name_template": DEFAULT_NAME_TEMPLATE,
+    "collision_policy": CollisionPolicy.SKIP.value,
+    "staging_mode": StagingMode.OFF.value,
+    "max_jobs": 1,
+    "thread_budget": 0,
+    "preview_cache_mb": DEFAULT_CACHE_BYTES // _MB,
+    "cache_dir": "",
+    "scratch_dir": "",
+    "hardware_backend": HardwareBackend.NONE.value,
+    "log_level": "INFO",
+    "last_used": {},
 }
 
 
 class SettingsManager:
-    def __init__(self) -> None:
-        self._path = os.path.join(get_base_path(), _SETTINGS_FILENAME)
-        self._data: dict[str, bool | str] = dict(_DEFAULTS)
+    def __init__(self, path: str | None = None, save_delay: float = SAVE_DELAY) -> None:
+        self._path = path or os.path.join(get_base_path(), _SETTINGS_FILENAME)
+        self._save_delay = save_delay
+        self._data: dict[str, object] = dict(_DEFAULTS)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._dirty = False
         self._load()
 
     def _load(self) -> None:
@@ -22,23 +49,168 @@ class SettingsManager:
         try:
             with open(self._path, "r", encoding="utf-8") as f:
                 stored = json.load(f)
-            if isinstance(stored, dict):
-                self._data.update(stored)
         except (json.JSONDecodeError, OSError) as e:
             logging.warning("Failed to load settings from %s: %s", self._path, e)
+            return
+        if not isinstance(stored, dict):
+            logging.warning("Ignoring settings in %s: expected an object", self._path)
+            return
+        properties = SETTINGS_SCHEMA["properties"]
+        for key, value in stored.items():
+            try:
+                if key in properties:
+                    validate(value, properties[key], f"$.{key}")
+            except ConfigValidationError as e:
+                logging.warning("Ignoring invalid setting in %s: %s", self._path, e)
+                continue
+            self._data[key] = value
 
-    def _save(self) -> None:
-        try:
-            with open(self._path, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, indent=2, ensure_ascii=False)
-        except OSError as e:
-            logging.error("Failed to save settings to %s: %s", self._path, e)
+    def _get(self, key: str):
+        with self._lock:
+            return self._data.get(key, _DEFAULTS.get(key))
+
+    def _set(self, key: str, value: object) -> None:
+        with self._lock:
+            if self._data.get(key) == value:
+                return
+            self._data[key] = value
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        # The snapshot is taken under the write lock, so a slower writer can never replace newer settings.
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                data = json.loads(json.dumps(self._data))
+                self._dirty = False
+            tmp_path = self._path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._path)
+            except OSError as e:
+                logging.error("Failed to save settings to %s: %s", self._path, e)
+                with self._lock:
+                    self._dirty = True
 
     @property
     def debug(self) -> bool:
-        return bool(self._data.get("debug", False))
+        return bool(self._get("debug"))
 
     @debug.setter
     def debug(self, value: bool) -> None:
-        self._data["debug"] = value
-        self._save()
+        self._set("debug", bool(value))
+
+    @property
+    def name_template(self) -> str:
+        template = str(self._get("name_template") or DEFAULT_NAME_TEMPLATE)
+        try:
+            validate_template(template)
+        except ValueError as e:
+            logging.warning("Ignoring invalid name template %r: %s", template, e)
+            return DEFAULT_NAME_TEMPLATE
+        return template
+
+    @name_template.setter
+    def name_template(self, value: str) -> None:
+        self._set("name_template", value)
+
+    @property
+    def collision_policy(self) -> CollisionPolicy:
+        try:
+            return CollisionPolicy(self._get("collision_policy"))
+        except ValueError:
+            return CollisionPolicy.SKIP
+
+    @collision_policy.setter
+    def collision_policy(self, value: CollisionPolicy) -> None:
+        self._set("collision_policy", CollisionPolicy(value).value)
+
+    @property
+    def staging_mode(self) -> StagingMode:
+        try:
+            return StagingMode(self._get("staging_mode"))
+        except ValueError:
+            return StagingMode.OFF
+
+    @staging_mode.setter
+    def staging_mode(self, value: StagingMode) -> None:
+        self._set("staging_mode", StagingMode(value).value)
+
+    @property
+    def max_jobs(self) -> int:
+        return int(self._get("max_jobs"))
+
+    @max_jobs.setter
+    def max_jobs(self, value: int) -> None:
+        self._set("max_jobs", max(1, int(value)))
+
+    @property
+    def thread_budget(self) -> int | None:
+        return int(self._get("thread_budget")) or None
+
+    @thread_budget.setter
+    def thread_budget(self, value: int | None) -> None:
+        self._set("thread_budget", max(0, int(value or 0)))
+
+    @property
+    def preview_cache_bytes(self) -> int:
+        return int(self._get("preview_cache_mb")) * _MB
+
+    @preview_cache_bytes.setter
+    def preview_cache_bytes(self, value: int) -> None:
+        self._set("preview_cache_mb", max(0, int(value) // _MB))
+
+    @property
+    def cache_dir(self) -> str | None:
+        return str(self._get("cache_dir")) or None
+
+    @cache_dir.setter
+    def cache_dir(self, value: str | None) -> None:
+        self._set("cache_dir", value or "")
+
+    @property
+    def scratch_dir(self) -> str | None:
+        return str(self._get("scratch_dir")) or None
+
+    @scratch_dir.setter
+    def scratch_dir(self, value: str | None) -> None:
+        self._set("scratch_dir", value or "")
+
+    @property
+    def hardware_backend(self) -> HardwareBackend:
+        return HardwareBackend(self._get("hardware_backend"))
+
+    @hardware_backend.setter
+    def hardware_backend(self, value: HardwareBackend) -> None:
+        self._set("hardware_backend", HardwareBackend(value).value)
+
+    @property
+    def log_level(self) -> str:
+        return str(self._get("log_level"))
+
+    @log_level.setter
+    def log_level(self, value: str) -> None:
+        level = value.upper()
+        validate(level, SETTINGS_SCHEMA["properties"]["log_level"], "$.log_level")
+        self._set("log_level", level)
+
+    def last_used(self, file_type: str) -> tuple[str | None, str | None]:
+        entry = self._get("last_used").get(file_type, {})
+        return entry.get("format"), entry.get("preset")
+
+    def remember_choice(self, file_type: str, output_format: str, preset: str) -> None:
+        last_used = dict(self._get("last_used"))
+        last_used[file_type] = {"format": output_format, "preset": preset}
+        self._set("last_used", last_used)
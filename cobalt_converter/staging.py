@@ -0,0 +1,236 @@
+import concurrent.futures
+import ctypes
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+
+from cobalt_converter.outputs import commit_output, discard_output, free_space, partial_path
+
+DEFAULT_READ_AHEAD = 2
+DEFAULT_IO_WORKERS = 4
+DEFAULT_READS_PER_MOUNT = 2
+DEFAULT_SEGMENT_WRITERS = 4
+
+_NETWORK_FS_TYPES = frozenset({
+    "nfs", "nfs4", "cifs", "smb", "smb2", "smb3", "smbfs", "afpfs", "webdav", "davfs",
+    "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "9p", "ceph", "glusterfs", "lustre",
+})
+_DRIVE_REMOTE = 4
+
+
+class StagingMode(str, Enum):
+    OFF = "off"
+    AUTO = "auto"
+    ALWAYS = "always"
+
+
+def mount_point(path: str) -> str:
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        drive, _ = os.path.splitdrive(path)
+        return drive or path
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _linux_mount_types() -> dict[str, str]:
+    types: dict[str, str] = {}
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3:
+                    types[parts[1].replace("\\040", " ")] = parts[2]
+    except OSError:
+        pass
+    return types
+
+
+def is_network_mount(mount: str) -> bool:
+    if sys.platform == "win32":
+        if mount.startswith(("\\\\", "//")):
+            return True
+        try:
+            return ctypes.windll.kernel32.GetDriveTypeW(mount + "\\") == _DRIVE_REMOTE
+        except (AttributeError, OSError):
+            return False
+    if os.path.exists("/proc/mounts"):
+        return _linux_mount_types().get(mount, "").lower() in _NETWORK_FS_TYPES
+    return False
+
+
+@dataclass
+class _StagedInput:
+    local_path: str
+    future: concurrent.futures.Future
+
+
+class StagingManager:
+    def __init__(
+        self,
+        mode: StagingMode = StagingMode.AUTO,
+        scratch_dir: str | None = None,
+        read_ahead: int = DEFAULT_READ_AHEAD,
+        io_workers: int = DEFAULT_IO_WORKERS,
+        reads_per_mount: int = DEFAULT_READS_PER_MOUNT,
+        segment_writers: int = DEFAULT_SEGMENT_WRITERS,
+    ) -> None:
+        self.mode = StagingMode(mode)
+        base_dir = scratch_dir or os.path.join(tempfile.gettempdir(), "cobalt_staging")
+        self.scratch_dir = os.path.join(base_dir, str(os.getpid()))
+        self.read_ahead = max(0, read_ahead)
+        self.reads_per_mount = max(1, reads_per_mount)
+        self.segment_writers = max(1, segment_writers)
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, io_workers), thread_name_prefix="cobalt-io",
+        )
+        self._lock = threading.Lock()
+        self._mount_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._network_mounts: dict[str, bool] = {}
+        self._inputs: dict[int, _StagedInput] = {}
+
+    def should_stage(self, path: str) -> bool:
+        if self.mode == StagingMode.OFF:
+            return False
+        if self.mode == StagingMode.ALWAYS:
+            return True
+        mount = mount_point(path)
+        with self._lock:
+            cached = self._network_mounts.get(mount)
+        if cached is None:
+            cached = is_network_mount(mount)
+            if cached:
+                logging.info("Treating %s as network storage", mount)
+            with self._lock:
+                self._network_mounts[mount] = cached
+        return cached
+
+    def _mount_slot(self, path: str) -> threading.BoundedSemaphore:
+        mount = mount_point(path)
+        with self._lock:
+            slot = self._mount_slots.get(mount)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.reads_per_mount)
+                self._mount_slots[mount] = slot
+            return slot
+
+    def _job_dir(self, job_id: int) -> str:
+        return os.path.join(self.scratch_dir, str(job_id))
+
+    def submit(self, fn: Callable, *args) -> concurrent.futures.Future:
+        return self._pool.submit(fn, *args)
+
+    def prefetch(self, job_id: int, input_file: str) -> bool:
+        with self._lock:
+            if job_id in self._inputs:
+                return True
+        if not self.should_stage(input_file):
+            return False
+        try:
+            size = os.path.getsize(input_file)
+        except OSError:
+            return False
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        free = free_space(self.scratch_dir)
+        if free is not None and free < size * 2:
+            logging.warning("Not enough scratch space to stage %s", input_file)
+            return False
+
+        directory = self._job_dir(job_id)
+        local_path = os.path.join(directory, os.path.basename(input_file))
+        with self._lock:
+            if job_id in self._inputs:
+                return True
+            future = self._pool.submit(self._copy_in, input_file, directory, local_path)
+            self._inputs[job_id] = _StagedInput(local_path, future)
+        return True
+
+    def _copy_in(self, input_file: str, directory: str, local_path: str) -> str:
+        with self._mount_slot(input_file):
+            os.makedirs(directory, exist_ok=True)
+            logging.debug("Staging %s -> %s", input_file, local_path)
+            # shutil.copyfile uses sendfile()/copy_file_range() where the OS supports it.
+            shutil.copyfile(input_file, local_path)
+        return local_path
+
+    def input_future(self, job_id: int) -> concurrent.futures.Future | None:
+        with self._lock:
+            staged = self._inputs.get(job_id)
+        return staged.future if staged is not None else None
+
+    def acquire_input(self, job_id: int, input_file: str) -> str:
+        if not self.prefetch(job_id, input_file):
+            return input_file
+        with self._lock:
+            staged = self._inputs[job_id]
+        try:
+            return staged.future.result()
+        except (OSError, concurrent.futures.CancelledError) as e:
+            logging.warning("Staging %s failed, reading it in place: %s", input_file, e)
+            return input_file
+
+    def local_output(self, job_id: int, output_file: str) -> str | None:
+        if not self.should_stage(output_file):
+            return None
+        directory = os.path.join(self._job_dir(job_id), "out")
+        os.makedirs(directory, exist_ok=True)
+        return partial_path(os.path.join(directory, os.path.basename(output_file)))
+
+    def write_back(self, local_file: str, output_file: str) -> None:
+        remote_partial = partial_path(output_file)
+        with self._mount_slot(output_file):
+            logging.debug("Moving staged output %s -> %s", local_file, output_file)
+            try:
+                if os.path.isdir(local_file):
+                    self._copy_tree(local_file, remote_partial)
+                else:
+                    shutil.copyfile(local_file, remote_partial)
+                commit_output(remote_partial, output_file)
+            except OSError:
+                discard_output(remote_partial)
+                raise
+            finally:
+                discard_output(local_file)
+
+    def _copy_tree(self, source_dir: str, target_dir: str) -> None:
+        copies = []
+        for root, _dirs, files in os.walk(source_dir):
+            relative = os.path.relpath(root, source_dir)
+            os.makedirs(os.path.normpath(os.path.join(target_dir, relative)), exist_ok=True)
+            copies += [
+                (os.path.join(root, name), os.path.normpath(os.path.join(target_dir, relative, name)))
+                for name in files
+            ]
+        # Segment packages are many small files; a private pool keeps the shared I/O workers free for prefetches.
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.segment_writers, thread_name_prefix="cobalt-segments",
+        ) as pool:
+            for future in [pool.submit(shutil.copyfile, src, dst) for src, dst in copies]:
+                future.result()
+
+    def release(self, job_id: int) -> None:
+        with self._lock:
+            staged = self._inputs.pop(job_id, None)
+        directory = self._job_dir(job_id)
+        if staged is not None and not staged.future.done() and not staged.future.cancel():
+            staged.future.add_done_callback(lambda _f: shutil.rmtree(directory, ignore_errors=True))
+            return
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            job_ids = list(self._inputs)
+        for job_id in job_ids:
+            self.release(job_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
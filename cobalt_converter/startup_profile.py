@@ -0,0 +1,276 @@
+import contextlib
+import ctypes
+import importlib.abc
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from collections.abc import Iterator
+
+from cobalt_converter.paths import get_base_path
+
+PROFILE_FILENAME = "startup_profile.json"
+BASELINE_FILENAME = "startup_baseline.json"
+# A metric regresses when it is this much slower than the baseline, and by at least REGRESSION_MIN_MS.
+REGRESSION_RATIO = 0.2
+REGRESSION_MIN_MS = 50.0
+SLOWEST_IMPORTS = 25
+
+_active: "StartupProfiler | None" = None
+
+
+def _proc_age(pid: str) -> float | None:
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="ascii") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_age() -> float | None:
+    if sys.platform == "win32":
+        creation, exit_time, kernel, user, now = (ctypes.c_ulonglong() for _ in range(5))
+        try:
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(
+                kernel32.GetCurrentProcess(),
+                ctypes.byref(creation), ctypes.byref(exit_time), ctypes.byref(kernel), ctypes.byref(user),
+            ):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+        except (AttributeError, OSError):
+            return None
+        return (now.value - creation.value) / 1e7
+    return _proc_age("self") if os.path.isdir("/proc") else None
+
+
+def onefile_unpack_time(own_age: float | None) -> float | None:
+    # A onefile build is a bootloader process that unpacks the app to _MEIxxxx, then starts it as a child.
+    bundle = getattr(sys, "_MEIPASS", None)
+    if own_age is None or not bundle or os.path.dirname(os.path.abspath(sys.executable)) == bundle:
+        return None
+    parent_age = _proc_age(str(os.getppid())) if os.path.isdir("/proc") else None
+    return parent_age - own_age if parent_age is not None else None
+
+
+class _TimedLoader:
+    def __init__(self, loader, timer: "ImportTimer", name: str) -> None:
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        create = getattr(self._loader, "create_module", None)
+        return create(spec) if create is not None else None
+
+    def exec_module(self, module) -> None:
+        try:
+            with self._timer.measure(self._name):
+                self._loader.exec_module(module)
+        finally:
+            if getattr(module, "__loader__", None) is self:
+                module.__loader__ = self._loader
+            spec = getattr(module, "__spec__", None)
+            if spec is not None and spec.loader is self:
+                spec.loader = self._loader
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    def __init__(self) -> None:
+        self.records: list[dict] = []
+        self._local = threading.local()
+
+    def find_spec(self, fullname: str, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    @contextlib.contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        # Same numbers as -X importtime: self time excludes the imports a module triggers, cumulative includes them.
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.records.append({
+                "module": name,
+                "self_ms": round((elapsed - children) * 1000, 3),
+                "cumulative_ms": round(elapsed * 1000, 3),
+                "depth": len(stack),
+            })
+
+
+class StartupProfiler:
+    def __init__(
+        self,
+        output_path: str | None = None,
+        baseline_path: str | None = None,
+        update_baseline: bool = False,
+    ) -> None:
+        self._origin = time.perf_counter()
+        age = process_age()
+        self.output_path = output_path or os.path.join(get_base_path(), PROFILE_FILENAME)
+        self.baseline_path = baseline_path or os.path.join(get_base_path(), BASELINE_FILENAME)
+        self.update_baseline = update_baseline
+        # Offsets are measured from process creation when the OS reports it, else from this point.
+        self._offset_ms = age * 1000 if age is not None else 0.0
+        self._to_entry_ms = self._offset_ms if age is not None else None
+        unpack = onefile_unpack_time(age)
+        self._unpack_ms = unpack * 1000 if unpack is not None else None
+        self.phases: list[dict] = []
+        self.marks: dict[str, float] = {}
+        self._depth = 0
+        self.imports = ImportTimer()
+
+    @classmethod
+    def start(cls, *args, **kwargs) -> "StartupProfiler":
+        global _active
+        profiler = cls(*args, **kwargs)
+        sys.meta_path.insert(0, profiler.imports)
+        _active = profiler
+        return profiler
+
+    def _now_ms(self) -> float:
+        return self._offset_ms + (time.perf_counter() - self._origin) * 1000
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self._now_ms()
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.phases.append({
+                "name": name,
+                "start_ms": round(start, 3),
+                "duration_ms": round(self._now_ms() - start, 3),
+                "depth": depth,
+            })
+
+    def mark(self, name: str) -> None:
+        self.marks.setdefault(name, round(self._now_ms(), 3))
+
+    def report(self) -> dict:
+        records = list(self.imports.records)
+        return {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "process_to_entry_ms": round(self._to_entry_ms, 3) if self._to_entry_ms is not None else None,
+            "onefile_unpack_ms": round(self._unpack_ms, 3) if self._unpack_ms is not None else None,
+            "marks": dict(self.marks),
+            "phases": sorted(self.phases, key=lambda p: p["start_ms"]),
+            "imports": {
+                "count": len(records),
+                "total_ms": round(sum(r["self_ms"] for r in records), 3),
+                "slowest": sorted(records, key=lambda r: -r["self_ms"])[:SLOWEST_IMPORTS],
+                "modules": records,
+            },
+        }
+
+    def finish(self) -> dict:
+        global _active
+        if self.imports in sys.meta_path:
+            sys.meta_path.remove(self.imports)
+        _active = None
+        report = self.report()
+        baseline = _load_report(self.baseline_path)
+        report["baseline"] = self.baseline_path if baseline is not None else None
+        report["regressions"] = compare(report, baseline) if baseline is not None else []
+        _write_report(self.output_path, report)
+        logging.info("Startup profile written to %s", self.output_path)
+        for regression in report["regressions"]:
+            logging.warning(
+                "Startup regression in %s: %.1f ms (baseline %.1f ms)",
+                regression["metric"], regression["current_ms"], regression["baseline_ms"],
+            )
+        if self.update_baseline or baseline is None:
+            _write_report(self.baseline_path, report)
+            logging.info("Startup baseline saved to %s", self.baseline_path)
+        return report
+
+
+def metrics(report: dict) -> dict[str, float]:
+    values = {
+        "process_to_entry": report.get("process_to_entry_ms"),
+        "onefile_unpack": report.get("onefile_unpack_ms"),
+        "imports": report.get("imports", {}).get("total_ms"),
+        **{f"mark:{name}": value for name, value in report.get("marks", {}).items()},
+        **{f"phase:{p['name']}": p["duration_ms"] for p in report.get("phases", [])},
+    }
+    return {name: value for name, value in values.items() if value is not None}
+
+
+def compare(report: dict, baseline: dict) -> list[dict]:
+    current, previous = metrics(report), metrics(baseline)
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        if value > before * (1 + REGRESSION_RATIO) and value - before >= REGRESSION_MIN_MS:
+            regressions.append({
+                "metric": name,
+                "baseline_ms": before,
+                "current_ms": round(value, 3),
+                "change": round(value / before - 1, 3) if before else None,
+            })
+    return regressions
+
+
+def _load_report(path: str) -> dict | None:
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning("Could not read startup baseline %s: %s", path, e)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _write_report(path: str, report: dict) -> None:
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error("Could not write startup profile to %s: %s", path, e)
+
+
+def profile_phase(name: str) -> contextlib.AbstractContextManager:
+    return _active.phase(name) if _active is not None else contextlib.nullcontext()
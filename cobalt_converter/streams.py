@@ -0,0 +1,207 @@
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from cobalt_converter.outputs import partial_path
+from cobalt_converter.plans import CommandPlan
+from cobalt_converter.probe import MediaInfo, ProbeIndex, StreamInfo
+from cobalt_converter.scaling import rendition_path
+
+if TYPE_CHECKING:
+    from cobalt_converter.jobs import ConversionJob
+
+TEXT_SUBTITLE_CODECS = frozenset({"subrip", "srt", "ass", "ssa", "webvtt", "mov_text", "text"})
+_AUDIO_OPTIONS = ("-ar", "-ac", "-af", "-aq", "-ab", "-acodec")
+_SPECIFIERS = {"video": "v", "audio": "a", "subtitle": "s", "attachment": "t"}
+# Audio codecs each audio output format holds as-is, so extraction can copy them.
+AUDIO_CONTAINERS = {
+    "mp3": frozenset({"mp3"}),
+    "aac": frozenset({"aac"}),
+    "m4a": frozenset({"aac", "alac"}),
+    "wav": frozenset({"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}),
+    "flac": frozenset({"flac"}),
+    "ogg": frozenset({"vorbis", "opus", "flac"}),
+    "wma": frozenset({"wmav1", "wmav2"}),
+}
+
+
+@dataclass(frozen=True)
+class ContainerRules:
+    # None accepts any codec; an empty set accepts none.
+    video_codecs: frozenset[str] | None
+    audio_codecs: frozenset[str] | None
+    subtitle_codecs: frozenset[str] | None = frozenset()
+    subtitle_encoder: str | None = None
+    multiple_audio: bool = True
+    attachments: bool = False
+
+
+CONTAINERS = {
+    "mkv": ContainerRules(None, None, None, attachments=True),
+    "mp4": ContainerRules(
+        frozenset({"h264", "hevc", "av1", "vp9", "mpeg4"}),
+        frozenset({"aac", "mp3", "ac3", "eac3", "alac", "flac", "opus"}),
+        frozenset({"mov_text"}),
+        "mov_text",
+    ),
+    "mov": ContainerRules(
+        frozenset({"h264", "hevc", "mpeg4", "prores", "mjpeg"}),
+        frozenset({"aac", "mp3", "ac3", "alac", "pcm_s16le", "pcm_s24le"}),
+        frozenset({"mov_text"}),
+        "mov_text",
+    ),
+    "webm": ContainerRules(
+        frozenset({"vp8", "vp9", "av1"}), frozenset({"opus", "vorbis"}), frozenset({"webvtt"}), "webvtt",
+    ),
+    "avi": ContainerRules(
+        frozenset({"mpeg4", "h264", "mjpeg", "msmpeg4v2", "msmpeg4v3"}), frozenset({"mp3", "ac3", "pcm_s16le"}),
+    ),
+    "flv": ContainerRules(frozenset({"h264", "flv1"}), frozenset({"aac", "mp3"}), multiple_audio=False),
+    "wmv": ContainerRules(frozenset({"wmv1", "wmv2", "wmv3", "vc1"}), frozenset({"wmav1", "wmav2"})),
+}
+
+
+@dataclass(frozen=True)
+class StreamAction:
+    stream: StreamInfo
+    output_index: int
+    copy: bool
+    encoder: str | None = None
+
+    @property
+    def specifier(self) -> str:
+        return f"{_SPECIFIERS[self.stream.kind]}:{self.output_index}"
+
+    def describe(self) -> str:
+        language = f" ({self.stream.language})" if self.stream.language else ""
+        action = "copy" if self.copy else f"encode {self.encoder or 'default'}"
+        return f"0:{self.stream.index} {self.stream.kind} {self.stream.codec}{language} -> {self.specifier} {action}"
+
+
+def _accepts(codecs: frozenset[str] | None, codec: str) -> bool:
+    return codecs is None or codec in codecs
+
+
+def encoded_kinds(flags: list[str] | tuple[str, ...]) -> set[str]:
+    kinds = set()
+    for flag in flags[0::2]:
+        name, _, stream = flag.partition(":")
+        kinds.add("audio" if stream.startswith("a") or name in _AUDIO_OPTIONS else "video")
+    return kinds
+
+
+def plan_streams(
+    info: MediaInfo, output_format: str, flags: list[str] | tuple[str, ...],
+) -> list[StreamAction] | None:
+    rules = CONTAINERS.get(output_format.lower())
+    if rules is None or not info.video_streams:
+        return None
+    # Quality flags ask for a new encode of their stream type; everything else is copied when the container allows it.
+    encoded = encoded_kinds(flags)
+    actions = []
+    video = info.video_streams[0]
+    actions.append(StreamAction(video, 0, "video" not in encoded and _accepts(rules.video_codecs, video.codec)))
+    audio_streams = info.audio_streams if rules.multiple_audio else info.audio_streams[:1]
+    for n, stream in enumerate(audio_streams):
+        actions.append(StreamAction(stream, n, "audio" not in encoded and _accepts(rules.audio_codecs, stream.codec)))
+    subtitles = 0
+    for stream in info.streams_of("subtitle"):
+        if _accepts(rules.subtitle_codecs, stream.codec):
+            actions.append(StreamAction(stream, subtitles, True))
+        elif rules.subtitle_encoder and stream.codec in TEXT_SUBTITLE_CODECS:
+            actions.append(StreamAction(stream, subtitles, False, rules.subtitle_encoder))
+        else:
+            logging.info("Dropping %s subtitle 0:%d, which %s cannot hold", stream.codec, stream.index, output_format)
+            continue
+        subtitles += 1
+    if rules.attachments:
+        for n, stream in enumerate(info.streams_of("attachment")):
+            actions.append(StreamAction(stream, n, True))
+    return actions
+
+
+def track_path(output_file: str, track: int) -> str:
+    return rendition_path(output_file, f"track{track + 1}")
+
+
+def track_flags(flags: list[str] | tuple[str, ...], track: int) -> list[str]:
+    # Extraction writes each track to its own file, so options addressed to track N apply to that file's only stream.
+    result = []
+    for i in range(0, len(flags) - 1, 2):
+        flag, value = flags[i], flags[i + 1]
+        name, _, stream = flag.partition(":")
+        kind, _, index = stream.partition(":")
+        if kind == "a" and index.isdigit():
+            if int(index) != track:
+                continue
+            flag = f"{name}:a:0"
+        result += [flag, value]
+    return result
+
+
+def stream_args(actions: list[StreamAction], info: MediaInfo) -> list[str]:
+    args = []
+    for action in actions:
+        args += ["-map", f"0:{action.stream.index}"]
+    for action in actions:
+        if action.copy:
+            args += [f"-c:{action.specifier}", "copy"]
+        elif action.encoder:
+            args += [f"-c:{action.specifier}", action.encoder]
+    args += ["-map_metadata", "0"]
+    if info.chapter_count:
+        args += ["-map_chapters", "0"]
+    return args
+
+
+def plan_extract_audio(ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex) -> CommandPlan:
+    info = probe_index.probe(ffmpeg_path, job.input_file)
+    if info is not None and not info.audio_streams:
+        raise ValueError(f"{job.filename} has no audio stream to extract")
+    tracks = job.audio_tracks or (0,)
+    missing = [n for n in tracks if info is not None and n >= len(info.audio_streams)]
+    if missing:
+        raise ValueError(f"{job.filename} has no audio track {missing[0] + 1}")
+
+    encode = "audio" in encoded_kinds(job.quality_flags)
+    codecs = AUDIO_CONTAINERS.get(job.output_format.lower(), frozenset())
+    output_args: list[str] = []
+    outputs = []
+    copies = []
+    for n in tracks:
+        copy = info is not None and not encode and info.audio_streams[n].codec in codecs
+        output_args += [
+            "-map", f"0:a:{n}", "-vn", "-sn", "-dn", "-map_metadata", "0",
+            *(["-c:a", "copy"] if copy else track_flags(job.quality_flags, n)),
+        ]
+        if len(tracks) > 1:
+            final = track_path(job.output_file, n)
+            output_args.append(partial_path(final))
+            outputs.append((partial_path(final), final))
+        copies.append(copy)
+    logging.info(
+        "Extracting audio track(s) %s of %s (%s)",
+        ", ".join(str(n + 1) for n in tracks), job.input_file, "stream copy" if all(copies) else "re-encode",
+    )
+    # As input options these make the demuxer drop video, subtitle and data packets before anything decodes them.
+    return CommandPlan(
+        ("-vn", "-sn", "-dn", "-i", source),
+        tuple(output_args),
+        info.duration if info else None,
+        all(copies),
+        outputs=tuple(outputs),
+    )
+
+
+def plan_convert(ffmpeg_path: str, job: "ConversionJob", source: str, probe_index: ProbeIndex) -> CommandPlan:
+    info = probe_index.probe(ffmpeg_path, job.input_file) if job.output_format.lower() in CONTAINERS else None
+    actions = plan_streams(info, job.output_format, job.quality_flags) if info is not None else None
+    if not actions:
+        return CommandPlan(("-i", source), tuple(job.quality_flags))
+    return CommandPlan(
+        ("-i", source),
+        (*stream_args(actions, info), *job.quality_flags),
+        info.duration,
+        all(action.copy for action in actions),
+        streams=tuple(actions),
+    )
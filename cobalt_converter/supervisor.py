@@ -0,0 +1,237 @@
+import asyncio
+import collections
+import concurrent.futures
+import dataclasses
+import logging
+import os
+import re
+import signal
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+
+from cobalt_converter.memory import ProcessMemoryLimiter
+from cobalt_converter.utils import get_subprocess_env, get_subprocess_flags
+
+DEFAULT_GRACE_PERIOD = 5.0
+TAIL_LINES = 40
+_READ_CHUNK = 4096
+_LINE_SPLIT_RE = re.compile(rb"[\r\n]")
+PAUSE_SUPPORTED = hasattr(signal, "SIGSTOP")
+
+
+@dataclass
+class ProcessResult:
+    returncode: int | None
+    stop_reason: str | None = None
+    tail: list[str] = field(default_factory=list)
+    memory_limit: int | None = None
+    output: list[str] | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0 and self.stop_reason is None
+
+
+# Runs a short helper command for a job and returns its complete output.
+CommandRunner = Callable[[list[str], float | None], ProcessResult]
+
+
+class ProcessSupervisor:
+    def __init__(self, grace_period: float = DEFAULT_GRACE_PERIOD) -> None:
+        self._grace_period = grace_period
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._processes: dict[Hashable, asyncio.subprocess.Process] = {}
+        self._stop_reasons: dict[Hashable, str] = {}
+        self._paused: dict[Hashable, float] = {}
+        self._pause_credit: dict[Hashable, float] = {}
+        self.memory_limiter = ProcessMemoryLimiter()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @property
+    def running_count(self) -> int:
+        return len(self._processes)
+
+    def run(
+        self,
+        key: Hashable,
+        cmd: list[str],
+        on_line: Callable[[str], None] | None = None,
+        timeout: float | None = None,
+        stall_timeout: float | None = None,
+        memory_limit: int | None = None,
+        threads: int | None = None,
+    ) -> concurrent.futures.Future:
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(
+            self._supervise(key, cmd, on_line, timeout, stall_timeout, memory_limit, threads), loop
+        )
+
+    def capture(self, key: Hashable, cmd: list[str], timeout: float | None = None) -> ProcessResult:
+        lines: list[str] = []
+        result = self.run(key, cmd, on_line=lines.append, timeout=timeout).result()
+        return dataclasses.replace(result, output=lines)
+
+    def pause(self, key: Hashable) -> bool:
+        process = self._processes.get(key)
+        if not PAUSE_SUPPORTED or process is None or process.returncode is not None or key in self._paused:
+            return False
+        try:
+            os.kill(process.pid, signal.SIGSTOP)
+        except ProcessLookupError:
+            return False
+        self._paused[key] = time.monotonic()
+        logging.info("Paused process %s", key)
+        return True
+
+    def resume(self, key: Hashable) -> bool:
+        paused_at = self._paused.pop(key, None)
+        if paused_at is None:
+            return False
+        # Time spent stopped does not count against the job's timeout.
+        self._pause_credit[key] = self._pause_credit.get(key, 0.0) + time.monotonic() - paused_at
+        process = self._processes.get(key)
+        if process is not None and process.returncode is None:
+            try:
+                os.kill(process.pid, signal.SIGCONT)
+            except ProcessLookupError:
+                pass
+        logging.info("Resumed process %s", key)
+        return True
+
+    def is_paused(self, key: Hashable) -> bool:
+        return key in self._paused
+
+    def terminate(self, key: Hashable, reason: str = "cancelled") -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._request_stop, key, reason)
+
+    def terminate_all(self, reason: str = "cancelled") -> None:
+        for key in list(self._processes):
+            self.terminate(key, reason)
+
+    def shutdown(self) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._stop_all("shutdown"), self._loop)
+        try:
+            future.result(timeout=self._grace_period + 1)
+        except (concurrent.futures.TimeoutError, RuntimeError) as e:
+            logging.warning("Process supervisor did not shut down cleanly: %s", e)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _stop_all(self, reason: str) -> None:
+        stops = []
+        for key, process in list(self._processes.items()):
+            if process.returncode is None:
+                self._stop_reasons.setdefault(key, reason)
+                stops.append(self._stop_process(process))
+        await asyncio.gather(*stops)
+
+    def _request_stop(self, key: Hashable, reason: str) -> None:
+        process = self._processes.get(key)
+        if process is None or process.returncode is not None or key in self._stop_reasons:
+            return
+        self._stop_reasons[key] = reason
+        logging.info("Stopping process %s (%s)", key, reason)
+        asyncio.get_running_loop().create_task(self._stop_process(process))
+
+    async def _stop_process(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            process.terminate()
+            if PAUSE_SUPPORTED:
+                # A stopped process only acts on SIGTERM once it runs again.
+                process.send_signal(signal.SIGCONT)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(process.wait(), self._grace_period)
+        except asyncio.TimeoutError:
+            logging.warning("Process %d ignored SIGTERM, killing it", process.pid)
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def _supervise(
+        self,
+        key: Hashable,
+        cmd: list[str],
+        on_line: Callable[[str], None] | None,
+        timeout: float | None,
+        stall_timeout: float | None,
+        memory_limit: int | None,
+        threads: int | None,
+    ) -> ProcessResult:
+        loop = asyncio.get_running_loop()
+        limits = self.memory_limiter.prepare(key, memory_limit, threads) if memory_limit else {}
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=get_subprocess_env(),
+                **get_subprocess_flags(),
+                **limits,
+            )
+        except BaseException:
+            self.memory_limiter.release(key)
+            raise
+        self._processes[key] = process
+        deadline = loop.time() + timeout if timeout else None
+        tail: collections.deque[str] = collections.deque(maxlen=TAIL_LINES)
+        buffer = b""
+
+        def emit(raw: bytes) -> None:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                return
+            tail.append(line)
+            if on_line is not None:
+                try:
+                    on_line(line)
+                except Exception:
+                    logging.exception("Output handler failed for process %s", key)
+
+        try:
+            while True:
+                wait = stall_timeout
+                if deadline is not None:
+                    remaining = deadline + self._pause_credit.get(key, 0.0) - loop.time()
+                    wait = remaining if wait is None else min(wait, remaining)
+                if key in self._stop_reasons or key in self._paused:
+                    wait = None
+                try:
+                    if wait is not None and wait <= 0:
+                        raise asyncio.TimeoutError
+                    chunk = await asyncio.wait_for(process.stdout.read(_READ_CHUNK), wait)
+                except asyncio.TimeoutError:
+                    if key in self._paused:
+                        continue
+                    expired = deadline is not None and loop.time() >= deadline + self._pause_credit.get(key, 0.0)
+                    self._request_stop(key, "timeout" if expired else "stalled")
+                    continue
+                if not chunk:
+                    break
+                *lines, buffer = _LINE_SPLIT_RE.split(buffer + chunk)
+                for raw in lines:
+                    emit(raw)
+            emit(buffer)
+            returncode = await process.wait()
+        finally:
+            self._processes.pop(key, None)
+            self._paused.pop(key, None)
+            self._pause_credit.pop(key, None)
+            self.memory_limiter.release(key)
+        return ProcessResult(returncode, self._stop_reasons.pop(key, None), list(tail), memory_limit)
@@ -2,39 +2,64 @@ import json
 import logging
 import os
 
+FALLBACK_LANGUAGE = "en"
+_LANGUAGES_DIR = os.path.join(os.path.dirname(__file__), "Languages")
+
 
 class Translator:
-    def __init__(self, initial_language: str = "en") -> None:
+    def __init__(self, initial_language: str = FALLBACK_LANGUAGE, languages_dir: str | None = None) -> None:
+        # Only the file names are read up front; a language is parsed the first time it is selected.
+        base_path = languages_dir or _LANGUAGES_DIR
+        self._files: dict[str, str] = {}
+        if os.path.isdir(base_path):
+            for filename in os.listdir(base_path):
+                if filename.endswith(".json"):
+                    self._files[os.path.splitext(filename)[0].lower()] = os.path.join(base_path, filename)
+        self._tables: dict[str, dict[str, str]] = {}
         self.language = initial_language
-        self.translations: dict[str, dict[str, str]] = {}
-        self._load_languages()
-
-    def _load_languages(self) -> None:
-        base_path = os.path.join(os.path.dirname(__file__), "Languages")
-        if not os.path.exists(base_path):
-            return
-
-        for filename in os.listdir(base_path):
-            if filename.endswith(".json"):
-                lang_code = os.path.splitext(filename)[0].lower()
-                file_path = os.path.join(base_path, filename)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        self.translations[lang_code] = json.load(f)
-                except (json.JSONDecodeError, OSError):
-                    logging.warning("Failed to load language file: %s", file_path)
+        self._table = self._compile(initial_language)
+
+    @property
+    def available_languages(self) -> list[str]:
+        return sorted(self._files)
+
+    def _read(self, lang_code: str) -> dict[str, str]:
+        file_path = self._files.get(lang_code)
+        if file_path is None:
+            return {}
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logging.warning("Failed to load language file: %s", file_path)
+            return {}
+        if not isinstance(data, dict):
+            logging.warning("Ignoring language file %s: expected an object", file_path)
+            return {}
+        return {str(key): str(value) for key, value in data.items()}
+
+    def _compile(self, lang_code: str) -> dict[str, str]:
+        table = self._tables.get(lang_code)
+        if table is None:
+            # English is merged underneath, so a missing key costs no second lookup.
+            base = self._compile(FALLBACK_LANGUAGE) if lang_code != FALLBACK_LANGUAGE else {}
+            table = {**base, **self._read(lang_code)}
+            self._tables[lang_code] = table
+        return table
 
     def set_language(self, lang_code: str) -> None:
-        if lang_code in self.translations:
+        if lang_code in self._files:
+            self._table = self._compile(lang_code)
             self.language = lang_code
 
     def get(self, key: str, **kwargs: str | int | float) -> str:
+        template = self._table.get(key, key)
+        if not kwargs:
+            return template
         try:
-            template = self.translations[self.language][key]
-            return template.format(**kwargs) if kwargs else template
-        except KeyError:
+            return template.format(**kwargs)
+        except (KeyError, IndexError):
             try:
-                template = self.translations.get("en", {}).get(key, key)
-                return template.format(**kwargs) if kwargs else template
+                return self._compile(FALLBACK_LANGUAGE).get(key, key).format(**kwargs)
             except (KeyError, IndexError):
                 return key
@@ -2,10 +2,30 @@ import logging
 
 import wx
 
-from cobalt_converter.constants import APP_AUTHOR, APP_AUTHOR_HE, APP_NAME, APP_VERSION, LANGUAGES
+from cobalt_converter.constants import APP_AUTHOR, APP_AUTHOR_HE, APP_NAME, APP_VERSION, LANGUAGES, get_file_type
+from cobalt_converter.quality_manager import QualityManager
 from cobalt_converter.utils import get_ffmpeg_version, is_debug_mode
 
 
+def _set_label(control: wx.Window, text: str) -> None:
+    # Relabelling forces a re-layout and repaint, so unchanged labels are left alone.
+    if control.GetLabel() != text:
+        control.SetLabel(text)
+
+
+def _set_item_label(item: wx.MenuItem, text: str) -> None:
+    if item.GetItemLabel() != text:
+        item.SetItemLabel(text)
+
+
+def _set_choice(combo: wx.ComboBox, index: int, text: str) -> None:
+    if index < combo.GetCount() and combo.GetString(index) != text:
+        selection = combo.GetSelection()
+        combo.SetString(index, text)
+        if selection == index:
+            combo.SetSelection(selection)
+
+
 class UIBuilderMixin:
     def _build_ui(self) -> None:
         self.main_panel = wx.Panel(self)
@@ -35,6 +55,8 @@ class UIBuilderMixin:
 
         self.scroll = wx.ScrolledWindow(panel, style=wx.VSCROLL)
         self.scroll.SetScrollRate(5, 5)
+        self.scroll.Bind(wx.EVT_SCROLLWIN, self._on_file_list_scrolled)
+        self.scroll.Bind(wx.EVT_SIZE, self._on_file_list_scrolled)
         self.list_sizer = wx.BoxSizer(wx.VERTICAL)
         self.scroll.SetSizer(self.list_sizer)
         self.list_sizer.AddStretchSpacer(1)
@@ -74,8 +96,21 @@ class UIBuilderMixin:
         self.quality_combo = wx.ComboBox(panel, style=wx.CB_READONLY)
         self.quality_combo.SetMinSize((150, -1))
         self.quality_combo.Bind(wx.EVT_COMBOBOX, lambda e: self._on_quality_changed())
+        self._quality_keys: list[str] = []
         format_sizer.Add(self.quality_combo, 0, wx.RIGHT, 6)
 
+        self.auto_quality_check = wx.CheckBox(panel)
+        self.auto_quality_check.Enable(False)
+        format_sizer.Add(self.auto_quality_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 12)
+
+        self.loudness_label = wx.StaticText(panel)
+        format_sizer.Add(self.loudness_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        self.loudness_combo = wx.ComboBox(panel, style=wx.CB_READONLY)
+        self.loudness_combo.SetMinSize((170, -1))
+        self.loudness_combo.Enable(False)
+        format_sizer.Add(self.loudness_combo, 0, wx.RIGHT, 6)
+        self._loudness_targets: list[str | None] = []
+
         format_sizer.AddStretchSpacer(1)
         main_sizer.Add(format_sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 8)
 
@@ -115,19 +150,19 @@ class UIBuilderMixin:
         footer_sizer.AddStretchSpacer(1)
         main_sizer.Add(footer_sizer, 0, wx.EXPAND | wx.ALL, 4)
 
+        self._update_quality_options()
         self._retranslate_ui()
 
     def _on_format_changed(self) -> None:
         self._update_quality_options()
 
     def _on_quality_changed(self) -> None:
-        selected = self.quality_combo.GetValue()
-        is_custom = selected == self.translator.get("quality_custom")
-        if is_custom:
+        if self._selected_preset_key() == "custom":
             self._build_custom_controls()
             self.custom_panel.Show()
         else:
             self.custom_panel.Hide()
+        self._update_auto_quality_option()
         self.main_panel.Layout()
         self.Layout()
 
@@ -139,25 +174,61 @@ class UIBuilderMixin:
         self.custom_panel.Hide()
 
         if not output_format or self.quality_manager.is_lossless(output_format):
+            self._quality_keys = ["default"]
             self.quality_combo.Enable(False)
             self.quality_combo.Append(t.get("quality_default"))
             self.quality_combo.SetSelection(0)
+            self._update_auto_quality_option()
+            self._update_loudness_options()
             return
 
         self.quality_combo.Enable(True)
-        choices = [
-            t.get("quality_default"),
-            t.get("quality_low"),
-            t.get("quality_medium"),
-            t.get("quality_high"),
-            t.get("quality_maximum"),
-            t.get("quality_custom"),
-        ]
-        for choice in choices:
-            self.quality_combo.Append(choice)
+        self._quality_keys = ["default", "low", "medium", "high", "maximum", "custom"]
+        for key in self._quality_keys:
+            self.quality_combo.Append(t.get(f"quality_{key}"))
         self.quality_combo.SetSelection(0)
+        last_format, last_preset = self.settings.last_used(get_file_type(self.files[0])) if self.files else (None, None)
+        if last_format == output_format and last_preset in self._quality_keys:
+            self.quality_combo.SetSelection(self._quality_keys.index(last_preset))
+            self._on_quality_changed()
+        self._update_auto_quality_option()
+        self._update_loudness_options()
         self.Layout()
 
+    def _update_auto_quality_option(self) -> None:
+        output_format = self.format_combo.GetValue()
+        enabled = (
+            bool(output_format)
+            and self.quality_manager.supports_auto_quality(output_format)
+            and self._selected_preset_key() in QualityManager.PRESET_KEYS
+        )
+        self.auto_quality_check.Enable(enabled)
+        if not enabled:
+            self.auto_quality_check.SetValue(False)
+
+    def _update_loudness_options(self) -> None:
+        output_format = self.format_combo.GetValue()
+        previous = self._selected_loudness_target()
+        self._loudness_targets = [None, *self.quality_manager.loudness_targets]
+        self.loudness_combo.Clear()
+        for name in self._loudness_targets:
+            self.loudness_combo.Append(self._loudness_label(name))
+        enabled = bool(output_format) and self.quality_manager.supports_loudness(output_format)
+        self.loudness_combo.Enable(enabled)
+        selection = self._loudness_targets.index(previous) if enabled and previous in self._loudness_targets else 0
+        self.loudness_combo.SetSelection(selection)
+
+    def _loudness_label(self, name: str | None) -> str:
+        key = f"loudness_{name or 'off'}"
+        label = self.translator.get(key)
+        return name.title() if label == key and name else label
+
+    def _selected_loudness_target(self) -> str | None:
+        index = self.loudness_combo.GetSelection()
+        if not self.loudness_combo.IsEnabled() or not 0 <= index < len(self._loudness_targets):
+            return None
+        return self._loudness_targets[index]
+
     def _build_custom_controls(self) -> None:
         self.custom_sizer.Clear(delete_windows=True)
         self.custom_controls.clear()
@@ -216,6 +287,7 @@ class UIBuilderMixin:
 
     def refresh_ffmpeg_cache(self) -> None:
         ffmpeg_path = self.engine.get_ffmpeg_path()
+        self._cached_ffmpeg_path = ffmpeg_path
         self._cached_ffmpeg_version = get_ffmpeg_version(ffmpeg_path)
 
     def change_language(self, lang_name: str) -> None:
@@ -237,18 +309,26 @@ class UIBuilderMixin:
         title = t.get("window_title", app_name=APP_NAME)
         if is_debug_mode():
             title += " [DEBUG]"
-        self.SetTitle(title)
-        self.select_btn.SetLabel(t.get("select_files_btn"))
-        self.clear_btn.SetLabel(t.get("clear_btn"))
-        self.drag_hint.SetLabel(t.get("drag_drop_hint"))
-        self.use_custom_output.SetLabel(t.get("custom_output_checkbox"))
-        self.output_folder_edit.SetHint(t.get("output_folder_placeholder"))
-        self.browse_output_btn.SetLabel(t.get("browse_btn"))
-        self.format_label.SetLabel(t.get("convert_to_label"))
-        self.quality_label.SetLabel(t.get("quality_label"))
-        self.convert_btn.SetLabel(t.get("convert_now_btn"))
-        self.stop_btn.SetLabel(t.get("stop_btn"))
-        self.language_label.SetLabel(t.get("language_label"))
+        if self.GetTitle() != title:
+            self.SetTitle(title)
+        for control, key in (
+            (self.select_btn, "select_files_btn"),
+            (self.clear_btn, "clear_btn"),
+            (self.drag_hint, "drag_drop_hint"),
+            (self.use_custom_output, "custom_output_checkbox"),
+            (self.browse_output_btn, "browse_btn"),
+            (self.format_label, "convert_to_label"),
+            (self.quality_label, "quality_label"),
+            (self.auto_quality_check, "auto_quality_checkbox"),
+            (self.loudness_label, "loudness_label"),
+            (self.convert_btn, "convert_now_btn"),
+            (self.stop_btn, "stop_btn"),
+            (self.language_label, "language_label"),
+        ):
+            _set_label(control, t.get(key))
+        hint = t.get("output_folder_placeholder")
+        if self.output_folder_edit.GetHint() != hint:
+            self.output_folder_edit.SetHint(hint)
 
         ffmpeg_version = getattr(self, "_cached_ffmpeg_version", None)
         author = APP_AUTHOR_HE if self.translator.language == "he" else APP_AUTHOR
@@ -259,16 +339,33 @@ class UIBuilderMixin:
             footer_text += f"  |  FFmpeg: {t.get('ffmpeg_not_installed')}"
         if is_debug_mode():
             footer_text += "  |  DEBUG"
-        self.footer_label.SetLabel(footer_text)
+        _set_label(self.footer_label, footer_text)
 
         menu_bar = getattr(self, "_menu_bar", None)
         if menu_bar:
-            menu_bar.SetMenuLabel(0, t.get("menu_settings"))
-            self._debug_menu_item.SetItemLabel(t.get("menu_debug_mode"))
+            for position, key in ((0, "menu_settings"), (1, "menu_tools")):
+                if menu_bar.GetMenuLabel(position) != t.get(key):
+                    menu_bar.SetMenuLabel(position, t.get(key))
+            for item, key in (
+                (self._debug_menu_item, "menu_debug_mode"),
+                (self._naming_menu_item, "menu_output_naming"),
+                (self._staging_menu_item, "menu_stage_network_files"),
+                (self._cut_clips_menu_item, "menu_cut_clips"),
+                (self._join_files_menu_item, "menu_join_files"),
+                (self._ladder_menu_item, "menu_encode_ladder"),
+                (self._packaging_submenu_item, "menu_streaming_package"),
+            ):
+                _set_item_label(item, t.get(key))
+            for packaging, item in self._packaging_menu_items.items():
+                _set_item_label(item, t.get(f"packaging_{packaging.value if packaging else 'off'}"))
 
         if not self.is_converting:
             current_status = self.status_label.GetLabel()
             if current_status in ["", t.get("status_ready")]:
-                self.status_label.SetLabel(t.get("status_ready"))
+                _set_label(self.status_label, t.get("status_ready"))
 
-        self._update_quality_options()
+        # Choices are relabelled in place, so the current selections survive a language switch.
+        for index, key in enumerate(self._quality_keys):
+            _set_choice(self.quality_combo, index, t.get(f"quality_{key}"))
+        for index, name in enumerate(self._loudness_targets):
+            _set_choice(self.loudness_combo, index, self._loudness_label(name))
@@ -8,6 +8,7 @@ import subprocess
 import sys
 
 from cobalt_converter.constants import LANGUAGES
+from cobalt_converter.paths import get_base_path, get_bundled_path
 
 _debug_mode = False
 
@@ -16,12 +17,12 @@ def is_debug_mode() -> bool:
     return _debug_mode
 
 
-def set_debug_mode(debug: bool) -> None:
+def set_debug_mode(debug: bool, level: str = "INFO") -> None:
     global _debug_mode
     _debug_mode = debug
 
     root_logger = logging.getLogger()
-    new_level = logging.DEBUG if debug else logging.INFO
+    new_level = logging.DEBUG if debug else getattr(logging, level)
 
     root_logger.setLevel(new_level)
     for handler in root_logger.handlers:
@@ -55,22 +56,7 @@ def _flush_all_handlers() -> None:
         handler.flush()
 
 
-def get_base_path() -> str:
-    if getattr(sys, "frozen", False):
-        exe_dir = os.path.dirname(sys.executable)
-        if sys.platform == "darwin" and exe_dir.endswith(os.path.join("Contents", "MacOS")):
-            return os.path.dirname(os.path.dirname(os.path.dirname(exe_dir)))
-        return exe_dir
-    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-
-def get_bundled_path() -> str:
-    if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
-        return sys._MEIPASS
-    return get_base_path()
-
-
-def setup_logging(debug: bool = False) -> str:
+def setup_logging(debug: bool = False, level: str | None = None) -> str:
     global _debug_mode
     _debug_mode = debug
 
@@ -87,7 +73,7 @@ def setup_logging(debug: bool = False) -> str:
     except OSError:
         logging.debug("Failed to remove previous log file: %s", log_path)
 
-    level = config["debug_level"] if debug else config["default_level"]
+    level = config["debug_level"] if debug else level or config["default_level"]
 
     logging.basicConfig(
         filename=log_path,
@@ -0,0 +1,169 @@
+import http.client
+import json
+
+import pytest
+
+from cobalt_converter.api_server import ApiServer
+from cobalt_converter.events import EventBus, JobCancelled, JobProgress, JobQueued
+from cobalt_converter.jobs import JobJournal, JobStatus, next_id
+from cobalt_converter.metrics import EngineMetrics
+from cobalt_converter.quality_manager import QualityManager
+
+TOKEN = "s3cret"
+
+
+class _StubEngine:
+    def __init__(self):
+        self.journal = JobJournal()
+        self.events = EventBus()
+        self.metrics = EngineMetrics(self.events)
+        self.probe_index = None
+
+    def submit(self, jobs, deduplicate=None):
+        batch_id = next_id()
+        for job in jobs:
+            job.batch_id = batch_id
+            self.journal.add(job)
+            self.events.publish(JobQueued(job.id, batch_id, job.input_file, job.output_format))
+        return batch_id
+
+    def cancel(self, job_id):
+        job = self.journal.get(job_id)
+        if job is None or job.status.is_terminal:
+            return False
+        job.status = JobStatus.CANCELLED
+        self.events.publish(JobCancelled(job.id, job.input_file))
+        return True
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ApiServer(_StubEngine(), QualityManager(), port=0, token=TOKEN)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def api(server):
+    server.engine = _StubEngine()
+    return server
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"")
+    return str(path)
+
+
+def _request(api, method, path, body=None, token=TOKEN):
+    connection = http.client.HTTPConnection(*api.address, timeout=5)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    data = None
+    if body is not None:
+        data = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+    try:
+        connection.request(method, path, data, headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_submit_queues_jobs_and_reports_their_status(api, tmp_path, video):
+    status, body = _request(api, "POST", "/jobs", {"inputs": [video], "format": "mkv", "output_dir": str(tmp_path)})
+    assert status == 202
+    [job] = body["jobs"]
+    assert job["input_file"] == video and job["status"] == "queued"
+
+    status, body = _request(api, "GET", f"/jobs/{job['id']}")
+    assert status == 200 and body["batch_id"] == job["batch_id"]
+    status, body = _request(api, "GET", f"/jobs?batch={job['batch_id']}")
+    assert status == 200 and [j["id"] for j in body] == [job["id"]]
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        ({"inputs": [], "format": "mkv"}, "'inputs' must be a non-empty list of paths"),
+        ({"inputs": "a.mp4", "format": "mkv"}, "'inputs' must be a non-empty list of paths"),
+        ({"inputs": ["{video}"], "format": "nope"}, "Unsupported format: 'nope'"),
+        ({"inputs": ["{video}"], "format": "mkv", "kind": "remix"}, "Unknown job kind: 'remix'"),
+        ({"inputs": ["{video}"], "format": "mkv", "preset": "ultra"}, "Unknown preset: 'ultra'"),
+        ({"inputs": ["{video}"], "format": "mkv", "priority": "asap"}, "Unknown priority: 'asap'"),
+        ({"inputs": ["{video}"], "format": "mkv", "deduplicate": "yes"}, "'deduplicate' must be true or false"),
+        ({"inputs": ["{video}"], "format": "mkv", "kind": "concat"}, "Concatenation needs at least two inputs"),
+        ({"inputs": ["{video}"], "format": "mkv", "kind": "trim", "clips": []}, "Trim jobs need at least one clip"),
+        ({"inputs": ["{video}"], "format": "mkv", "audio_tracks": [1]}, "'audio_tracks' only applies to audio"),
+    ],
+)
+def test_submit_rejects_invalid_payloads(api, video, payload, message):
+    payload = json.loads(json.dumps(payload).replace("{video}", video))
+    status, body = _request(api, "POST", "/jobs", payload)
+    assert status == 400
+    assert body["error"].startswith(message)
+    assert api.engine.journal.all() == []
+
+
+def test_submit_lists_missing_and_incompatible_inputs(api, tmp_path, video):
+    missing = str(tmp_path / "gone.mp4")
+    status, body = _request(api, "POST", "/jobs", {"inputs": [video, missing], "format": "mkv"})
+    assert status == 400
+    assert body == {"error": "Input files not found", "details": [missing]}
+
+    status, body = _request(api, "POST", "/jobs", {"inputs": [video], "format": "png"})
+    assert status == 400
+    assert list(body["details"]) == [video]
+
+
+def test_invalid_json_is_a_bad_request(api):
+    connection = http.client.HTTPConnection(*api.address, timeout=5)
+    connection.request("POST", "/jobs", "{", {"Authorization": f"Bearer {TOKEN}"})
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read())["error"].startswith("Invalid JSON")
+    connection.close()
+
+
+def test_cancel_and_metrics(api, tmp_path, video):
+    _, body = _request(api, "POST", "/jobs", {"inputs": [video], "format": "mkv", "output_dir": str(tmp_path)})
+    job_id = body["jobs"][0]["id"]
+
+    status, body = _request(api, "POST", f"/jobs/{job_id}/cancel")
+    assert status == 200 and body["status"] == "cancelled"
+    status, body = _request(api, "DELETE", f"/jobs/{job_id}")
+    assert status == 409
+    status, _ = _request(api, "POST", "/jobs/999999/cancel")
+    assert status == 404
+
+    status, metrics = _request(api, "GET", "/metrics")
+    assert status == 200
+    assert metrics["jobs_queued"] == 1 and metrics["jobs_cancelled"] == 1 and metrics["jobs_running"] == 0
+
+
+def test_events_stream_engine_events(api):
+    connection = http.client.HTTPConnection(*api.address, timeout=5)
+    connection.request("GET", "/events?job=7", headers={"Authorization": f"Bearer {TOKEN}"})
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+
+    api.engine.events.publish(JobProgress(8, "encoding", "other job"))
+    api.engine.events.publish(JobProgress(7, "encoding", "Converting"))
+    assert response.fp.readline() == b"event: JobProgress\n"
+    data = json.loads(response.fp.readline().removeprefix(b"data: "))
+    assert data == {"type": "JobProgress", "job_id": 7, "stage": "encoding", "message": "Converting", "fraction": None}
+    connection.close()
+
+
+def test_requests_without_the_token_are_rejected(api):
+    assert _request(api, "GET", "/metrics", token=None)[0] == 401
+    assert _request(api, "GET", "/metrics", token="wrong")[0] == 401
+    assert _request(api, "GET", "/health", token=None) == (200, {"status": "ok"})
+
+
+def test_non_loopback_bind_needs_a_token():
+    with pytest.raises(ValueError, match="without an access token"):
+        ApiServer(_StubEngine(), QualityManager(), host="0.0.0.0", port=0)
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from cobalt_converter.cluster.coordinator import Coordinator
+from cobalt_converter.failures import FailureKind
+from cobalt_converter.jobs import ConversionJob, JobStatus
+from cobalt_converter.probe import ProbeIndex
+
+LEASE_SECONDS = 0.2
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    coordinator = Coordinator(lease_seconds=LEASE_SECONDS, heartbeat_seconds=0.05, max_attempts=2)
+    coordinator.probe_index = ProbeIndex(str(tmp_path / "probe_index.json"))
+    yield coordinator
+    coordinator.shutdown()
+
+
+@pytest.fixture
+def job(tmp_path):
+    source = tmp_path / "in.mp4"
+    source.write_bytes(b"video")
+    return ConversionJob(str(source), "mkv", str(tmp_path / "out"))
+
+
+def _register(coordinator, name):
+    return coordinator.register(name, 1)["worker_id"]
+
+
+def _wait_for(condition, *alive, coordinator=None, timeout=5.0):
+    # Workers listed in alive keep heartbeating without reporting any lease, like a node that lost its jobs.
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        for worker_id in alive:
+            coordinator.heartbeat(worker_id, {})
+        time.sleep(0.02)
+
+
+def test_an_expired_lease_moves_to_another_worker(coordinator, job):
+    first, second = _register(coordinator, "first"), _register(coordinator, "second")
+    coordinator.submit([job])
+    [lease] = coordinator.lease(first, 1)
+    assert job.status == JobStatus.RUNNING and job.attempts == 1
+
+    _wait_for(lambda: job.status == JobStatus.QUEUED, first, second, coordinator=coordinator)
+    [moved] = coordinator.lease(second, 1)
+    assert moved["job"]["output_file"] == lease["job"]["output_file"]
+    assert job.attempts == 2
+
+    # The first worker finishing late must not overwrite the new owner's result.
+    assert coordinator.complete(first, lease["lease_id"], {"status": "done"}) is False
+    assert coordinator.complete(second, moved["lease_id"], {"status": "done"}) is True
+    assert job.status == JobStatus.DONE
+
+
+def test_reap_drops_workers_that_stop_heartbeating(coordinator, job):
+    silent, healthy = _register(coordinator, "silent"), _register(coordinator, "healthy")
+    coordinator.submit([job])
+    [lease] = coordinator.lease(silent, 1)
+
+    _wait_for(lambda: len(coordinator.workers()) == 1, healthy, coordinator=coordinator)
+    assert [w["name"] for w in coordinator.workers()] == ["healthy"]
+    assert job.status == JobStatus.QUEUED
+    assert coordinator.heartbeat(silent, {}) is None
+    assert coordinator.complete(silent, lease["lease_id"], {"status": "done"}) is None
+
+
+def test_reap_keeps_leases_that_report_progress(coordinator, job):
+    worker = _register(coordinator, "busy")
+    coordinator.submit([job])
+    [lease] = coordinator.lease(worker, 1)
+
+    for _ in range(3):
+        time.sleep(LEASE_SECONDS / 2)
+        assert coordinator.heartbeat(worker, {lease["lease_id"]: 0.5}) == {"cancel": []}
+        coordinator._reap()
+    assert job.status == JobStatus.RUNNING and job.progress == 0.5
+    assert coordinator.complete(worker, lease["lease_id"], {"status": "done"}) is True
+
+
+def test_requeue_gives_up_after_max_attempts(coordinator, job):
+    worker = _register(coordinator, "flaky")
+    coordinator.submit([job])
+    for attempt in (1, 2):
+        assert len(coordinator.lease(worker, 1)) == 1
+        assert job.attempts == attempt
+        _wait_for(lambda: job.status != JobStatus.RUNNING, worker, coordinator=coordinator)
+
+    assert job.status == JobStatus.FAILED
+    assert job.failure.kind == FailureKind.KILLED
+    assert job.error == "lease on flaky expired after 2 attempt(s)"
+    assert coordinator.lease(worker, 1) == []
+    assert coordinator.failed_jobs() == [job]
+
+
+def test_heartbeat_tells_the_worker_to_cancel(coordinator, job):
+    worker = _register(coordinator, "node")
+    coordinator.submit([job])
+    [lease] = coordinator.lease(worker, 1)
+
+    assert coordinator.cancel(job.id) is True
+    assert coordinator.heartbeat(worker, {lease["lease_id"]: 0.3}) == {"cancel": [lease["lease_id"]]}
+    assert coordinator.complete(worker, lease["lease_id"], {"status": "cancelled"}) is True
+    assert job.status == JobStatus.CANCELLED
+    metrics = coordinator.metrics.snapshot()
+    assert metrics["jobs_cancelled"] == 1 and metrics["jobs_running"] == 0
+
+
+def test_a_job_the_worker_gives_back_is_requeued(coordinator, job):
+    worker = _register(coordinator, "stopping")
+    coordinator.submit([job])
+    [lease] = coordinator.lease(worker, 1)
+
+    assert coordinator.complete(worker, lease["lease_id"], {"status": "cancelled"}) is True
+    assert job.status == JobStatus.QUEUED
+    assert coordinator.queue_position(job.id) == 0
@@ -0,0 +1,82 @@
+import copy
+
+import pytest
+
+from cobalt_converter import constants
+from cobalt_converter.config_schemas import SETTINGS_SCHEMA
+from cobalt_converter.config_store import deep_merge, validate
+from cobalt_converter.exceptions import ConfigValidationError
+
+SCHEMA = {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": {"type": "string"},
+        "level": {"type": "string", "enum": ["low", "high"]},
+        "count": {"type": "integer", "minimum": 1},
+        "flags": {"type": "array", "items": {"type": "string"}},
+    },
+    "values": {"type": "number"},
+}
+
+
+def test_validate_accepts_matching_data():
+    validate({"name": "x", "level": "low", "count": 2, "flags": ["-c:v"], "extra": 1.5}, SCHEMA)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ([], "$: expected object"),
+        ({}, "missing required key 'name'"),
+        ({"name": 1}, "$.name: expected string"),
+        ({"name": "x", "level": "medium"}, "$.level: 'medium' is not one of"),
+        ({"name": "x", "count": 0}, "$.count: 0 is less than 1"),
+        ({"name": "x", "count": True}, "$.count: expected integer"),
+        ({"name": "x", "flags": ["-c:v", 2]}, "$.flags[1]: expected string"),
+        ({"name": "x", "extra": "fast"}, "$.extra: expected number"),
+    ],
+)
+def test_validate_reports_the_failing_path(data, message):
+    with pytest.raises(ConfigValidationError, match=message.replace("$", r"\$").replace("[", r"\[")):
+        validate(data, SCHEMA)
+
+
+def test_settings_schema_rejects_unknown_log_level():
+    with pytest.raises(ConfigValidationError):
+        validate("VERBOSE", SETTINGS_SCHEMA["properties"]["log_level"])
+
+
+def test_deep_merge_merges_nested_objects():
+    base = {"presets": {"low": {"crf": 28}, "high": {"crf": 18}}, "order": ["low", "high"]}
+    merged = deep_merge(base, {"presets": {"low": {"crf": 30, "speed": "fast"}}, "order": ["high"]})
+    assert merged == {"presets": {"low": {"crf": 30, "speed": "fast"}, "high": {"crf": 18}}, "order": ["high"]}
+
+
+def test_deep_merge_leaves_its_inputs_untouched():
+    base = {"a": {"b": 1}}
+    override = {"a": {"c": [1, 2]}}
+    merged = deep_merge(base, override)
+    merged["a"]["c"].append(3)
+    assert base == {"a": {"b": 1}}
+    assert override == {"a": {"c": [1, 2]}}
+
+
+def test_deep_merge_replaces_objects_with_other_types():
+    assert deep_merge({"a": {"b": 1}}, {"a": None}) == {"a": None}
+
+
+def test_reload_drops_removed_languages_and_formats():
+    original = copy.deepcopy(constants._STORE.data)
+    changed = copy.deepcopy(original)
+    removed_language = next(iter(changed["languages"]))
+    del changed["languages"][removed_language]
+    removed_format = changed["audio"].pop()
+    try:
+        constants._on_formats_changed(changed)
+        assert removed_language not in constants.LANGUAGES
+        assert constants.get_format_type(removed_format) != "audio"
+    finally:
+        constants._on_formats_changed(original)
+    assert removed_language in constants.LANGUAGES
+    assert constants.get_format_type(removed_format) == "audio"
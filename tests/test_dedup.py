@@ -0,0 +1,66 @@
+import random
+
+from cobalt_converter.dedup import ContentSignature, full_hash, quick_hash
+
+_rng = random.Random(45)
+# Detailed difference hashes: about half the bits set.
+FRAMES = tuple(_rng.getrandbits(64) | 0xFF00 for _ in range(5))
+AUDIO = "".join(_rng.choice("01") for _ in range(480))
+
+
+def _flip(value: int, bits: int) -> int:
+    return value ^ ((1 << bits) - 1)
+
+
+def _vary(fingerprint: str, changes: int) -> str:
+    return "".join(("1" if c == "0" else "0") if i < changes else c for i, c in enumerate(fingerprint))
+
+
+def test_re_encode_of_the_same_recording_matches():
+    reencoded = ContentSignature(tuple(_flip(f, 4) for f in FRAMES), _vary(AUDIO, 30))
+    assert ContentSignature(FRAMES, AUDIO).matches(reencoded)
+
+
+def test_different_frames_do_not_match():
+    assert not ContentSignature(FRAMES, AUDIO).matches(ContentSignature(tuple(_flip(f, 20) for f in FRAMES), AUDIO))
+
+
+def test_every_shared_stream_must_agree():
+    other_audio = "".join("1" if c == "0" else "0" for c in AUDIO)
+    assert not ContentSignature(FRAMES, AUDIO).matches(ContentSignature(FRAMES, other_audio))
+
+
+def test_stream_presence_must_agree():
+    assert not ContentSignature(FRAMES, AUDIO).matches(ContentSignature(FRAMES, None))
+    assert not ContentSignature(None, AUDIO).matches(ContentSignature(FRAMES, AUDIO))
+    assert not ContentSignature().matches(ContentSignature())
+
+
+def test_flat_frames_are_not_evidence():
+    black = (0,) * 5
+    assert not ContentSignature(black, None).matches(ContentSignature(black, None))
+    assert ContentSignature(FRAMES, None).matches(ContentSignature(FRAMES, None))
+
+
+def test_failed_samples_never_match():
+    assert not ContentSignature((), None).matches(ContentSignature((), None))
+    assert not ContentSignature(None, "").matches(ContentSignature(None, ""))
+
+
+def test_silence_is_not_evidence():
+    silence = "0" * 480
+    assert not ContentSignature(None, silence).matches(ContentSignature(None, silence))
+    assert ContentSignature(None, AUDIO).matches(ContentSignature(None, AUDIO))
+
+
+def test_short_audio_is_not_evidence():
+    assert not ContentSignature(None, AUDIO[:20]).matches(ContentSignature(None, AUDIO[:20]))
+
+
+def test_hashes_tell_files_apart(tmp_path):
+    a, b, c = tmp_path / "a", tmp_path / "b", tmp_path / "c"
+    a.write_bytes(b"x" * 5000)
+    b.write_bytes(b"x" * 5000)
+    c.write_bytes(b"x" * 4999 + b"y")
+    assert quick_hash(str(a)) == quick_hash(str(b)) != quick_hash(str(c))
+    assert full_hash(str(a)) == full_hash(str(b)) != full_hash(str(c))
@@ -0,0 +1,66 @@
+import io
+import os
+
+import pytest
+
+from cobalt_converter.edits import Clip, clip_label, find_keyframes, keyframe_at, parse_timecode, read_clip_list
+from cobalt_converter.supervisor import ProcessResult
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [(90, 90.0), (1.5, 1.5), ("42", 42.0), ("1:30", 90.0), ("01:02:03.5", 3723.5), (" 0:05 ", 5.0)],
+)
+def test_parse_timecode(value, seconds):
+    assert parse_timecode(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "abc", "1:2:3:4", "-5", -1, "nan", "inf", True])
+def test_parse_timecode_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_timecode(value)
+
+
+def test_read_clip_list():
+    stream = io.StringIO("Start,End,Name,Input\n0:10,0:20,Intro,a.mp4\n\n1:00,,,/abs/b.mp4\n")
+    assert read_clip_list(stream, "/base") == [
+        Clip(10.0, 20.0, "Intro", os.path.join("/base", "a.mp4")),
+        Clip(60.0, None, None, "/abs/b.mp4"),
+    ]
+
+
+def test_read_clip_list_needs_a_start_column():
+    with pytest.raises(ValueError, match="'start' column"):
+        read_clip_list(io.StringIO("end,name\n10,x\n"))
+
+
+def test_read_clip_list_reports_the_bad_row():
+    with pytest.raises(ValueError, match="Row 3"):
+        read_clip_list(io.StringIO("start,end\n0,10\n20,15\n"))
+
+
+def test_empty_clip_list():
+    assert read_clip_list(io.StringIO("")) == []
+
+
+def test_clip_label():
+    assert clip_label("/in/talk.mp4", Clip(0, 10, 'Q&A: part 1/2'), 1) == "Q&A_ part 1_2"
+    assert clip_label("/in/talk.mp4", Clip(0, 10), 7) == "talk_clip007"
+    assert clip_label("/in/talk.mp4", Clip(0, 10, " .. "), 2) == "talk_clip002"
+
+
+def test_keyframe_at_allows_a_small_tolerance():
+    times = [0.0, 2.0, 4.0]
+    assert keyframe_at(times, 2.0) == 2.0
+    assert keyframe_at(times, 2.03) == 2.0
+    assert keyframe_at(times, 1.97) == 2.0
+    assert keyframe_at(times, 3.0) is None
+
+
+def test_find_keyframes_parses_showinfo_output():
+    output = ["[Parsed_showinfo_0] n:1 pts:50 pts_time:2.0 ", "[Parsed_showinfo_0] n:0 pts:0 pts_time:0 "]
+    assert find_keyframes("ffmpeg", "in.mp4", lambda cmd, timeout: ProcessResult(0, output=output)) == [0.0, 2.0]
+
+
+def test_find_keyframes_gives_up_when_the_scan_is_stopped():
+    assert find_keyframes("ffmpeg", "in.mp4", lambda cmd, timeout: ProcessResult(None, "cancelled")) is None
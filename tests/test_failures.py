@@ -0,0 +1,91 @@
+import signal
+
+import pytest
+
+from cobalt_converter.failures import FailureKind, RetryPolicy, classify_failure
+from cobalt_converter.supervisor import ProcessResult
+
+
+@pytest.mark.parametrize(
+    "line, kind",
+    [
+        ("out.mp4: No space left on device", FailureKind.DISK_FULL),
+        ("Error: Cannot allocate memory", FailureKind.OUT_OF_MEMORY),
+        ("in.mkv: No such file or directory", FailureKind.MISSING_INPUT),
+        ("out.mp4: Permission denied", FailureKind.PERMISSION_DENIED),
+        ("Unknown encoder 'libfoo'", FailureKind.UNSUPPORTED_CODEC),
+        ("in.mp4: moov atom not found", FailureKind.CORRUPT_INPUT),
+        ("Conversion failed!", FailureKind.UNKNOWN),
+    ],
+)
+def test_classifies_ffmpeg_errors(line, kind):
+    failure = classify_failure(ProcessResult(1, tail=["frame= 10 time=00:00:01.00", line]))
+    assert failure.kind == kind
+    assert failure.detail == line
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "[mp4 @ 0x55] Starting second pass: moving the moov atom to the beginning of the file",
+        "[libx264 @ 0x55] frame corrupt, skipping",
+        "[matroska @ 0x55] Truncated file name in attachment",
+        "[aac @ 0x55] End of file reached while flushing",
+        "[mp3 @ 0x55] Estimating duration from bitrate, this may be inaccurate",
+    ],
+)
+def test_muxer_and_encoder_warnings_are_not_corrupt_input(line):
+    assert classify_failure(ProcessResult(1, tail=[line])).kind == FailureKind.UNKNOWN
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "[h264 @ 0x55] error while decoding MB 12 30, bytestream -5",
+        "[hevc @ 0x55] corrupt decoded frame in stream 0",
+        "[mov,mp4,m4a,3gp,3g2,mj2 @ 0x55] stream 1, offset 0x2f11: partial file",
+        "[matroska,webm @ 0x55] EBML header parsing failed",
+    ],
+)
+def test_demuxer_and_decoder_errors_are_corrupt_input(line):
+    assert classify_failure(ProcessResult(1, tail=[line])).kind == FailureKind.CORRUPT_INPUT
+
+
+def test_newest_error_wins():
+    tail = ["in.mkv: Invalid data found when processing input", "out.mp4: No space left on device"]
+    assert classify_failure(ProcessResult(1, tail=tail)).kind == FailureKind.DISK_FULL
+
+
+def test_progress_lines_are_not_the_detail():
+    failure = classify_failure(ProcessResult(1, tail=["Conversion failed!", "frame= 10 time=00:00:01.00"]))
+    assert failure.detail == "Conversion failed!"
+
+
+@pytest.mark.parametrize("reason, kind", [("stalled", FailureKind.STALLED), ("timeout", FailureKind.TIMEOUT)])
+def test_supervisor_stops(reason, kind):
+    assert classify_failure(ProcessResult(None, reason)).kind == kind
+
+
+def test_signals():
+    assert classify_failure(ProcessResult(-signal.SIGKILL)).kind == FailureKind.KILLED
+    assert classify_failure(ProcessResult(-signal.SIGSEGV)).kind == FailureKind.UNKNOWN
+
+
+def test_signal_under_a_memory_limit_is_out_of_memory():
+    failure = classify_failure(ProcessResult(-signal.SIGABRT, memory_limit=512 * 1024 * 1024))
+    assert failure.kind == FailureKind.OUT_OF_MEMORY
+    assert "512 MiB" in failure.reason
+
+
+def test_only_transient_failures_are_retried():
+    policy = RetryPolicy(max_retries=2)
+    disk_full = classify_failure(ProcessResult(1, tail=["No space left on device"]))
+    corrupt = classify_failure(ProcessResult(1, tail=["moov atom not found"]))
+    assert policy.should_retry(disk_full, 1)
+    assert not policy.should_retry(disk_full, 2)
+    assert not policy.should_retry(corrupt, 0)
+
+
+def test_retry_delay_backs_off_up_to_the_cap():
+    policy = RetryPolicy(base_delay=2.0, max_delay=10.0)
+    assert [policy.delay(n) for n in range(4)] == [2.0, 4.0, 8.0, 10.0]
@@ -0,0 +1,105 @@
+import pytest
+
+from cobalt_converter import gif
+from cobalt_converter.gif import MAX_FPS, GifSettings, one_pass_buffer, plan_gif
+from cobalt_converter.jobs import ConversionJob
+from cobalt_converter.probe import MediaInfo, StreamInfo
+from cobalt_converter.supervisor import ProcessResult
+
+
+def _video(duration, fps=30.0, width=1920, height=1080):
+    return MediaInfo(duration, streams=(StreamInfo(0, "video", "h264", width=width, height=height, fps=fps),))
+
+
+class _Probes:
+    def __init__(self, info):
+        self.info = info
+
+    def probe(self, ffmpeg_path, input_file):
+        return self.info
+
+
+@pytest.fixture(autouse=True)
+def palettes(tmp_path, monkeypatch):
+    monkeypatch.setattr(gif, "palette_dir", lambda: str(tmp_path / "palettes"))
+
+
+@pytest.fixture
+def job(tmp_path):
+    source = tmp_path / "in.mp4"
+    source.write_bytes(b"video")
+    return ConversionJob(str(source), "gif", str(tmp_path), ["-gif_fps", "10", "-gif_width", "480", "-loop", "0"])
+
+
+def test_from_flags_reads_gif_options_and_returns_the_rest():
+    flags = [
+        "-gif_fps", "12", "-gif_width", "480", "-gif_colors", "999",
+        "-gif_dither", "bayer:bayer_scale=3", "-gif_stats", "diff", "-loop", "0",
+    ]
+    settings, rest = GifSettings.from_flags(flags)
+    assert settings == GifSettings(
+        fps=12.0, width=480, colors=256, dither="bayer:bayer_scale=3", stats_mode="diff",
+    )
+    assert rest == ["-loop", "0"]
+    assert settings.paletteuse() == "paletteuse=dither=bayer:bayer_scale=3:diff_mode=rectangle"
+
+
+def test_from_flags_falls_back_to_generic_rate_flags():
+    settings, rest = GifSettings.from_flags(["-r", "20", "-fpsmax", "15", "-vf", "crop=100:100"])
+    assert (settings.fps, settings.max_fps, settings.scale_filter, rest) == (20.0, 15.0, "crop=100:100", [])
+    assert settings.output_fps(None) == 15.0
+
+
+@pytest.mark.parametrize("flags", [["-gif_dither", "random"], ["-gif_stats", "partial"]])
+def test_from_flags_rejects_unknown_modes(flags):
+    with pytest.raises(ValueError, match="Unknown GIF"):
+        GifSettings.from_flags(flags)
+
+
+def test_source_filters_skip_a_matching_frame_rate():
+    info = _video(5.0, fps=60.0)
+    assert GifSettings().source_filters(info) == f"fps={MAX_FPS:g}"
+    assert GifSettings().source_filters(_video(5.0, fps=25.0)) == "null"
+    assert GifSettings(fps=10, width=320).source_filters(info) == "fps=10,scale=w='min(iw,320)':h=-2:flags=lanczos"
+
+
+def test_one_pass_buffer_counts_scaled_rgba_frames():
+    settings = GifSettings(fps=10, width=960)
+    assert one_pass_buffer(_video(2.0), settings, 2.0) == 2 * 10 * 960 * 540 * 4
+    assert one_pass_buffer(None, settings, 2.0) is None
+
+
+def test_short_clips_generate_the_palette_in_the_same_pass(job):
+    calls = []
+    plan = plan_gif("ffmpeg", job, job.input_file, _Probes(_video(3.0)), lambda cmd, timeout: calls.append(cmd))
+    assert calls == []
+    graph = plan.output_args[1]
+    assert "palettegen=max_colors=256:stats_mode=full,split[p][keep]" in graph
+    assert plan.output_args[-2:] == ("-loop", "0")
+    assert plan.duration == 3.0
+
+
+def test_long_clips_use_a_separate_palette_pass_and_reuse_it(job):
+    calls = []
+
+    def run(cmd, timeout):
+        calls.append(cmd)
+        with open(cmd[-1], "wb") as f:
+            f.write(b"png")
+        return ProcessResult(0)
+
+    probes = _Probes(_video(600.0))
+    first = plan_gif("ffmpeg", job, job.input_file, probes, run)
+    second = plan_gif("ffmpeg", job, job.input_file, probes, run)
+    assert len(calls) == 1
+    assert first == second
+    palette = first.input_args[-1]
+    assert palette.endswith(".png") and first.input_args[-2] == "-i"
+    assert first.output_args[1] == (
+        "[0:v:0]fps=10,scale=w='min(iw,480)':h=-2:flags=lanczos[x];[x][1:v]paletteuse=dither=sierra2_4a[out]"
+    )
+
+
+def test_gif_needs_a_video_stream(job):
+    with pytest.raises(ValueError, match="no video stream"):
+        plan_gif("ffmpeg", job, job.input_file, _Probes(MediaInfo(5.0)), None)
@@ -0,0 +1,44 @@
+import collections
+
+from cobalt_converter.jobs import ConversionJob, JobPriority, enqueue_by_priority, move_in_queue
+
+
+def _job(name, priority=JobPriority.NORMAL):
+    return ConversionJob(f"/in/{name}.mp4", "mkv", priority=priority)
+
+
+def _names(queue):
+    return [job.filename.removesuffix(".mp4") for job in queue]
+
+
+def test_higher_priorities_go_first_and_equal_ones_keep_their_order():
+    queue = collections.deque()
+    for name, priority in [("a", "normal"), ("b", "low"), ("c", "urgent"), ("d", "normal"), ("e", "high")]:
+        enqueue_by_priority(queue, _job(name, JobPriority(priority)))
+    assert _names(queue) == ["c", "e", "a", "d", "b"]
+
+
+def test_ahead_puts_a_job_before_its_peers():
+    queue = collections.deque()
+    for job in (_job("a", JobPriority.HIGH), _job("b"), _job("c")):
+        enqueue_by_priority(queue, job)
+    enqueue_by_priority(queue, _job("lost"), ahead=True)
+    assert _names(queue) == ["a", "lost", "b", "c"]
+
+
+def test_move_in_queue_clamps_the_position():
+    jobs = [_job(name) for name in "abcd"]
+    queue = collections.deque(jobs)
+    move_in_queue(queue, jobs[3], 1)
+    assert _names(queue) == ["a", "d", "b", "c"]
+    move_in_queue(queue, jobs[0], 99)
+    assert _names(queue) == ["d", "b", "c", "a"]
+    move_in_queue(queue, jobs[0], -5)
+    assert _names(queue) == ["a", "d", "b", "c"]
+
+
+def test_retry_copy_keeps_the_priority():
+    job = _job("a", JobPriority.URGENT)
+    retry = job.copy_for_retry()
+    assert retry.priority == JobPriority.URGENT
+    assert retry.id != job.id
@@ -0,0 +1,108 @@
+import pytest
+
+from cobalt_converter.loudness import LoudnessNormalizer, merge_audio_filter, parse_loudnorm_output
+from cobalt_converter.probe import MediaInfo, ProbeIndex, StreamInfo
+from cobalt_converter.supervisor import ProcessResult
+
+TARGET = {"integrated": -16, "true_peak": -1.5, "range": 11}
+
+
+def _report(integrated="-20.5"):
+    return [
+        "[Parsed_loudnorm_0 @ 0x5581] ",
+        "{",
+        f'\t"input_i" : "{integrated}",',
+        '\t"input_tp" : "-3.10",',
+        '\t"input_lra" : "6.20",',
+        '\t"input_thresh" : "-31.00",',
+        '\t"output_i" : "-16.02",',
+        '\t"target_offset" : "0.40"',
+        "}",
+    ]
+
+
+def test_parse_loudnorm_output():
+    assert parse_loudnorm_output("\n".join(["frame= 1", *_report()])) == {
+        "input_i": -20.5, "input_tp": -3.1, "input_lra": 6.2, "input_thresh": -31.0, "target_offset": 0.4,
+    }
+
+
+@pytest.mark.parametrize("text", ["", "no report here", "\n".join(_report("-inf")), "[Parsed_loudnorm_0] {bad json}"])
+def test_parse_loudnorm_output_rejects_unusable_reports(text):
+    assert parse_loudnorm_output(text) is None
+
+
+def test_merge_audio_filter():
+    assert merge_audio_filter(["-b:a", "128k"], "loudnorm") == ["-b:a", "128k", "-af", "loudnorm"]
+    assert merge_audio_filter(["-af", "highpass=f=80"], "loudnorm") == ["-af", "highpass=f=80,loudnorm"]
+    assert merge_audio_filter(["-filter:a", "volume=2"], "loudnorm") == ["-filter:a", "volume=2,loudnorm"]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "talk.mkv"
+    path.write_bytes(b"data")
+    index = ProbeIndex(str(tmp_path / "index.json"))
+    streams = (
+        StreamInfo(0, "video", "h264"),
+        StreamInfo(1, "audio", "aac", sample_rate=48000),
+        StreamInfo(2, "audio", "ac3", sample_rate=44100),
+    )
+    index.set(str(path), "media", MediaInfo(10.0, streams=streams).to_dict())
+    return str(path), index
+
+
+class _Runner:
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, cmd, timeout):
+        self.commands.append(cmd)
+        return ProcessResult(0, output=_report())
+
+
+def test_single_track_is_normalized_with_one_audio_filter(source):
+    path, index = source
+    run = _Runner()
+    flags = LoudnessNormalizer("podcast", TARGET, index).encode_flags("ffmpeg", path, ["-b:a", "128k"], run)
+    assert run.commands[0][run.commands[0].index("-map") + 1] == "0:a:0"
+    assert flags[:3] == ["-b:a", "128k", "-af"]
+    assert "measured_I=-20.50" in flags[3]
+    assert flags[3].endswith(",aresample=48000")
+
+
+def test_each_track_gets_its_own_measurement(source):
+    path, index = source
+    run = _Runner()
+    normalizer = LoudnessNormalizer("podcast", TARGET, index)
+    flags = normalizer.encode_flags("ffmpeg", path, ["-af", "highpass=f=80"], run, (0, 1))
+    assert [cmd[cmd.index("-map") + 1] for cmd in run.commands] == ["0:a:0", "0:a:1"]
+    assert flags[:2] == ["-af", "highpass=f=80"]
+    assert flags[2] == "-filter:a:0" and flags[4] == "-filter:a:1"
+    assert flags[3].startswith("highpass=f=80,loudnorm=") and flags[3].endswith("aresample=48000")
+    assert flags[5].startswith("highpass=f=80,loudnorm=") and flags[5].endswith("aresample=44100")
+
+
+def test_measurements_are_cached_per_track(source):
+    path, index = source
+    run = _Runner()
+    normalizer = LoudnessNormalizer("podcast", TARGET, index)
+    normalizer.encode_flags("ffmpeg", path, [], run, (0, 1))
+    normalizer.encode_flags("ffmpeg", path, [], run, (1,))
+    assert len(run.commands) == 2
+
+
+def test_explicit_sample_rate_is_kept(source):
+    path, index = source
+    flags = LoudnessNormalizer("podcast", TARGET, index).encode_flags("ffmpeg", path, ["-ar", "22050"], _Runner())
+    assert "aresample" not in flags[-1]
+
+
+def test_failed_measurement_leaves_flags_unchanged(source):
+    path, index = source
+    normalizer = LoudnessNormalizer("podcast", TARGET, index)
+    assert normalizer.encode_flags("ffmpeg", path, ["-b:a", "128k"], lambda cmd, timeout: ProcessResult(1)) == [
+        "-b:a", "128k",
+    ]
+    cancelled = normalizer.encode_flags("ffmpeg", path, [], lambda cmd, timeout: ProcessResult(None, "cancelled"))
+    assert cancelled == []
@@ -0,0 +1,82 @@
+import pytest
+
+from cobalt_converter import memory
+from cobalt_converter.memory import (
+    AUDIO_JOB_BYTES, MIB, MemoryBudget, ProcessMemoryLimiter, estimate_job_memory, parse_memory_size, process_limit,
+)
+from cobalt_converter.probe import MediaInfo, StreamInfo
+
+
+def test_reservations_stay_within_the_budget():
+    budget = MemoryBudget(1000)
+    assert budget.reserve("a", 600)
+    assert not budget.reserve("b", 500)
+    assert budget.reserve("c", 400)
+    assert budget.reserved() == 1000
+    budget.release("a")
+    assert budget.reserve("b", 500)
+
+
+def test_a_job_larger_than_the_budget_runs_alone():
+    budget = MemoryBudget(1000)
+    assert budget.reserve("big", 5000)
+    assert not budget.reserve("small", 1)
+    budget.release("big")
+    assert budget.reserve("small", 1)
+
+
+def test_idle_jobs_do_not_count():
+    budget = MemoryBudget(1000)
+    assert budget.reserve("paused", 800)
+    assert budget.reserved(idle=["paused"]) == 0
+    assert budget.reserve("next", 800, idle=["paused"])
+    assert budget.reserved() == 1600
+
+
+def test_no_budget_admits_everything():
+    budget = MemoryBudget(None)
+    assert all(budget.reserve(n, 10**12) for n in range(5))
+
+
+def test_release_of_an_unknown_key_is_ignored():
+    MemoryBudget(1000).release("missing")
+
+
+@pytest.mark.parametrize(
+    "text, size",
+    [("512M", 512 * MIB), ("1.5g", 1536 * MIB), ("2GiB", 2048 * MIB), ("100", 100), ("50%", 500), ("off", None)],
+)
+def test_parse_memory_size(text, size):
+    assert parse_memory_size(text, total=1000) == size
+
+
+@pytest.mark.parametrize("text, total", [("lots", 1000), ("-1G", 1000), ("50%", None)])
+def test_parse_memory_size_rejects_invalid_sizes(text, total):
+    with pytest.raises(ValueError):
+        parse_memory_size(text, total)
+
+
+def test_from_setting():
+    assert MemoryBudget.from_setting("off").total is None
+    assert MemoryBudget.from_setting("256M").total == 256 * MIB
+
+
+def test_job_estimates_grow_with_resolution_and_threads():
+    small = MediaInfo(streams=(StreamInfo(0, "video", "h264", width=640, height=360),))
+    large = MediaInfo(streams=(StreamInfo(0, "video", "h264", width=3840, height=2160),))
+    assert estimate_job_memory("mp4", [], small, threads=4) < estimate_job_memory("mp4", [], large, threads=4)
+    assert estimate_job_memory("mp4", [], large, threads=2) < estimate_job_memory("mp4", [], large, threads=16)
+    assert estimate_job_memory("mp3", [], large) == AUDIO_JOB_BYTES
+    assert process_limit(100 * MIB) > 100 * MIB
+
+
+@pytest.mark.skipif(memory.resource is None, reason="RLIMIT_AS needs the resource module")
+def test_address_space_limit_grows_with_job_threads(monkeypatch):
+    limits = []
+    monkeypatch.setattr(memory, "_delegated_cgroup", lambda: None)
+    monkeypatch.setattr(memory, "_rlimit_setter", lambda limit: limits.append(limit) or (lambda: None))
+    limiter = ProcessMemoryLimiter()
+    assert "preexec_fn" in limiter.prepare("a", 256 * MIB, threads=2)
+    limiter.prepare("b", 256 * MIB, threads=8)
+    assert limits[1] - limits[0] == 6 * memory._ADDRESS_SPACE_PER_THREAD
+    assert limits[0] > 256 * MIB
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from cobalt_converter.jobs import ConversionJob
+from cobalt_converter.naming import MIRROR_NAME_TEMPLATE, CollisionPolicy, OutputNamer, source_fingerprint
+
+
+def _job(tmp_path, name="clip.mov", **kwargs):
+    source = tmp_path / "in" / name
+    source.parent.mkdir(parents=True, exist_ok=True)
+    source.write_bytes(b"data")
+    return ConversionJob(str(source), "mp4", str(tmp_path / "out"), **kwargs)
+
+
+def _existing(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"old")
+
+
+def test_free_name_is_claimed(tmp_path):
+    path, skip = OutputNamer().claim(_job(tmp_path))
+    assert (path, skip) == (str(tmp_path / "out" / "clip.mp4"), False)
+
+
+def test_skip_policy_skips_existing_output(tmp_path):
+    job = _job(tmp_path)
+    _existing(str(tmp_path / "out" / "clip.mp4"))
+    assert OutputNamer(policy=CollisionPolicy.SKIP).claim(job) == (str(tmp_path / "out" / "clip.mp4"), True)
+
+
+def test_overwrite_policy_reuses_existing_name(tmp_path):
+    job = _job(tmp_path)
+    _existing(str(tmp_path / "out" / "clip.mp4"))
+    assert OutputNamer(policy=CollisionPolicy.OVERWRITE).claim(job) == (str(tmp_path / "out" / "clip.mp4"), False)
+
+
+def test_suffix_policy_finds_next_free_name(tmp_path):
+    job = _job(tmp_path)
+    _existing(str(tmp_path / "out" / "clip.mp4"))
+    _existing(str(tmp_path / "out" / "clip (1).mp4"))
+    assert OutputNamer(policy=CollisionPolicy.SUFFIX).claim(job) == (str(tmp_path / "out" / "clip (2).mp4"), False)
+
+
+def test_verify_policy_skips_only_outputs_of_the_same_source(tmp_path):
+    job = _job(tmp_path)
+    existing = str(tmp_path / "out" / "clip.mp4")
+    _existing(existing)
+    namer = OutputNamer(policy=CollisionPolicy.VERIFY)
+    assert namer.claim(job, origin=lambda path: source_fingerprint(job)) == (existing, True)
+    other = _job(tmp_path)
+    assert namer.claim(other, origin=lambda path: "another source") == (str(tmp_path / "out" / "clip (1).mp4"), False)
+
+
+def test_jobs_in_one_batch_never_share_a_name(tmp_path):
+    namer = OutputNamer(policy=CollisionPolicy.OVERWRITE)
+    first, _ = namer.claim(_job(tmp_path))
+    second, _ = namer.claim(_job(tmp_path))
+    assert first != second
+    assert namer.claim(_job(tmp_path))[0] == str(tmp_path / "out" / "clip (2).mp4")
+
+
+def test_released_name_can_be_claimed_again(tmp_path):
+    namer = OutputNamer()
+    job = _job(tmp_path)
+    path, _ = namer.claim(job)
+    assert namer.claim(job) == (path, False)
+    namer.release(job.id)
+    assert namer.claim(_job(tmp_path)) == (path, False)
+
+
+def test_job_policy_overrides_the_namer(tmp_path):
+    job = _job(tmp_path, collision=CollisionPolicy.SUFFIX.value)
+    _existing(str(tmp_path / "out" / "clip.mp4"))
+    assert OutputNamer(policy=CollisionPolicy.SKIP).claim(job) == (str(tmp_path / "out" / "clip (1).mp4"), False)
+
+
+def test_mirror_template_keeps_the_relative_folder(tmp_path):
+    job = _job(tmp_path, name=os.path.join("season1", "ep1.mkv"), name_template=MIRROR_NAME_TEMPLATE)
+    job.source_root = str(tmp_path / "in")
+    assert OutputNamer().claim(job)[0] == str(tmp_path / "out" / "season1" / "ep1.mp4")
+
+
+def test_template_cannot_escape_the_output_folder(tmp_path):
+    job = _job(tmp_path, name_template="../../{stem}")
+    assert OutputNamer().render(job) == str(tmp_path / "out" / "clip.mp4")
+
+
+def test_dimensions_are_looked_up_only_when_the_template_needs_them(tmp_path):
+    calls = []
+
+    def dimensions(path):
+        calls.append(path)
+        return 1920, 1080
+
+    namer = OutputNamer(template="{stem}_{height}p")
+    assert namer.claim(_job(tmp_path), dimensions=dimensions)[0] == str(tmp_path / "out" / "clip_1080p.mp4")
+    OutputNamer().claim(_job(tmp_path, name="other.mov"), dimensions=dimensions)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("template", ["", "{name}", "{stem:>10}", "{stem!r}"])
+def test_invalid_templates_are_rejected(template):
+    with pytest.raises(ValueError):
+        OutputNamer(template=template)
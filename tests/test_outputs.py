@@ -0,0 +1,49 @@
+import os
+
+from cobalt_converter.outputs import commit_output, discard_output, estimate_output_size, partial_path
+
+
+def test_partial_path_is_a_hidden_sibling():
+    assert partial_path(os.path.join("out", "movie.mkv")) == os.path.join("out", ".movie.partial.mkv")
+    assert partial_path(os.path.join("out", "movie_hls")) == os.path.join("out", ".movie_hls.partial")
+
+
+def test_commit_output_replaces_the_final_file(tmp_path):
+    final = tmp_path / "movie.mkv"
+    final.write_text("old")
+    partial = tmp_path / ".movie.partial.mkv"
+    partial.write_text("new")
+
+    commit_output(str(partial), str(final))
+    assert final.read_text() == "new"
+    assert not partial.exists()
+
+
+def test_commit_output_swaps_in_a_whole_directory(tmp_path):
+    final = tmp_path / "movie_hls"
+    final.mkdir()
+    (final / "stale.ts").write_text("old")
+    partial = tmp_path / partial_path("movie_hls")
+    (partial / "v0").mkdir(parents=True)
+    (partial / "v0" / "index.m3u8").write_text("#EXTM3U")
+
+    commit_output(str(partial), str(final))
+    assert sorted(p.relative_to(final).as_posix() for p in final.rglob("*")) == ["v0", "v0/index.m3u8"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["movie_hls"]
+
+
+def test_discard_output_ignores_missing_files(tmp_path):
+    partial = tmp_path / ".movie.partial.mkv"
+    partial.write_text("half")
+    discard_output(str(partial))
+    discard_output(str(partial))
+    discard_output(None)
+    assert not partial.exists()
+
+
+def test_estimate_output_size_scales_by_target_format(tmp_path):
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"x" * 1000)
+    assert estimate_output_size(str(source), "wav") == 10000
+    assert estimate_output_size(str(source), "ogg") == 1200
+    assert estimate_output_size(str(tmp_path / "missing.mp3"), "wav") == 0
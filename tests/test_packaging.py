@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from cobalt_converter.jobs import ConversionJob
+from cobalt_converter.packaging import (
+    PackagingFormat,
+    PackagingSpec,
+    can_stream_copy,
+    muxer_args,
+    package_dir,
+    plan_package,
+    stream_flags,
+)
+from cobalt_converter.plans import JobKind
+from cobalt_converter.probe import MediaInfo, StreamInfo
+from cobalt_converter.scaling import Rendition, ScaleLimit
+
+H264_AAC = MediaInfo(60.0, streams=(
+    StreamInfo(0, "video", "h264", width=1920, height=1080),
+    StreamInfo(1, "audio", "aac"),
+))
+
+
+class _Probes:
+    def __init__(self, info):
+        self.info = info
+
+    def probe(self, ffmpeg_path, input_file):
+        return self.info
+
+
+def _job(tmp_path, spec, **kwargs):
+    job = ConversionJob(str(tmp_path / "in.mp4"), "mp4", str(tmp_path), packaging=spec, **kwargs)
+    job.output_file = str(tmp_path / "movie.mp4")
+    job.partial_file = str(tmp_path / ".movie.partial.mp4")
+    return job
+
+
+def test_single_variant_hls_uses_fmp4_segments():
+    args = muxer_args(PackagingSpec(PackagingFormat.HLS, 4.0), "pkg", ["main"], has_audio=True)
+    assert args[args.index("-hls_time") + 1] == "4"
+    assert args[args.index("-hls_segment_type") + 1] == "fmp4"
+    assert args[args.index("-hls_segment_filename") + 1] == os.path.join("pkg", "", "seg_%05d.m4s")
+    assert "-var_stream_map" not in args
+    assert args[-1] == os.path.join("pkg", "", "index.m3u8")
+
+
+def test_ladder_hls_maps_each_variant_to_a_shared_audio_group():
+    args = muxer_args(PackagingSpec(PackagingFormat.HLS_TS), "pkg", ["720p", "480p"], has_audio=True)
+    assert args[args.index("-hls_segment_type") + 1] == "mpegts"
+    assert "-hls_fmp4_init_filename" not in args
+    assert args[args.index("-var_stream_map") + 1] == (
+        "a:0,agroup:audio,name:audio v:0,name:720p,agroup:audio v:1,name:480p,agroup:audio"
+    )
+    assert args[-1] == os.path.join("pkg", "%v", "index.m3u8")
+
+
+def test_dash_writes_one_manifest():
+    args = muxer_args(PackagingSpec(PackagingFormat.DASH, 2.0), "pkg", ["main"], has_audio=False)
+    assert args[:4] == ["-f", "dash", "-seg_duration", "2"]
+    assert args[args.index("-adaptation_sets") + 1] == "id=0,streams=v"
+    assert args[-1] == os.path.join("pkg", "manifest.mpd")
+
+
+def test_stream_copy_depends_on_the_packaging_codecs():
+    assert can_stream_copy(H264_AAC, PackagingFormat.HLS)
+    opus = MediaInfo(streams=(StreamInfo(0, "video", "vp9"), StreamInfo(1, "audio", "opus")))
+    assert can_stream_copy(opus, PackagingFormat.DASH)
+    assert not can_stream_copy(opus, PackagingFormat.HLS)
+    assert not can_stream_copy(MediaInfo(streams=(StreamInfo(0, "audio", "aac"),)), PackagingFormat.DASH)
+
+
+def test_stream_flags_target_one_video_output_and_keep_audio_flags():
+    assert stream_flags(["-crf", "22", "-c:v", "libx264", "-b:a", "128k"], "v:1") == [
+        "-crf:v:1", "22", "-c:v:1", "libx264", "-b:a", "128k",
+    ]
+
+
+def test_plan_package_stream_copies_compatible_sources(tmp_path):
+    job = _job(tmp_path, PackagingSpec(PackagingFormat.HLS))
+    plan = plan_package("ffmpeg", job, job.input_file, _Probes(H264_AAC))
+    assert plan.stream_copy
+    assert plan.output_args[:6] == ("-map", "0:v:0", "-map", "0:a:0", "-c", "copy")
+    [(target_dir, final_dir)] = plan.outputs
+    assert final_dir == package_dir(job.output_file, PackagingFormat.HLS) == str(tmp_path / "movie_hls")
+    assert os.path.isdir(target_dir)
+
+
+def test_plan_package_encodes_ladders_with_aligned_keyframes(tmp_path):
+    renditions = (
+        Rendition("720p", ScaleLimit(max_height=720), ("-b:v", "3M")),
+        Rendition("480p", ScaleLimit(max_height=480), ("-b:v", "1M")),
+    )
+    job = _job(tmp_path, PackagingSpec(PackagingFormat.DASH, 4.0), kind=JobKind.LADDER, renditions=renditions)
+    plan = plan_package("ffmpeg", job, job.input_file, _Probes(H264_AAC))
+    args = list(plan.output_args)
+    assert not plan.stream_copy
+    assert args[args.index("-force_key_frames:v") + 1] == "expr:gte(t,n_forced*4)"
+    assert ["-b:v:0", "3M"] == args[args.index("-b:v:0"):args.index("-b:v:0") + 2]
+    assert ["-b:v:1", "1M"] == args[args.index("-b:v:1"):args.index("-b:v:1") + 2]
+    assert args[args.index("-c:v") + 1] == "libx264"
+
+
+def test_plan_package_rejects_sources_without_video(tmp_path):
+    job = _job(tmp_path, PackagingSpec(PackagingFormat.HLS))
+    with pytest.raises(ValueError, match="no video stream"):
+        plan_package("ffmpeg", job, job.input_file, _Probes(MediaInfo(streams=(StreamInfo(0, "audio", "aac"),))))
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from cobalt_converter.previews import Preview, PreviewCache, format_badge
+from cobalt_converter.probe import MediaInfo, StreamInfo
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PreviewCache(str(tmp_path / "thumbnails"), max_bytes=900)
+
+
+def _add(cache, tmp_path, name, media=None, image_bytes=300):
+    source = tmp_path / name
+    source.write_bytes(name.encode())
+    key = cache.key(str(source))
+    image_path, _ = cache.paths(key)
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    with open(image_path, "wb") as f:
+        f.write(b"\0" * image_bytes)
+    cache.put(str(source), key, media)
+    return str(source), cache.paths(key)
+
+
+def _age(paths, mtime):
+    for path in paths:
+        os.utime(path, (mtime, mtime))
+
+
+def test_put_and_get_round_trip(cache, tmp_path):
+    media = MediaInfo(75.0, streams=(StreamInfo(0, "video", "h264", width=1280, height=720),))
+    source, (image_path, _) = _add(cache, tmp_path, "clip.mp4", media)
+
+    preview = cache.get(source)
+    assert preview == Preview(source, image_path, media)
+    assert format_badge(preview) == "1:15 · 1280×720"
+
+
+def test_changed_sources_miss_the_cache(cache, tmp_path):
+    source, _ = _add(cache, tmp_path, "clip.mp4")
+    with open(source, "ab") as f:
+        f.write(b"more")
+    assert cache.get(source) is None
+    assert cache.get(str(tmp_path / "missing.mp4")) is None
+
+
+def test_prune_evicts_least_recently_used_entries(cache, tmp_path):
+    first, first_paths = _add(cache, tmp_path, "first.mp4")
+    second, second_paths = _add(cache, tmp_path, "second.mp4")
+    _age(first_paths, 1000)
+    _age(second_paths, 2000)
+    assert cache.get(first) is not None
+
+    third, _ = _add(cache, tmp_path, "third.mp4")
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert not any(os.path.exists(path) for path in second_paths)
+
+
+def test_prune_leaves_a_cache_under_its_limit_alone(tmp_path):
+    cache = PreviewCache(str(tmp_path / "thumbnails"), max_bytes=10_000)
+    sources = [_add(cache, tmp_path, f"clip{n}.mp4")[0] for n in range(5)]
+    assert all(cache.get(source) is not None for source in sources)
+
+
+def test_badge_formats_long_durations_and_missing_media():
+    assert format_badge(Preview("a.mp3", None, MediaInfo(3725.4))) == "1:02:05"
+    assert format_badge(Preview("a.mp3", None, None)) == ""
@@ -0,0 +1,46 @@
+import pytest
+
+from cobalt_converter.scaling import Rendition, ScaleLimit, merge_flags, select_renditions, split_flag
+
+
+def _ladder(*heights):
+    return [Rendition(f"{h}p", ScaleLimit(max_width=h * 16 // 9, max_height=h)) for h in heights]
+
+
+def test_video_filter_bounds_both_sides():
+    limit = ScaleLimit(max_width=1280, max_height=720, scaler="lanczos")
+    assert limit.video_filter() == (
+        "scale=w='min(iw,1280)':h='min(ih,720)':force_original_aspect_ratio=decrease"
+        ":force_divisible_by=2:flags=lanczos"
+    )
+
+
+def test_video_filter_keeps_an_unbounded_side():
+    assert ScaleLimit(max_height=480).video_filter().startswith("scale=w=iw:h='min(ih,480)'")
+    assert ScaleLimit().video_filter() is None
+    assert ScaleLimit(max_fps=30).flags() == ("-fpsmax", "30")
+
+
+def test_from_dict_rejects_unknown_scalers():
+    assert ScaleLimit.from_dict({"max_height": 720}).scaler == "bicubic"
+    with pytest.raises(ValueError, match="Unknown scaler"):
+        ScaleLimit.from_dict({"scaler": "magic"})
+
+
+def test_select_renditions_drops_upscales():
+    ladder = _ladder(1080, 720, 480)
+    assert [r.name for r in select_renditions(ladder, 1280, 720)] == ["720p", "480p"]
+    assert [r.name for r in select_renditions(ladder, None, None)] == ["1080p", "720p", "480p"]
+
+
+def test_select_renditions_keeps_the_smallest_for_tiny_sources():
+    assert [r.name for r in select_renditions(_ladder(1080, 360, 720), 320, 240)] == ["360p"]
+    assert select_renditions([], 320, 240) == []
+
+
+def test_split_and_merge_flags():
+    assert split_flag(["-vf", "scale=1", "-crf", "20"], "-vf") == ("scale=1", ["-crf", "20"])
+    assert split_flag(["-crf", "20"], "-vf") == (None, ["-crf", "20"])
+    assert merge_flags(["-crf", "20", "-preset", "slow"], ("-crf", "24", "-b:a", "96k")) == [
+        "-crf", "24", "-preset", "slow", "-b:a", "96k",
+    ]
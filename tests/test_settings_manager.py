@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+import pytest
+
+from cobalt_converter.exceptions.config_exceptions import ConfigValidationError
+from cobalt_converter.settings_manager import SettingsManager
+from cobalt_converter.staging import StagingMode
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "settings.json")
+
+
+def _stored(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_changes_are_saved_together_after_the_delay(path):
+    settings = SettingsManager(path, save_delay=0.2)
+    settings.max_jobs = 3
+    settings.staging_mode = StagingMode.AUTO
+    settings.remember_choice("video", "mkv", "high")
+    assert not os.path.exists(path)
+
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    stored = _stored(path)
+    assert (stored["max_jobs"], stored["staging_mode"]) == (3, "auto")
+    assert stored["last_used"] == {"video": {"format": "mkv", "preset": "high"}}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_flush_writes_immediately_and_reloads(path):
+    settings = SettingsManager(path, save_delay=60)
+    settings.debug = True
+    settings.thread_budget = 8
+    settings.flush()
+
+    reloaded = SettingsManager(path)
+    assert reloaded.debug and reloaded.thread_budget == 8
+    mtime = os.stat(path).st_mtime_ns
+    settings.debug = True
+    settings.flush()
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_load_ignores_values_of_the_wrong_type(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"max_jobs": "four", "debug": 1, "log_level": "LOUD", "thread_budget": 6, "extra": [1]}, f)
+    settings = SettingsManager(path)
+    assert settings.max_jobs == 1
+    assert settings.debug is False
+    assert settings.log_level == "INFO"
+    assert settings.thread_budget == 6
+
+
+@pytest.mark.parametrize("content", ["{not json", "[1, 2]"])
+def test_load_falls_back_to_defaults_for_unreadable_files(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    settings = SettingsManager(path)
+    assert settings.max_jobs == 1 and settings.staging_mode == StagingMode.OFF
+
+
+def test_log_level_setter_validates(path):
+    settings = SettingsManager(path, save_delay=60)
+    settings.log_level = "debug"
+    assert settings.log_level == "DEBUG"
+    with pytest.raises(ConfigValidationError):
+        settings.log_level = "chatty"
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+from cobalt_converter import staging
+from cobalt_converter.outputs import partial_path
+from cobalt_converter.staging import StagingManager, StagingMode
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = StagingManager(StagingMode.ALWAYS, scratch_dir=str(tmp_path / "scratch"))
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "share" / "movie.mkv"
+    path.parent.mkdir()
+    path.write_bytes(b"frames")
+    return str(path)
+
+
+def test_off_reads_inputs_in_place(tmp_path, source):
+    manager = StagingManager(StagingMode.OFF, scratch_dir=str(tmp_path / "scratch"))
+    assert manager.acquire_input(1, source) == source
+    assert manager.local_output(1, source) is None
+    manager.shutdown()
+
+
+def test_auto_stages_only_network_mounts(tmp_path, source, monkeypatch):
+    checked = []
+    monkeypatch.setattr(staging, "is_network_mount", lambda mount: checked.append(mount) or True)
+    manager = StagingManager(StagingMode.AUTO, scratch_dir=str(tmp_path / "scratch"))
+    assert manager.should_stage(source) and manager.should_stage(source)
+    assert checked == [staging.mount_point(source)]
+    manager.shutdown()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc/mounts")
+def test_network_mounts_are_detected_by_filesystem_type(monkeypatch):
+    monkeypatch.setattr(staging, "_linux_mount_types", lambda: {"/mnt/nas": "nfs4", "/": "ext4"})
+    assert staging.is_network_mount("/mnt/nas")
+    assert not staging.is_network_mount("/")
+
+
+def test_acquire_input_copies_to_scratch_and_release_removes_it(manager, source):
+    local = manager.acquire_input(7, source)
+    assert local != source and local.startswith(manager.scratch_dir)
+    with open(local, "rb") as f:
+        assert f.read() == b"frames"
+    assert manager.prefetch(7, source)
+
+    manager.release(7)
+    assert not os.path.exists(os.path.dirname(local))
+
+
+def test_missing_input_is_read_in_place(manager, tmp_path):
+    missing = str(tmp_path / "gone.mkv")
+    assert manager.acquire_input(3, missing) == missing
+
+
+def test_write_back_commits_a_staged_file(manager, tmp_path):
+    output = tmp_path / "share" / "out.mp4"
+    output.parent.mkdir()
+    local = manager.local_output(5, str(output))
+    assert local == partial_path(os.path.join(manager.scratch_dir, "5", "out", "out.mp4"))
+    with open(local, "wb") as f:
+        f.write(b"encoded")
+
+    manager.write_back(local, str(output))
+    assert output.read_bytes() == b"encoded"
+    assert not os.path.exists(local)
+    assert not os.path.exists(partial_path(str(output)))
+
+
+def test_write_back_copies_segment_directories(manager, tmp_path):
+    local = tmp_path / "scratch_out" / ".movie_hls.partial"
+    (local / "v0").mkdir(parents=True)
+    for name in ("index.m3u8", "seg0.ts", "seg1.ts"):
+        (local / "v0" / name).write_text(name)
+    output = tmp_path / "movie_hls"
+
+    manager.write_back(str(local), str(output))
+    assert sorted(p.name for p in (output / "v0").iterdir()) == ["index.m3u8", "seg0.ts", "seg1.ts"]
+    assert (output / "v0" / "seg1.ts").read_text() == "seg1.ts"
+    assert not local.exists()
@@ -0,0 +1,67 @@
+import json
+import sys
+import time
+
+import pytest
+
+from cobalt_converter.startup_profile import ImportTimer, StartupProfiler, compare, metrics
+
+
+def _report(imports_ms=100.0, window_ms=200.0, entry_ms=None, marks=None):
+    return {
+        "process_to_entry_ms": entry_ms,
+        "imports": {"total_ms": imports_ms},
+        "marks": marks or {},
+        "phases": [{"name": "main_window", "duration_ms": window_ms}],
+    }
+
+
+def test_metrics_flatten_marks_and_phases_and_skip_missing_values():
+    assert metrics(_report(marks={"first_paint": 640.0})) == {
+        "imports": 100.0, "mark:first_paint": 640.0, "phase:main_window": 200.0,
+    }
+
+
+def test_compare_needs_both_the_ratio_and_the_absolute_slowdown():
+    baseline = _report(imports_ms=100.0, window_ms=1000.0)
+    # +60% but only 60 ms on imports: regression; +4% (40 ms) on the window: noise.
+    assert compare(_report(imports_ms=160.0, window_ms=1040.0), baseline) == [
+        {"metric": "imports", "baseline_ms": 100.0, "current_ms": 160.0, "change": 0.6},
+    ]
+    # +100% but only 10 ms.
+    assert compare(_report(imports_ms=20.0), _report(imports_ms=10.0)) == []
+
+
+def test_compare_ignores_metrics_missing_from_the_baseline():
+    assert compare(_report(entry_ms=900.0, marks={"new": 500.0}), _report()) == []
+
+
+def test_import_timer_splits_self_and_cumulative_time():
+    timer = ImportTimer()
+    with timer.measure("parent"):
+        time.sleep(0.02)
+        with timer.measure("child"):
+            time.sleep(0.05)
+    child, parent = timer.records
+    assert (child["module"], child["depth"], parent["module"], parent["depth"]) == ("child", 1, "parent", 0)
+    assert parent["cumulative_ms"] >= child["cumulative_ms"] + 15
+    assert parent["self_ms"] == pytest.approx(parent["cumulative_ms"] - child["cumulative_ms"], abs=0.01)
+
+
+def test_finish_saves_a_baseline_then_reports_regressions(tmp_path):
+    output, baseline = tmp_path / "profile.json", tmp_path / "baseline.json"
+    first = StartupProfiler(str(output), str(baseline))
+    with first.phase("main_window"):
+        pass
+    assert first.finish()["regressions"] == []
+    assert json.loads(baseline.read_text())["baseline"] is None
+
+    second = StartupProfiler(str(output), str(baseline))
+    with second.phase("main_window"):
+        time.sleep(0.1)
+    report = second.finish()
+    # The process is older by now too, so only the phase is checked.
+    assert "phase:main_window" in [r["metric"] for r in report["regressions"]]
+    assert json.loads(output.read_text())["regressions"] == report["regressions"]
+    assert json.loads(baseline.read_text())["phases"] == first.report()["phases"]
+    assert second.imports not in sys.meta_path
@@ -0,0 +1,77 @@
+from cobalt_converter.probe import MediaInfo, StreamInfo
+from cobalt_converter.streams import encoded_kinds, plan_streams, stream_args, track_flags
+
+MOVIE = MediaInfo(
+    60.0,
+    streams=(
+        StreamInfo(0, "video", "h264", width=1920, height=1080),
+        StreamInfo(1, "audio", "aac", "eng"),
+        StreamInfo(2, "audio", "flac", "jpn"),
+        StreamInfo(3, "subtitle", "subrip", "eng"),
+        StreamInfo(4, "subtitle", "hdmv_pgs_subtitle"),
+        StreamInfo(5, "attachment", "ttf"),
+    ),
+    chapter_count=3,
+)
+
+
+def _describe(actions):
+    return [(a.stream.index, a.specifier, a.copy, a.encoder) for a in actions]
+
+
+def test_mkv_keeps_every_stream_as_is():
+    assert _describe(plan_streams(MOVIE, "mkv", [])) == [
+        (0, "v:0", True, None),
+        (1, "a:0", True, None),
+        (2, "a:1", True, None),
+        (3, "s:0", True, None),
+        (4, "s:1", True, None),
+        (5, "t:0", True, None),
+    ]
+
+
+def test_mp4_converts_text_subtitles_and_drops_the_rest():
+    assert _describe(plan_streams(MOVIE, "mp4", [])) == [
+        (0, "v:0", True, None),
+        (1, "a:0", True, None),
+        (2, "a:1", True, None),
+        (3, "s:0", False, "mov_text"),
+    ]
+
+
+def test_quality_flags_re_encode_only_their_stream_type():
+    actions = plan_streams(MOVIE, "mkv", ["-crf", "23", "-c:v", "libx264"])
+    assert [a.copy for a in actions if a.stream.kind == "video"] == [False]
+    assert all(a.copy for a in actions if a.stream.kind == "audio")
+    actions = plan_streams(MOVIE, "mkv", ["-b:a", "128k"])
+    assert [a.copy for a in actions if a.stream.kind in ("video", "audio")] == [True, False, False]
+
+
+def test_flv_keeps_a_single_audio_track():
+    assert [a.specifier for a in plan_streams(MOVIE, "flv", []) if a.stream.kind == "audio"] == ["a:0"]
+
+
+def test_audio_only_input_has_no_stream_plan():
+    audio = MediaInfo(streams=(StreamInfo(0, "audio", "mp3"),))
+    assert plan_streams(audio, "mp4", []) is None
+    assert plan_streams(MOVIE, "mp3", []) is None
+
+
+def test_stream_args_map_and_copy():
+    args = stream_args(plan_streams(MOVIE, "mp4", []), MOVIE)
+    assert args[:8] == ["-map", "0:0", "-map", "0:1", "-map", "0:2", "-map", "0:3"]
+    assert "-c:s:0" in args and args[args.index("-c:s:0") + 1] == "mov_text"
+    assert args[-4:] == ["-map_metadata", "0", "-map_chapters", "0"]
+
+
+def test_encoded_kinds():
+    assert encoded_kinds(["-crf", "20", "-af", "loudnorm"]) == {"video", "audio"}
+    assert encoded_kinds(["-filter:a:1", "loudnorm"]) == {"audio"}
+    assert encoded_kinds([]) == set()
+
+
+def test_track_flags_address_the_extracted_track():
+    flags = ["-b:a", "192k", "-filter:a:0", "first", "-filter:a:2", "third"]
+    assert track_flags(flags, 0) == ["-b:a", "192k", "-filter:a:0", "first"]
+    assert track_flags(flags, 2) == ["-b:a", "192k", "-filter:a:0", "third"]
+    assert track_flags(flags, 1) == ["-b:a", "192k"]
@@ -0,0 +1,119 @@
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from cobalt_converter.supervisor import PAUSE_SUPPORTED, ProcessSupervisor
+
+needs_signals = pytest.mark.skipif(not PAUSE_SUPPORTED, reason="needs POSIX job-control signals")
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = ProcessSupervisor(grace_period=0.3)
+    yield supervisor
+    supervisor.shutdown()
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+def _run_until_ready(supervisor, key, code, **kwargs):
+    ready = threading.Event()
+    lines = []
+
+    def on_line(line):
+        lines.append(line)
+        if line == "ready":
+            ready.set()
+
+    future = supervisor.run(key, _python(code), on_line=on_line, **kwargs)
+    assert ready.wait(5)
+    return future, lines
+
+
+def test_progress_lines_split_on_carriage_returns(supervisor):
+    code = r"import sys; sys.stdout.write('frame=1\rframe=2\r\n\nDone\nno newline'); sys.exit(3)"
+    result = supervisor.capture("job", _python(code), timeout=10)
+    assert result.output == ["frame=1", "frame=2", "Done", "no newline"]
+    assert result.tail == result.output
+    assert result.returncode == 3 and result.stop_reason is None and not result.succeeded
+
+
+def test_silent_process_is_stopped_as_stalled(supervisor):
+    future, _ = _run_until_ready(
+        supervisor, "job", "import time; print('ready', flush=True); time.sleep(30)", stall_timeout=0.3,
+    )
+    result = future.result(10)
+    assert result.stop_reason == "stalled"
+    assert result.returncode != 0
+
+
+def test_timeout_stops_a_chatty_process(supervisor):
+    code = "import time\nwhile True:\n    print('frame', flush=True)\n    time.sleep(0.05)"
+    started = time.monotonic()
+    result = supervisor.run("job", _python(code), timeout=0.5, stall_timeout=5).result(10)
+    assert result.stop_reason == "timeout"
+    assert time.monotonic() - started < 5
+
+
+@needs_signals
+def test_paused_time_does_not_count_against_the_timeout(supervisor):
+    code = (
+        "import time\n"
+        "print('ready', flush=True)\n"
+        "for _ in range(12):\n"
+        "    print('frame', flush=True)\n"
+        "    time.sleep(0.05)"
+    )
+    future, lines = _run_until_ready(supervisor, "job", code, timeout=1.2, stall_timeout=5)
+    assert supervisor.pause("job")
+    assert not supervisor.pause("job")
+    assert supervisor.is_paused("job")
+    # Output written just before the stop may still be in the pipe.
+    time.sleep(0.2)
+    frames = len(lines)
+    time.sleep(0.8)
+    assert len(lines) == frames
+    assert supervisor.resume("job")
+    assert not supervisor.resume("job")
+
+    result = future.result(10)
+    assert result.succeeded
+    assert lines.count("frame") == 12
+
+
+@needs_signals
+def test_terminate_stops_a_paused_process(supervisor):
+    future, _ = _run_until_ready(supervisor, "job", "import time; print('ready', flush=True); time.sleep(30)")
+    assert supervisor.pause("job")
+    supervisor.terminate("job")
+    result = future.result(10)
+    assert result.stop_reason == "cancelled"
+    assert result.returncode == -signal.SIGTERM
+    assert supervisor.running_count == 0 and not supervisor.is_paused("job")
+
+
+@needs_signals
+def test_sigterm_escalates_to_sigkill(supervisor):
+    code = (
+        "import signal, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        "print('ready', flush=True)\n"
+        "time.sleep(30)"
+    )
+    future, _ = _run_until_ready(supervisor, "job", code)
+    started = time.monotonic()
+    supervisor.terminate("job", "shutdown")
+    result = future.result(10)
+    assert result.stop_reason == "shutdown"
+    assert result.returncode == -signal.SIGKILL
+    assert time.monotonic() - started < 5
+
+
+def test_terminate_unknown_key_is_ignored(supervisor):
+    supervisor.terminate("missing")
+    assert supervisor.capture("job", _python("print('ok')")).succeeded
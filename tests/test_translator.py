@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from cobalt_converter import translator as translator_module
+from cobalt_converter.translator import Translator
+
+
+@pytest.fixture
+def languages(tmp_path):
+    tables = {
+        "en": {"title": "Converter", "done": "Converted {count} files", "only_en": "English only"},
+        "he": {"title": "ממיר", "done": "הומרו {total} קבצים"},
+        "bad": ["not", "an", "object"],
+    }
+    for code, table in tables.items():
+        (tmp_path / f"{code}.json").write_text(json.dumps(table, ensure_ascii=False), encoding="utf-8")
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_lookup_and_formatting(languages):
+    translator = Translator(languages_dir=languages)
+    assert translator.get("title") == "Converter"
+    assert translator.get("done", count=3) == "Converted 3 files"
+    assert translator.available_languages == ["bad", "broken", "en", "he"]
+
+
+def test_missing_keys_fall_back_to_english_then_the_key(languages):
+    translator = Translator("he", languages_dir=languages)
+    assert translator.get("title") == "ממיר"
+    assert translator.get("only_en") == "English only"
+    assert translator.get("nowhere") == "nowhere"
+
+
+def test_bad_placeholders_fall_back_to_english(languages):
+    translator = Translator("he", languages_dir=languages)
+    assert translator.get("done", count=2) == "Converted 2 files"
+    assert translator.get("title", count=2) == "ממיר"
+    assert translator.get("only_en", count=2) == "English only"
+    assert Translator(languages_dir=languages).get("done", total=2) == "done"
+
+
+def test_unreadable_languages_fall_back_to_english(languages):
+    for code in ("bad", "broken"):
+        translator = Translator(code, languages_dir=languages)
+        assert translator.get("title") == "Converter"
+
+
+def test_unknown_language_is_ignored(languages):
+    translator = Translator("he", languages_dir=languages)
+    translator.set_language("xx")
+    assert translator.language == "he"
+    translator.set_language("en")
+    assert (translator.language, translator.get("title")) == ("en", "Converter")
+
+
+def test_bundled_languages_translate_every_english_key():
+    directory = os.path.join(os.path.dirname(translator_module.__file__), "Languages")
+    tables = {}
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            tables[filename] = set(json.load(f))
+    for filename, keys in tables.items():
+        assert keys == tables["en.json"], filename